@@ -0,0 +1,63 @@
+# backend/db/executor.py
+
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# The supabase-py client is synchronous (see supabase_client.py). Every
+# ``.execute()`` is a blocking PostgREST round trip, so it must never run on
+# the event loop thread. We give database I/O its own bounded pool instead of
+# the default executor so DB calls never queue behind (or starve) other
+# ``to_thread`` work, and so the number of concurrent PostgREST requests is
+# capped at the size of the underlying httpx keep-alive pool.
+SUPABASE_DB_MAX_WORKERS = int(os.getenv("SUPABASE_DB_MAX_WORKERS", "32"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is not None:
+        return _executor
+
+    _executor = ThreadPoolExecutor(
+        max_workers=SUPABASE_DB_MAX_WORKERS,
+        thread_name_prefix="supabase-db",
+    )
+    return _executor
+
+
+async def run_sync(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking callable on the bounded DB executor.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_db_executor(),
+        functools.partial(fn, *args, **kwargs),
+    )
+
+
+async def execute(query: Any) -> Any:
+    """
+    Await a fully-built supabase query builder without blocking the loop.
+
+    Building the query (``table().select().eq()...``) is pure Python; only
+    ``.execute()`` does network I/O, so that is the part we offload:
+
+        res = await execute(supabase.table("threads").select("*").eq(...))
+    """
+    return await run_sync(query.execute)
+
+
+def shutdown_db_executor(wait: bool = True) -> None:
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
@@ -0,0 +1,337 @@
+# backend/db/repository.py
+
+"""
+Thread / message / memory data access.
+
+Every function here is async and runs its PostgREST round trip on the
+bounded DB executor (see executor.py), so route handlers can ``await``
+them without stalling the event loop for other requests.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from backend.db.supabase_client import get_supabase
+from backend.db.executor import execute
+
+
+# -------------------------------------------------------------------
+# Threads
+# -------------------------------------------------------------------
+async def get_thread(thread_id: str, columns: str = "*") -> Optional[Dict[str, Any]]:
+    supabase = get_supabase()
+    res = await execute(
+        supabase.table("threads")
+        .select(columns)
+        .eq("thread_id", thread_id)
+        .limit(1)
+    )
+    rows = res.data or []
+    return rows[0] if rows else None
+
+
+async def insert_thread(row: Dict[str, Any]) -> List[Dict[str, Any]]:
+    supabase = get_supabase()
+    res = await execute(supabase.table("threads").insert(row))
+    return res.data or []
+
+
+async def update_thread(thread_id: str, values: Dict[str, Any]) -> List[Dict[str, Any]]:
+    supabase = get_supabase()
+    res = await execute(
+        supabase.table("threads").update(values).eq("thread_id", thread_id)
+    )
+    return res.data or []
+
+
+async def update_thread_if_unchanged(
+    thread_id: str,
+    values: Dict[str, Any],
+    updated_at: Optional[str],
+) -> bool:
+    """
+    Compare-and-set: apply ``values`` only if the row's ``updated_at`` still
+    equals the one read before. Returns False if another writer got there
+    first. ``values`` should bump ``updated_at`` so later writers see it.
+    """
+    supabase = get_supabase()
+    query = supabase.table("threads").update(values).eq("thread_id", thread_id)
+    if updated_at is None:
+        query = query.is_("updated_at", "null")
+    else:
+        query = query.eq("updated_at", updated_at)
+
+    res = await execute(query)
+    return bool(res.data)
+
+
+# -------------------------------------------------------------------
+# Messages
+# -------------------------------------------------------------------
+async def list_messages(
+    thread_id: str,
+    columns: str = "*",
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    supabase = get_supabase()
+    query = (
+        supabase.table("messages")
+        .select(columns)
+        .eq("thread_id", thread_id)
+        .order("created_at", desc=False)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+
+    res = await execute(query)
+    return res.data or []
+
+
+async def list_recent_messages(
+    thread_id: str,
+    columns: str = "role, content, created_at",
+    limit: int = 60,
+    before: Optional[str] = None,
+    before_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Tail window: the newest ``limit`` messages of a thread, returned oldest
+    first. To page further back pass the ``created_at`` and ``message_id``
+    of the oldest row you already have as ``before`` / ``before_id``
+    (keyset on ``(created_at, message_id)``, no OFFSET, so rows sharing a
+    timestamp across a page boundary are not skipped). ``before`` alone
+    falls back to a plain ``created_at <`` cursor.
+
+    Served by idx_messages_thread_id_created_at_message_id as a single
+    range scan. The cursor columns are always selected.
+    """
+    if columns != "*":
+        for column in ("created_at", "message_id"):
+            if column not in columns:
+                columns = f"{columns}, {column}"
+
+    supabase = get_supabase()
+    query = (
+        supabase.table("messages")
+        .select(columns)
+        .eq("thread_id", thread_id)
+    )
+    if before is not None and before_id is not None:
+        # (created_at, message_id) < (before, before_id); the lte bounds the
+        # index range scan, the or() breaks ties on the same timestamp
+        query = query.lte("created_at", before).or_(
+            f'created_at.lt."{before}",'
+            f'and(created_at.eq."{before}",message_id.lt.{before_id})'
+        )
+    elif before is not None:
+        query = query.lt("created_at", before)
+
+    res = await execute(
+        query.order("created_at", desc=True)
+        .order("message_id", desc=True)
+        .limit(limit)
+    )
+    return list(reversed(res.data or []))
+
+
+async def insert_messages(rows: Any) -> List[Dict[str, Any]]:
+    """
+    Insert one message (dict) or several (list of dicts) in a single request.
+    Rows that carry a client-generated ``message_id`` are idempotent: a
+    retried insert of the same row is ignored instead of duplicated.
+    """
+    supabase = get_supabase()
+    res = await execute(
+        supabase.table("messages").upsert(
+            rows, on_conflict="message_id", ignore_duplicates=True, default_to_null=False
+        )
+    )
+    return res.data or []
+
+
+# -------------------------------------------------------------------
+# Long-term memory
+# -------------------------------------------------------------------
+async def list_long_term_memory(
+    thread_id: str,
+    columns: str = "content, memory_type, importance",
+    limit: int = 10,
+) -> List[Dict[str, Any]]:
+    supabase = get_supabase()
+    res = await execute(
+        supabase.table("long_term_memory")
+        .select(columns)
+        .eq("thread_id", thread_id)
+        .order("importance", desc=True)
+        .order("created_at", desc=False)
+        .limit(limit)
+    )
+    return res.data or []
+
+
+async def list_document_memories(thread_id: str, limit: int = 3) -> List[Dict[str, Any]]:
+    supabase = get_supabase()
+    res = await execute(
+        supabase.table("long_term_memory")
+        .select("content")
+        .eq("thread_id", thread_id)
+        .eq("memory_type", "document")
+        .order("created_at", desc=False)
+        .limit(limit)
+    )
+    return res.data or []
+
+
+async def insert_long_term_memory(row: Any) -> List[Dict[str, Any]]:
+    """
+    Insert one memory row (dict) or several (list of dicts) in a single request.
+    """
+    supabase = get_supabase()
+    res = await execute(supabase.table("long_term_memory").insert(row))
+    return res.data or []
+
+
+# -------------------------------------------------------------------
+# Document chunks
+# -------------------------------------------------------------------
+async def list_document_chunks(
+    thread_id: str,
+    columns: str = "document_id, document_name, chunk_index, page_number, char_start, char_end, content",
+    page_size: int = 1000,
+) -> List[Dict[str, Any]]:
+    """
+    Every chunk of every document in a thread, in document / chunk order.
+    Fetched in pages because PostgREST caps rows per response.
+    """
+    supabase = get_supabase()
+    rows: List[Dict[str, Any]] = []
+    while True:
+        res = await execute(
+            supabase.table("document_chunks")
+            .select(columns)
+            .eq("thread_id", thread_id)
+            .order("document_id", desc=False)
+            .order("chunk_index", desc=False)
+            .range(len(rows), len(rows) + page_size - 1)
+        )
+        batch = res.data or []
+        rows.extend(batch)
+        if len(batch) < page_size:
+            return rows
+
+
+async def insert_document_chunks(rows: List[Dict[str, Any]], batch_size: int = 500) -> int:
+    """Insert chunk rows in batches; returns the number of rows inserted."""
+    supabase = get_supabase()
+    inserted = 0
+    for start in range(0, len(rows), batch_size):
+        res = await execute(supabase.table("document_chunks").insert(rows[start:start + batch_size]))
+        inserted += len(res.data or [])
+    return inserted
+
+
+# -------------------------------------------------------------------
+# Ingested documents
+# -------------------------------------------------------------------
+async def insert_ingested_document(row: Dict[str, Any]) -> List[Dict[str, Any]]:
+    supabase = get_supabase()
+    res = await execute(supabase.table("ingested_documents").upsert(row, on_conflict="job_id"))
+    return res.data or []
+
+
+async def get_ingested_document(job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """The stored result of ``job_id``, only if ``user_id`` ingested it."""
+    supabase = get_supabase()
+    res = await execute(
+        supabase.table("ingested_documents")
+        .select("name, type, kind, text, description")
+        .eq("job_id", job_id)
+        .eq("user_id", user_id)
+        .limit(1)
+    )
+    rows = res.data or []
+    return rows[0] if rows else None
+
+
+# -------------------------------------------------------------------
+# Thread context (single round trip)
+# -------------------------------------------------------------------
+async def load_thread_context(
+    thread_id: str,
+    user_id: str,
+    stm_limit: int = 60,
+    ltm_limit: int = 10,
+    doc_limit: int = 3,
+) -> Dict[str, Any]:
+    """
+    Load ownership + STM tail + MTM + LTM + document memories in one call.
+
+    Backed by the ``load_thread_context`` Postgres function. Returns:
+    {
+        "found": bool, "is_owner": bool, "owner": str | None,
+        "account_id": str | None, "summary": str | None, "metadata": dict,
+        "stm": [{role, content, created_at}, ...],   # oldest first
+        "ltm": [{content, memory_type, importance}, ...],
+        "documents": [{content}, ...],
+    }
+
+    If the RPC is not deployed yet, falls back to the per-table queries
+    (issued concurrently) so callers see the same shape either way.
+    """
+    supabase = get_supabase()
+    try:
+        res = await execute(
+            supabase.rpc(
+                "load_thread_context",
+                {
+                    "p_thread_id": thread_id,
+                    "p_user_id": user_id,
+                    "p_stm_limit": stm_limit,
+                    "p_ltm_limit": ltm_limit,
+                    "p_doc_limit": doc_limit,
+                },
+            )
+        )
+        if isinstance(res.data, dict):
+            return res.data
+        print(f"⚠️ load_thread_context RPC returned {type(res.data).__name__}, using fallback")
+    except Exception as e:
+        print(f"⚠️ load_thread_context RPC failed, using fallback: {e}")
+
+    return await _load_thread_context_fallback(
+        thread_id, user_id, stm_limit, ltm_limit, doc_limit
+    )
+
+
+async def _load_thread_context_fallback(
+    thread_id: str,
+    user_id: str,
+    stm_limit: int,
+    ltm_limit: int,
+    doc_limit: int,
+) -> Dict[str, Any]:
+    thread = await get_thread(thread_id, "account_id, user_id, summary, metadata")
+    if not thread:
+        return {"found": False, "is_owner": False}
+
+    owner = thread.get("account_id") or thread.get("user_id")
+    if owner != user_id:
+        return {"found": True, "is_owner": False, "owner": owner}
+
+    stm, ltm, documents = await asyncio.gather(
+        list_recent_messages(thread_id, limit=stm_limit),
+        list_long_term_memory(thread_id, limit=ltm_limit),
+        list_document_memories(thread_id, limit=doc_limit),
+    )
+
+    return {
+        "found": True,
+        "is_owner": True,
+        "owner": owner,
+        "account_id": thread.get("account_id"),
+        "summary": thread.get("summary"),
+        "metadata": thread.get("metadata") or {},
+        "stm": stm,
+        "ltm": ltm,
+        "documents": documents,
+    }
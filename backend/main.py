@@ -4,6 +4,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from backend.routes import chat
 from backend.routes import triplet
+from backend.services.context_cache import context_cache
+from backend.services import turn_pipeline
+from backend.services.extraction_cache import extraction_cache
+from backend.services.document_store import document_store
+from backend.services.ingestion_jobs import ingestion_jobs
 import traceback
 import logging
 from dotenv import load_dotenv
@@ -134,9 +139,11 @@ try:
     from .routes.agent_actions import router as actions_router
     from .routes.search import router as tools_router
     from .routes.triplet import router as triplet_router
+    from .routes.documents import router as documents_router
     
     app.include_router(triplet_router, prefix="/api", tags=["Triplet"])
     app.include_router(thread_router, prefix="/api/threads", tags=["Thread"])
+    app.include_router(documents_router, prefix="/api/documents", tags=["Documents"])
     app.include_router(agent_router, prefix="/api/agent", tags=["Agent"])
     app.include_router(actions_router, prefix="/api/actions", tags=["Actions"])
     app.include_router(tools_router, prefix="/api/tools", tags=["Tools"])
@@ -150,6 +157,23 @@ except Exception as e:
     logger.error(traceback.format_exc())
     raise
 
+# ------------------------------------------------------------
+# Startup / Shutdown
+# ------------------------------------------------------------
+@app.on_event("startup")
+async def start_turn_pipeline():
+    turn_pipeline.start_workers()
+
+
+@app.on_event("shutdown")
+async def shutdown_db_pool():
+    from backend.db.executor import shutdown_db_executor
+    from backend.services.pdf_extraction import pdf_extraction_service
+    # Drain queued turn bookkeeping while the DB pool is still up
+    await turn_pipeline.stop_workers()
+    shutdown_db_executor(wait=False)
+    pdf_extraction_service.shutdown(wait=False)
+
 # ------------------------------------------------------------
 # Health Check
 # ------------------------------------------------------------
@@ -163,7 +187,12 @@ def health():
             "anthropic": "configured" if os.getenv("ANTHROPIC_API_KEY") else "missing",
             "deepseek": "configured" if os.getenv("DEEPSEEK_API_KEY") else "missing",
             "supabase": "configured" if os.getenv("SUPABASE_URL") else "missing",
-        }
+        },
+        "context_cache": context_cache.stats(),
+        "turn_pipeline": turn_pipeline.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "document_store": document_store.stats(),
+        "ingestion_jobs": ingestion_jobs.stats(),
     }
 
 # ------------------------------------------------------------
@@ -1,6 +1,6 @@
 # backend/routes/chat.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
@@ -9,10 +9,9 @@ import asyncio
 import os
 from openai import OpenAI
 
-from backend.utils.attachment_extractor import extract_attachment_text
-from backend.services.openai_agent import analyze_image_with_openai
-from io import BytesIO
-import base64
+from backend.routes.thread import get_current_user_id, require_user
+from backend.services.attachment_pipeline import ATTACHMENT_TEXT_MAX_CHARS, process_attachments
+from backend.services.ingestion_jobs import ingestion_jobs
 
 router = APIRouter(tags=["Chat"])
 
@@ -28,6 +27,8 @@ class Message(BaseModel):
 class ChatRequest(BaseModel):
     messages: List[Message]
     attachments: Optional[List[Dict[str, Any]]] = []
+    # job_ids from /api/documents/ingest
+    document_ids: Optional[List[str]] = []
     document_context: Optional[str] = None
 
 
@@ -75,7 +76,7 @@ async def chat_root():
 
 
 @router.post("/stream")
-async def chat_stream_endpoint(payload: ChatRequest):
+async def chat_stream_endpoint(request: Request, payload: ChatRequest):
     """
     ⚡ STREAMING chat endpoint for instant word-by-word responses
     This makes the chat feel significantly faster!
@@ -89,61 +90,50 @@ async def chat_stream_endpoint(payload: ChatRequest):
     if not payload.messages:
         raise HTTPException(status_code=400, detail="Messages are required")
 
+    # Ingested documents belong to one user: referencing them requires auth
+    user_id = None
+    if payload.document_ids:
+        user_id = require_user(await get_current_user_id(request))
+
     # Extract documents if attachments exist
     extracted_documents = []
     vision_extracts = []
     
-    if payload.attachments and not payload.document_context:
+    if (payload.attachments or payload.document_ids) and not payload.document_context:
         print("\n📄 Processing attachments...")
         
-        for idx, file in enumerate(payload.attachments):
-            mime = file.get("type", "")
-            base64_data = file.get("base64")
-            name = file.get("name", f"attachment_{idx+1}")
-
-            if not base64_data:
-                continue
+        results, ingested = await asyncio.gather(
+            process_attachments(
+                payload.attachments,
+                vision_prompt="Analyze this image comprehensively. Describe all visible details, text, objects, people, context, and any other relevant information.",
+            ),
+            ingestion_jobs.resolve_documents(payload.document_ids, user_id, max_chars=ATTACHMENT_TEXT_MAX_CHARS),
+        )
+        results += ingested
 
-            if base64_data.startswith("data:"):
-                base64_data = base64_data.split(",", 1)[1]
+        for result in results:
+            name = result["name"]
 
             # PDF Extraction
-            if mime == "application/pdf":
-                try:
-                    print(f"   📄 Extracting PDF: {name}...")
-                    pdf_bytes = base64.b64decode(base64_data)
-                    text = extract_attachment_text(BytesIO(pdf_bytes))
-                    
-                    if text and text.strip():
-                        extracted_documents.append(
-                            f"📄 PDF DOCUMENT — {name}:\n\n{text.strip()}"
-                        )
-                        print(f"      ✅ Extracted {len(text)} characters")
-                except Exception as e:
-                    print(f"      ❌ PDF extraction failed: {e}")
+            if result["kind"] == "pdf":
+                if result.get("error"):
                     extracted_documents.append(
                         f"⚠️ PDF DOCUMENT — {name}: Extraction failed"
                     )
+                elif result.get("text"):
+                    extracted_documents.append(
+                        f"📄 PDF DOCUMENT — {name}:\n\n{result['text']}"
+                    )
 
             # Image Analysis
-            elif mime.startswith("image/"):
-                try:
-                    print(f"   🖼️ Analyzing image: {name}...")
-                    description = await analyze_image_with_openai(
-                        base64_data=base64_data,
-                        mime_type=mime,
-                        prompt="Analyze this image comprehensively. Describe all visible details, text, objects, people, context, and any other relevant information."
+            else:
+                if result.get("error"):
+                    vision_extracts.append(
+                        f"⚠️ IMAGE — {name}: Analysis failed - {result['error'][:100]}"
                     )
-
-                    if description and description.strip():
-                        vision_extracts.append(
-                            f"🖼️ IMAGE ANALYSIS — {name}:\n\n{description.strip()}"
-                        )
-                        print(f"      ✅ Analysis: {len(description)} characters")
-                except Exception as e:
-                    print(f"      ❌ Image analysis failed: {e}")
+                elif result.get("description"):
                     vision_extracts.append(
-                        f"⚠️ IMAGE — {name}: Analysis failed - {str(e)[:100]}"
+                        f"🖼️ IMAGE ANALYSIS — {name}:\n\n{result['description']}"
                     )
 
     # Build document context
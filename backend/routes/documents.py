@@ -0,0 +1,181 @@
+# backend/routes/documents.py
+
+"""
+Document ingestion.
+
+Upload once, extract in the background, then reference the document by id
+from thread / chat / triplet calls (``document_ids``) instead of sending
+the file inline and waiting for extraction inside that request.
+
+/upload takes multipart form data: the file is spooled to disk as it
+arrives and extraction workers open it by path, so peak memory no longer
+grows with the file size. /ingest keeps the JSON + base64 shape.
+"""
+
+from fastapi import APIRouter, File, Request, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+import os
+import asyncio
+import json
+import mimetypes
+import tempfile
+
+from backend.routes.thread import get_current_user_id, require_user
+from backend.services.ingestion_jobs import ingestion_jobs
+from backend.utils.base64_utils import Base64TooLarge, check_base64_size, decode_base64_to_temp_file
+
+router = APIRouter(tags=["Documents"])
+
+INGESTION_UPLOAD_DIR = os.getenv("INGESTION_UPLOAD_DIR", tempfile.gettempdir())
+INGESTION_MAX_UPLOAD_BYTES = int(os.getenv("INGESTION_MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_COPY_CHUNK = 1024 * 1024
+
+
+def _save_upload(upload: UploadFile) -> str:
+    """
+    Copy the spooled upload into a named temp file that the PDF worker
+    processes can open, 1 MB at a time. Returns the path.
+    """
+    suffix = os.path.splitext(upload.filename or "")[1]
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=INGESTION_UPLOAD_DIR)
+    copied = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            upload.file.seek(0)
+            while True:
+                chunk = upload.file.read(UPLOAD_COPY_CHUNK)
+                if not chunk:
+                    break
+                copied += len(chunk)
+                if copied > INGESTION_MAX_UPLOAD_BYTES:
+                    raise ValueError(f"File is larger than {INGESTION_MAX_UPLOAD_BYTES} bytes")
+                out.write(chunk)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _accepted(job):
+    job["events_url"] = f"/api/documents/jobs/{job['job_id']}/events"
+    return JSONResponse(job, status_code=202)
+
+
+# ────────────────────────────────────────────────
+# UPLOAD (multipart)
+# ────────────────────────────────────────────────
+@router.post("/upload")
+async def upload_document(request: Request, file: UploadFile = File(...)):
+    """
+    Multipart upload (field ``file``). Returns 202 with the job state;
+    extraction continues in the background.
+    """
+    user_id = require_user(await get_current_user_id(request))
+
+    if file.size is not None and file.size > INGESTION_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File is larger than {INGESTION_MAX_UPLOAD_BYTES} bytes")
+
+    name = file.filename or "document"
+    mime = file.content_type or ""
+    if not mime or mime == "application/octet-stream":
+        mime = mimetypes.guess_type(name)[0] or mime
+
+    try:
+        path = await asyncio.to_thread(_save_upload, file)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    finally:
+        await file.close()
+
+    try:
+        job = ingestion_jobs.submit(path, name, mime, user_id)
+    except ValueError as e:
+        os.unlink(path)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return _accepted(job)
+
+
+# ────────────────────────────────────────────────
+# START INGESTION
+# ────────────────────────────────────────────────
+@router.post("/ingest")
+async def ingest_document(request: Request):
+    """
+    Body: ``{"name", "type", "base64"}`` (same shape as an attachment).
+    Returns 202 with the job state; extraction continues in the background.
+    """
+    user_id = require_user(await get_current_user_id(request))
+
+    body = await request.json()
+    base64_data = body.get("base64") or ""
+    name = body.get("name") or "document"
+    mime = body.get("type") or ""
+
+    if not base64_data:
+        raise HTTPException(status_code=400, detail="base64 file content is required")
+
+    try:
+        check_base64_size(base64_data, INGESTION_MAX_UPLOAD_BYTES, field_name=name)
+        # Decoded in chunks straight to disk; the job owns the file
+        path = await asyncio.to_thread(
+            decode_base64_to_temp_file,
+            base64_data,
+            name,
+            INGESTION_MAX_UPLOAD_BYTES,
+            os.path.splitext(name)[1],
+            INGESTION_UPLOAD_DIR,
+        )
+    except Base64TooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid base64 file content")
+
+    try:
+        job = ingestion_jobs.submit(path, name, mime, user_id)
+    except ValueError as e:
+        os.unlink(path)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return _accepted(job)
+
+
+# ────────────────────────────────────────────────
+# JOB STATUS
+# ────────────────────────────────────────────────
+@router.get("/jobs/{job_id}")
+async def get_ingestion_job(job_id: str, request: Request):
+    user_id = require_user(await get_current_user_id(request))
+
+    job = ingestion_jobs.get(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return ingestion_jobs.public(job)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_ingestion_job(job_id: str, request: Request):
+    """
+    ⚡ SSE progress: one event per change (``{"status", "pages_done",
+    "pages_total", "progress": "page 12/80", ...}``) until the job is done
+    or failed.
+    """
+    user_id = require_user(await get_current_user_id(request))
+
+    if ingestion_jobs.get(job_id, user_id) is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+
+    async def generate():
+        async for state in ingestion_jobs.events(job_id):
+            yield f"data: {json.dumps(state)}\n\n"
+        yield f"data: {json.dumps({'done': True})}\n\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
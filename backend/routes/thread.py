@@ -1,11 +1,13 @@
 # backend\routes\thread.py
 
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Any, Dict, List, Optional
 from backend.utils.attachment_extractor import extract_attachment_text
 
+import asyncio
+import json
 import traceback
 import uuid
 from io import BytesIO
@@ -16,11 +18,24 @@ import base64
 # Supabase
 # --------------------------------------------------
 from backend.db.supabase_client import get_supabase
+from backend.db.executor import run_sync
+from backend.db import repository
+from backend.services.context_cache import context_cache, get_thread_context
+from backend.services.turn_pipeline import enqueue_turn
+from backend.services.attachment_pipeline import process_attachments
+from backend.services.document_store import document_store, chunks_to_context
+from backend.services.ingestion_jobs import ingestion_jobs
+from backend.services.long_document_qa import answer_over_long_documents, document_char_budget
 
 # --------------------------------------------------
 # OpenAI services
 # --------------------------------------------------
-from backend.services.openai_agent import run_openai_agent, analyze_image_with_openai
+from backend.services.openai_agent import (
+    run_openai_agent,
+    stream_openai_agent,
+    stabilize_output,
+    analyze_image_with_openai,
+)
 
 # --------------------------------------------------
 # Attachment text extraction (SHARED UTILITY)
@@ -83,7 +98,7 @@ async def get_current_user_id(request: Request) -> Optional[str]:
                     # ✅ FIXED: Properly verify the JWT token
                     try:
                         # Method 1: Try using get_user (some versions support this)
-                        user_response = supabase.auth.get_user(token)
+                        user_response = await run_sync(supabase.auth.get_user, token)
                         
                         # Handle different response formats
                         if hasattr(user_response, 'user') and user_response.user:
@@ -174,36 +189,26 @@ def require_user(user_id: Optional[str]) -> str:
 
 
 async def verify_thread_ownership(
-    supabase,
     thread_id: str,
     user_id: str
 ) -> bool:
     """
     Verify that the authenticated user owns the specified thread.
-    
+
     Args:
-        supabase: Supabase client
         thread_id: Thread ID to check
         user_id: Authenticated user's ID
-    
+
     Returns:
         True if user owns thread, False otherwise
     """
     try:
-        result = (
-            supabase.table("threads")
-            .select("account_id, user_id")
-            .eq("thread_id", thread_id)
-            .limit(1)
-            .execute()
-        )
-        
-        if not result.data:
+        thread_data = await repository.get_thread(thread_id, "account_id, user_id")
+
+        if not thread_data:
             print(f"⚠️ Thread not found: {thread_id}")
             return False
         
-        thread_data = result.data[0]
-        
         # Check both account_id and user_id for compatibility
         thread_owner = thread_data.get("account_id") or thread_data.get("user_id")
         
@@ -252,7 +257,6 @@ async def create_thread(body: ThreadCreate, request: Request):
         
         print(f"🧵 Creating new thread → title={body.title}, user_id={user_id}")
 
-        supabase = get_supabase()
         thread_id = str(uuid.uuid4())
         now = datetime.utcnow().isoformat()
 
@@ -265,9 +269,9 @@ async def create_thread(body: ThreadCreate, request: Request):
             "user_id": user_id,     # ✅ Also set user_id for compatibility
         }
 
-        result = supabase.table("threads").insert(insert_data).execute()
-        
-        if not result.data:
+        inserted = await repository.insert_thread(insert_data)
+
+        if not inserted:
             raise HTTPException(status_code=500, detail="Failed to create thread")
 
         print("🧪 CREATE_THREAD RESPONSE →", {"thread_id": thread_id})
@@ -287,7 +291,13 @@ async def create_thread(body: ThreadCreate, request: Request):
 # GET THREAD MESSAGES (✅ SECURITY ENHANCED)
 # ────────────────────────────────────────────────
 @router.get("/{thread_id}")
-async def get_thread(thread_id: str, request: Request):
+async def get_thread(
+    thread_id: str,
+    request: Request,
+    limit: Optional[int] = None,
+    before: Optional[str] = None,
+    before_id: Optional[str] = None,
+):
     try:
         # ✅ SECURITY: Get authenticated user
         user_id = await get_current_user_id(request)
@@ -301,10 +311,8 @@ async def get_thread(thread_id: str, request: Request):
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid thread ID format")
 
-        supabase = get_supabase()
-        
         # ✅ SECURITY: Verify thread ownership BEFORE accessing data
-        is_owner = await verify_thread_ownership(supabase, thread_id, user_id)
+        is_owner = await verify_thread_ownership(thread_id, user_id)
         if not is_owner:
             raise HTTPException(
                 status_code=403,
@@ -312,16 +320,26 @@ async def get_thread(thread_id: str, request: Request):
             )
 
         # Fetch messages (only after ownership verification!)
-        result = (
-            supabase
-            .table("messages")
-            .select("*")
-            .eq("thread_id", thread_id)
-            .order("created_at", desc=False)
-            .execute()
-        )
-
-        messages = result.data or []
+        # ?limit=N returns the newest N; ?before=<created_at>&before_id=<message_id>
+        # (the oldest row already shown) pages further back
+        if limit is not None or before is not None:
+            if before is not None:
+                # Goes into a PostgREST filter string: accept timestamps only
+                try:
+                    before = datetime.fromisoformat(before).isoformat()
+                except ValueError:
+                    raise HTTPException(status_code=400, detail="Invalid before format")
+            if before_id is not None:
+                try:
+                    uuid.UUID(before_id)
+                except ValueError:
+                    raise HTTPException(status_code=400, detail="Invalid before_id format")
+            messages = await repository.list_recent_messages(
+                thread_id, "*", limit=min(max(limit or 50, 1), 500),
+                before=before, before_id=before_id,
+            )
+        else:
+            messages = await repository.list_messages(thread_id)
         
         print(f"✅ Returned {len(messages)} messages to user {user_id}")
 
@@ -340,442 +358,398 @@ async def get_thread(thread_id: str, request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 # ────────────────────────────────────────────────
-# START AGENT RUN
+# AGENT TURN HELPERS (shared by /agent/start and /agent/stream)
 # ────────────────────────────────────────────────
-@router.post("/{thread_id}/agent/start")
-async def start_agent_run(thread_id: str, request: Request):
-    try:
-        body = await request.json()
-
-        message = (body.get("message") or "").strip()
-        model_name = body.get("model_name", "gpt-4o-mini")
-        agent = body.get("agent", "default")
-        attachments = body.get("attachments", []) or []
-
-        print(f"\n🚀 Agent Start → thread={thread_id}")
-        print(f"💬 User message: {message}")
-        print(f"📎 Attachments received: {len(attachments)}")
-
-        supabase = get_supabase()
-        
-        # ✅ SECURITY: Get authenticated user
-        user_id = await get_current_user_id(request)
-        user_id = require_user(user_id)
-        
-        # ✅ SECURITY: Verify thread ownership BEFORE processing
-        is_owner = await verify_thread_ownership(supabase, thread_id, user_id)
-        if not is_owner:
-            raise HTTPException(
-                status_code=403,
-                detail="Access denied. You do not own this thread."
-            )
-        
-        print(f"✅ User {user_id} verified as owner of thread {thread_id}")
-
-        now = datetime.utcnow().isoformat()
-
-        # ── Save user message ──────────────────────
-        supabase.table("messages").insert(
-            {
-                "thread_id": thread_id,
-                "role": "user",
-                "content": message,
-                "created_at": now,
-            }
-        ).execute()
-
-        # 🔄 Touch thread updated_at
-        supabase.table("threads").update(
-            {"updated_at": now}
-        ).eq("thread_id", thread_id).execute()
-
-        # 🧠 Initialize memory variables (REQUIRED)
-        recent_context = ""
-        mid_summary = None
-        ltm_string = ""
-
-        # MEMORY LOADING FIX FOR THREAD.PY
-# ==================================
-
-# LOCATION: After line 208 (after ltm_string = "")
-# BEFORE: The explicit memory save section (line 210)
+DOCUMENT_ANALYZER_PROMPT = """You are a precise document analyzer. 
+            When asked about documents, provide exact information from the text. 
+            Never invent dates, numbers, or details. 
+            If information is not in the document, say 'Not mentioned in the document'."""
 
-# INSERT THIS CODE BLOCK:
-# ------------------------
 
-        # ──────────────────────────────────────────
-        # 🧠 LOAD SHORT-TERM MEMORY (STM)
-        # ──────────────────────────────────────────
-        try:
-            print("🧠 Loading SHORT-TERM memory...")
-            history_res = (
-                supabase.table("messages")
-                .select("role, content, created_at")
-                .eq("thread_id", thread_id)
-                .order("created_at", desc=False)
-                .limit(60)  # Last 60 messages
-                .execute()
-            )
-            
-            history = history_res.data or []
-            if history:
-                stm_lines = []
-                # ✅ NEW: Initialize document context
-                document_context = ""
-                for msg in history:  # Process ALL messages, not just last 16
-                    role = msg.get("role", "user")
-                    content = (msg.get("content") or "").strip()
-                    
-                    # ✅ Extract document context from system messages
-                    if role == "system" and "[DOCUMENT CONTEXT" in content:
-                        document_context += f"\n{content}\n"
-                        print(f"📄 Found document context: {len(content)} chars")
-                    
-                    # Regular conversation history
-                    if content and role in ["user", "assistant"]:
-                        stm_lines.append(f"{role}: {content}")
-                
-                recent_context = "\n".join(stm_lines)
-                print(f"✅ Loaded {len(stm_lines)} messages into STM")
-        except Exception as e:
-            print(f"⚠️ Failed to load STM: {e}")
+async def _prepare_agent_turn(thread_id: str, request: Request) -> Dict[str, Any]:
+    """
+    Authenticate, load memory, process attachments and build the final
+    prompt for one agent turn. Saves the user message as a side effect.
 
-        # ──────────────────────────────────────────
-        # 🧠 LOAD MID-TERM MEMORY (MTM)
-        # ──────────────────────────────────────────
-        try:
-            print("🧠 Loading MID-TERM memory...")
-            thread_res = (
-                supabase.table("threads")
-                .select("summary, metadata")
-                .eq("thread_id", thread_id)
-                .limit(1)
-                .execute()
-            )
-            
-            if thread_res.data:
-                thread_data = thread_res.data[0]
-                
-                # Try metadata first, then summary
-                metadata = thread_data.get("metadata") or {}
-                if isinstance(metadata, dict):
-                    mid_summary = metadata.get("memory", {}).get("mid_summary")
-                
-                # Fallback to summary field
-                if not mid_summary:
-                    mid_summary = thread_data.get("summary")
-                
-                if mid_summary:
-                    print(f"✅ Loaded MTM: {mid_summary[:50]}...")
-                else:
-                    print("ℹ️ No MTM found for this thread")
-        except Exception as e:
-            print(f"⚠️ Failed to load MTM: {e}")
+    Returns {"user_message", "message", "agent_kwargs"} where
+    ``message`` + ``agent_kwargs`` are the arguments for run_openai_agent /
+    stream_openai_agent.
+    """
+    body = await request.json()
+
+    message = (body.get("message") or "").strip()
+    user_message = message
+    model_name = body.get("model_name", "gpt-4o-mini")
+    agent = body.get("agent", "default")
+    attachments = body.get("attachments", []) or []
+    # Documents already extracted by /api/documents/ingest
+    document_ids = body.get("document_ids", []) or []
+
+    print(f"\n🚀 Agent Start → thread={thread_id}")
+    print(f"💬 User message: {message}")
+    print(f"📎 Attachments received: {len(attachments)} (+{len(document_ids)} ingested)")
+
+    # ✅ SECURITY: Get authenticated user
+    user_id = await get_current_user_id(request)
+    user_id = require_user(user_id)
+
+    # ✅ SECURITY + 🧠 MEMORY: one round trip for ownership, STM, MTM,
+    # LTM and document memories (see load_thread_context migration)
+    context = await get_thread_context(thread_id, user_id)
+    if not context.get("is_owner"):
+        if context.get("found"):
+            print(f"❌ AUTHORIZATION FAILED: User {user_id} does NOT own thread {thread_id} (owner: {context.get('owner')})")
+        else:
+            print(f"⚠️ Thread not found: {thread_id}")
+        raise HTTPException(
+            status_code=403,
+            detail="Access denied. You do not own this thread."
+        )
 
-        # ──────────────────────────────────────────
-        # 🧠 LOAD LONG-TERM MEMORY (LTM)
-        # ──────────────────────────────────────────
+    print(f"✅ User {user_id} verified as owner of thread {thread_id}")
+
+    now = datetime.utcnow().isoformat()
+
+    # ── Save user message + 🔄 touch thread updated_at ──
+    user_row = {
+        "thread_id": thread_id,
+        "role": "user",
+        "content": message,
+        "created_at": now,
+    }
+    await asyncio.gather(
+        repository.insert_messages(user_row),
+        repository.update_thread(thread_id, {"updated_at": now}),
+    )
+    await context_cache.record_message(thread_id, user_row)
+
+    # 🧠 Initialize memory variables (REQUIRED)
+    recent_context = ""
+    mid_summary = None
+    ltm_string = ""
+    document_context = ""
+    legacy_documents = []
+
+    # ──────────────────────────────────────────
+    # 🧠 SHORT-TERM MEMORY (STM)
+    # ──────────────────────────────────────────
+    stm_lines = []
+    for msg in context.get("stm") or []:
+        role = msg.get("role", "user")
+        content = (msg.get("content") or "").strip()
+
+        # ✅ Extract document context from system messages
+        if role == "system" and "[DOCUMENT CONTEXT" in content:
+            document_context += f"\n{content}\n"
+            header, _, body_text = content.partition("\n\n")
+            legacy_documents.append({
+                "name": header.strip("[] ") or "Document context",
+                "text": body_text or content,
+            })
+            print(f"📄 Found document context: {len(content)} chars")
+
+        # Regular conversation history
+        if content and role in ["user", "assistant"]:
+            stm_lines.append(f"{role}: {content}")
+
+    # Context was read before this turn's insert, so add it here
+    if message:
+        stm_lines.append(f"user: {message}")
+
+    recent_context = "\n".join(stm_lines)
+    print(f"✅ Loaded {len(stm_lines)} messages into STM")
+
+    # ──────────────────────────────────────────
+    # 🧠 MID-TERM MEMORY (MTM)
+    # ──────────────────────────────────────────
+    # Try metadata first, then summary
+    metadata = context.get("metadata") or {}
+    if isinstance(metadata, dict):
+        mid_summary = (metadata.get("memory") or {}).get("mid_summary")
+    if not mid_summary:
+        mid_summary = context.get("summary")
+
+    if mid_summary:
+        print(f"✅ Loaded MTM: {mid_summary[:50]}...")
+    else:
+        print("ℹ️ No MTM found for this thread")
+
+    # ──────────────────────────────────────────
+    # 🧠 LONG-TERM MEMORY (LTM)
+    # ──────────────────────────────────────────
+    if context.get("account_id"):
+        ltm_items = context.get("ltm") or []
+        if ltm_items:
+            ltm_lines = ["Long-term facts:"]
+            for item in ltm_items:
+                content = (item.get("content") or "").strip()
+                if content:
+                    ltm_lines.append(f"- {content}")
+
+            ltm_string = "\n".join(ltm_lines)
+            print(f"✅ Loaded {len(ltm_items)} LTM facts")
+        else:
+            print("ℹ️ No LTM found for this user")
+    else:
+        print("ℹ️ No user_id found, skipping LTM")
+
+    document_keywords = ["document", "pdf", "file", "agreement", "contract", "وثيقة", "ملف", "عقد"]
+    is_document_question = any(keyword in message.lower() for keyword in document_keywords)
+
+    # ──────────────────────────────────────────
+    # 📚 DOCUMENT RETRIEVAL (follow-up turns)
+    # ──────────────────────────────────────────
+    # Stored documents are answered from their top-k BM25 chunks instead of
+    # re-sending whole documents / previews every turn
+    retrieved_documents = []
+    documents_indexed = False
+    if not attachments and not document_ids:
         try:
-            print("🧠 Loading LONG-TERM memory...")
-            
-            # Try to get user_id from thread
-            user_id = None
-            thread_info = (
-                supabase.table("threads")
-                .select("account_id")
-                .eq("thread_id", thread_id)
-                .limit(1)
-                .execute()
+            if legacy_documents:
+                # Older threads keep documents as [DOCUMENT CONTEXT] system messages
+                await document_store.add_documents(thread_id, legacy_documents)
+                documents_indexed = True
+
+            chunks = await document_store.search(
+                thread_id,
+                message,
+                fallback_to_latest=is_document_question,
             )
-            
-            if thread_info.data:
-                user_id = thread_info.data[0].get("account_id")
-            
-            if user_id:
-                # Fetch LTM for this user
-                ltm_res = (
-                    supabase.table("long_term_memory")
-                    .select("content, memory_type, importance")
-                    .eq("thread_id", thread_id)
-                    .order("importance", desc=True)
-                    .order("created_at", desc=False)
-                    .limit(10)
-                    .execute()
-                )
-                
-                ltm_items = ltm_res.data or []
-                if ltm_items:
-                    ltm_lines = ["Long-term facts:"]
-                    for item in ltm_items:
-                        content = item.get("content", "").strip()
-                        if content:
-                            ltm_lines.append(f"- {content}")
-                    
-                    ltm_string = "\n".join(ltm_lines)
-                    print(f"✅ Loaded {len(ltm_items)} LTM facts")
-                else:
-                    print("ℹ️ No LTM found for this user")
-            else:
-                print("ℹ️ No user_id found, skipping LTM")
+            if chunks:
+                retrieved_documents = chunks_to_context(chunks)
+                print(f"📚 Retrieved {len(chunks)} document chunks for this question")
         except Exception as e:
-            print(f"⚠️ Failed to load LTM: {e}")
-
-        # ──────────────────────────────────────────
-        # 📄 Check if question is about a document
-        # ──────────────────────────────────────────
-        document_keywords = ["document", "pdf", "file", "agreement", "contract", "وثيقة", "ملف", "عقد"]
-        if any(keyword in message.lower() for keyword in document_keywords):
-            try:
-                print("📄 Document-related query detected, loading document memories...")
-                
-                doc_ltm_res = (
-                    supabase.table("long_term_memory")
-                    .select("content")
-                    .eq("thread_id", thread_id)
-                    .eq("memory_type", "document")
-                    .order("created_at", desc=False)
-                    .limit(3)  # Last 3 documents
-                    .execute()
-                )
-                
-                if doc_ltm_res.data:
-                    doc_memories = [item.get("content", "") for item in doc_ltm_res.data]
-                    
-                    # Add to LTM string
-                    if ltm_string:
-                        ltm_string += "\n\nRecent Documents:\n"
-                    else:
-                        ltm_string = "Recent Documents:\n"
-                    
-                    for doc in doc_memories:
-                        ltm_string += f"\n{doc}\n"
-                    
-                    print(f"✅ Added {len(doc_memories)} document memories to context")
-                    
-            except Exception as e:
-                print(f"⚠️ Failed to load document memories: {e}")
-
-# HOW TO APPLY:
-# -------------
-# 1. Open thread.py
-# 2. Find line 208: ltm_string = ""
-# 3. Add a blank line after it
-# 4. Paste the entire code block above
-# 5. Keep the existing "EXPLICIT MEMORY SAVE" section after this
-
-# BEFORE:
-# -------
-#         ltm_string = ""
-#
-#         # ──────────────────────────────────────────
-#         # 🧠 EXPLICIT MEMORY SAVE ("remember this")
+            print(f"⚠️ Document retrieval failed: {e}")
 
-# AFTER:
-# ------
-#         ltm_string = ""
-#
-#         # [PASTE THE MEMORY LOADING CODE HERE]
-#
-#         # ──────────────────────────────────────────
-#         # 🧠 EXPLICIT MEMORY SAVE ("remember this")
+    # ──────────────────────────────────────────
+    # 📄 Check if question is about a document
+    # ──────────────────────────────────────────
+    if is_document_question and not retrieved_documents:
+        doc_memories = [item.get("content", "") for item in context.get("documents") or []]
 
-        # ──────────────────────────────────────────
-        # 🧠 EXPLICIT MEMORY SAVE ("remember this")
-        # ──────────────────────────────────────────
-        memory_triggers = [
-            "remember this",
-            "please remember",
-            "save this",
-            "add to memory",
-        ]
+        if doc_memories:
+            print("📄 Document-related query detected, adding document memories...")
 
-        lower_msg = message.lower()
+            # Add to LTM string
+            if ltm_string:
+                ltm_string += "\n\nRecent Documents:\n"
+            else:
+                ltm_string = "Recent Documents:\n"
 
-        if any(trigger in lower_msg for trigger in memory_triggers):
-            try:
-                memory_text = message
-                for t in memory_triggers:
-                    memory_text = memory_text.replace(t, "", 1)
-                    memory_text = memory_text.replace(t.capitalize(), "", 1)
+            for doc in doc_memories:
+                ltm_string += f"\n{doc}\n"
 
-                memory_text = memory_text.strip(" .:\n")
+            print(f"✅ Added {len(doc_memories)} document memories to context")
 
-                if memory_text:
-                    supabase.table("long_term_memory").insert({
-                        "thread_id": thread_id,
-                        "memory_type": "explicit_user_memory",
-                        "content": memory_text,
-                        "importance": 9,
-                        "created_at": now,
-                    }).execute()
+    # ──────────────────────────────────────────
+    # 🧠 EXPLICIT MEMORY SAVE ("remember this")
+    # ──────────────────────────────────────────
+    memory_triggers = [
+        "remember this",
+        "please remember",
+        "save this",
+        "add to memory",
+    ]
 
-                    print("🧠 Saved explicit long-term memory:", memory_text)
+    lower_msg = message.lower()
 
-            except Exception as e:
-                print("⚠️ Failed to save memory:", e)
+    if any(trigger in lower_msg for trigger in memory_triggers):
+        try:
+            memory_text = message
+            for t in memory_triggers:
+                memory_text = memory_text.replace(t, "", 1)
+                memory_text = memory_text.replace(t.capitalize(), "", 1)
+
+            memory_text = memory_text.strip(" .:\n")
+
+            if memory_text:
+                memory_row = {
+                    "thread_id": thread_id,
+                    "memory_type": "explicit_user_memory",
+                    "content": memory_text,
+                    "importance": 9,
+                    "created_at": now,
+                }
+                await repository.insert_long_term_memory(memory_row)
+                await context_cache.record_long_term_memory(thread_id, memory_row)
 
+                print("🧠 Saved explicit long-term memory:", memory_text)
 
-        # ──────────────────────────────────────────
-        # ✅ PROCESS ATTACHMENTS (OCR + VISION)
-        # ──────────────────────────────────────────
-        ocr_metadata = []
-        vision_metadata = []
+        except Exception as e:
+            print("⚠️ Failed to save memory:", e)
+
+
+    # ──────────────────────────────────────────
+    # ✅ PROCESS ATTACHMENTS (OCR + VISION)
+    # ──────────────────────────────────────────
+    ocr_metadata = []
+    vision_metadata = []
+
+    # Process attachments if present (PDFs + images concurrently)
+    # Extraction stops at what this turn can spend tokens on: the prompt
+    # budget, or what long-document mode's map step reads
+    max_document_chars = document_char_budget(model_name)
+    attachment_results, ingested_results = await asyncio.gather(
+        process_attachments(
+            attachments,
+            vision_prompt="Describe this image in detail. What do you see? Include any text, objects, people, colors, and overall context.",
+            max_chars=max_document_chars,
+        ),
+        ingestion_jobs.resolve_documents(document_ids, user_id, max_chars=max_document_chars),
+    )
+
+    document_rows = []
+    for result in attachment_results + ingested_results:
+        file_name = result["name"]
+
+        # -------------------------
+        # PDFs (text extraction)
+        # -------------------------
+        if result["kind"] == "pdf":
+            extracted_text = result.get("text")
+            if not extracted_text:
+                continue
+
+            ocr_metadata.append({
+                "name": file_name,
+                "text": extracted_text,
+            })
 
-        # Process attachments if present
-        if attachments:
-            print(f"🔍 Processing {len(attachments)} attachments...")
+            # ──────────────────────────────────────────
+            # 💾 Save PDF content to Long-Term Memory
+            # ──────────────────────────────────────────
+            # Create a summary of the PDF for LTM
+            pdf_summary = f"Document: {file_name}\n"
+            pdf_summary += f"Type: PDF\n"
+            pdf_summary += f"Size: {len(extracted_text)} characters\n"
 
-            for idx, file in enumerate(attachments):
-                mime = file.get("type", "") or ""
-                base64_data = file.get("base64")
-                file_name = file.get("name", f"file_{idx}")
+            # Save first 2000 chars as preview
+            preview = extracted_text[:2000]
+            if len(extracted_text) > 2000:
+                preview += f"\n\n[... {len(extracted_text) - 2000} more characters ...]"
 
-                # -------------------------
-                # Handle PDFs with OCR
-                # -------------------------
-                if mime == "application/pdf" and base64_data:
-                    print(f"📄 OCR processing PDF: {file_name}")
-                    try:
-                        # Extract base64 content
-                        if base64_data.startswith("data:"):
-                            base64_content = base64_data.split(",", 1)[1]
-                        else:
-                            base64_content = base64_data
-
-                        pdf_bytes = base64.b64decode(base64_content)
-                        extracted_text = extract_attachment_text(BytesIO(pdf_bytes))
-
-                        if extracted_text:
-                            ocr_metadata.append({
-                                "name": file_name,
-                                "text": extracted_text,
-                            })
-                            print(f"✅ OCR extracted {len(extracted_text)} chars from {file_name}")
-                            # ──────────────────────────────────────────
-                            # 💾 Save PDF content to Long-Term Memory
-                            # ──────────────────────────────────────────
-                            try:
-                                # Create a summary of the PDF for LTM
-                                pdf_summary = f"Document: {file_name}\n"
-                                pdf_summary += f"Type: PDF\n"
-                                pdf_summary += f"Size: {len(extracted_text)} characters\n"
-                                
-                                # Save first 2000 chars as preview
-                                preview = extracted_text[:2000]
-                                if len(extracted_text) > 2000:
-                                    preview += f"\n\n[... {len(extracted_text) - 2000} more characters ...]"
-                                
-                                pdf_summary += f"Content Preview:\n{preview}"
-                                
-                                # Save to LTM
-                                supabase.table("long_term_memory").insert({
-                                    "thread_id": thread_id,
-                                    "memory_type": "document",
-                                    "content": pdf_summary,
-                                    "importance": 8,  # High importance
-                                    "created_at": now,
-                                }).execute()
-                                
-                                print(f"💾 Saved PDF content to Long-Term Memory: {file_name}")
-                                
-                            except Exception as e:
-                                print(f"⚠️ Failed to save PDF to LTM: {e}")
+            pdf_summary += f"Content Preview:\n{preview}"
 
-                    except Exception as e:
-                        print(f"❌ OCR failed for {file_name}: {e}")
+            document_rows.append({
+                "thread_id": thread_id,
+                "memory_type": "document",
+                "content": pdf_summary,
+                "importance": 8,  # High importance
+                "created_at": now,
+            })
 
-                # ──────────────────────────────────────────
-                # ✅ Handle images with OpenAI Vision
-                # ──────────────────────────────────────────
-                elif mime.startswith("image") and base64_data:
-                    print(f"📸 Vision analyzing image: {file_name}")
-                    try:
-                        # Ensure proper base64 format
-                        if base64_data.startswith("data:"):
-                            base64_content = base64_data  # Keep data URI for OpenAI
-                        else:
-                            # Add data URI prefix if missing
-                            base64_content = f"data:{mime};base64,{base64_data}"
-                        
-                        # Actually analyze the image using OpenAI Vision
-                        description = await analyze_image_with_openai(
-                            base64_content,
-                            mime_type=mime,
-                            prompt="Describe this image in detail. What do you see? Include any text, objects, people, colors, and overall context."
-                        )
-                        
-                        vision_metadata.append({
-                            "name": file_name,
-                            "description": description,
-                        })
-                        print(f"✅ Vision analyzed {file_name}")
-                        print(f"📝 Description preview: {description[:100]}...")
-                        
-                    except Exception as e:
-                        print(f"❌ Vision failed for {file_name}: {e}")
-                        # Fallback to basic metadata
-                        vision_metadata.append({
-                            "name": file_name,
-                            "description": f"Image file: {file_name}",
-                        })
-        
         # ──────────────────────────────────────────
-        # 📄 Inject OCR text into prompt (OpenAI)
+        # ✅ Images (OpenAI Vision)
         # ──────────────────────────────────────────
-        if ocr_metadata:
-            print(f"📄 Injecting OCR text into prompt ({len(ocr_metadata)} docs)")
-            blocks = []
-            for doc in ocr_metadata:
-                blocks.append(
-                    f"OCR_EXTRACT — {doc['name']}:\n{doc.get('text', '')}"
-                )
-            message += "\n\n" + "\n\n".join(blocks)
-
-        # Force OpenAI model if anything legacy is sent
-        if model_name.startswith("gemini"):
-            model_name = "gpt-4o-mini"
+        else:
+            description = result.get("description")
+            if result.get("error") or not description:
+                # Fallback to basic metadata
+                description = f"Image file: {file_name}"
+
+            vision_metadata.append({
+                "name": file_name,
+                "description": description,
+            })
 
-        # ──────────────────────────────────────────
-        # 🤖 RUN OPENAI AGENT (WITH MEMORY + FILES)
-        # ──────────────────────────────────────────
-        print(f"🤖 Running OpenAI agent: model={model_name}")
-        print(
-            f"🧠 MEMORY: "
-            f"STM={'yes' if recent_context else 'no'}, "
-            f"MTM={'yes' if mid_summary else 'no'}, "
-            f"LTM={'yes' if ltm_string else 'no'}, "
-            f"OCR={len(ocr_metadata)}, "
-            f"Vision={len(vision_metadata)}"
-        )
+    if document_rows:
+        try:
+            # One insert for all documents of this turn
+            await repository.insert_long_term_memory(document_rows)
+            for document_row in document_rows:
+                await context_cache.record_long_term_memory(thread_id, document_row)
+            print(f"💾 Saved {len(document_rows)} PDF(s) to Long-Term Memory")
+        except Exception as e:
+            print(f"⚠️ Failed to save PDF to LTM: {e}")
 
-        # ✅ Enhance message with document context
-        enhanced_message = message
-        if document_context:
-            print(f"📄 Including document context in AI request ({len(document_context)} chars)")
-            enhanced_message = f"""You have access to the following document that was previously uploaded in this conversation. Use ONLY the exact information from this document to answer questions. Do not make up dates, numbers, or any other details.
+    if ocr_metadata:
+        try:
+            # Chunked + indexed for retrieval on follow-up turns
+            await document_store.add_documents(thread_id, ocr_metadata)
+        except Exception as e:
+            print(f"⚠️ Failed to store document chunks: {e}")
+
+    # ──────────────────────────────────────────
+    # 🗺️ LONG DOCUMENTS (map-reduce)
+    # ──────────────────────────────────────────
+    # Documents too large for the prompt are read in parallel parts; the
+    # partial answers replace their text and the agent reduces them
+    if ocr_metadata:
+        try:
+            ocr_metadata = await answer_over_long_documents(user_message, ocr_metadata, model_name)
+        except Exception as e:
+            print(f"⚠️ Long-document mode failed: {e}")
+
+    # ──────────────────────────────────────────
+    # 📄 Inject OCR text into prompt (OpenAI)
+    # ──────────────────────────────────────────
+    if ocr_metadata:
+        print(f"📄 Injecting OCR text into prompt ({len(ocr_metadata)} docs)")
+        blocks = []
+        for doc in ocr_metadata:
+            blocks.append(
+                f"OCR_EXTRACT — {doc['name']}:\n{doc.get('text', '')}"
+            )
+        message += "\n\n" + "\n\n".join(blocks)
+
+    # Force OpenAI model if anything legacy is sent
+    if model_name.startswith("gemini"):
+        model_name = "gpt-4o-mini"
+
+    # ──────────────────────────────────────────
+    # 🤖 RUN OPENAI AGENT (WITH MEMORY + FILES)
+    # ──────────────────────────────────────────
+    print(f"🤖 Running OpenAI agent: model={model_name}")
+    print(
+        f"🧠 MEMORY: "
+        f"STM={'yes' if recent_context else 'no'}, "
+        f"MTM={'yes' if mid_summary else 'no'}, "
+        f"LTM={'yes' if ltm_string else 'no'}, "
+        f"OCR={len(ocr_metadata)}, "
+        f"Docs={len(retrieved_documents)}, "
+        f"Vision={len(vision_metadata)}"
+    )
+
+    # ✅ Enhance message with document context
+    # (once indexed, the retrieved excerpts replace the full document)
+    enhanced_message = message
+    if document_context and not documents_indexed:
+        print(f"📄 Including document context in AI request ({len(document_context)} chars)")
+        enhanced_message = f"""You have access to the following document that was previously uploaded in this conversation. Use ONLY the exact information from this document to answer questions. Do not make up dates, numbers, or any other details.
 
         {document_context}
 
         Based ONLY on the above document, answer this question accurately:
         {message}"""
-        else:
-            print(f"ℹ️ No document context found")
-
-        raw_result = await run_openai_agent(
-            enhanced_message,
-            ocr=ocr_metadata,
-            vision=vision_metadata,
-            conversation=recent_context,
-            mid_summary=mid_summary,
-            long_term_memory=ltm_string,
-            model_name=model_name,
-            agent=agent,
+    else:
+        print(f"ℹ️ No document context found")
+
+    return {
+        "user_message": user_message,
+        "message": enhanced_message,
+        "agent_kwargs": {
+            "ocr": ocr_metadata + retrieved_documents,
+            "vision": vision_metadata,
+            "conversation": recent_context,
+            "mid_summary": mid_summary,
+            "long_term_memory": ltm_string,
+            "model_name": model_name,
+            "agent": agent,
             # ✅ Injecting a strict personality for document reliability
-            system_prompt="""You are a precise document analyzer. 
-            When asked about documents, provide exact information from the text. 
-            Never invent dates, numbers, or details. 
-            If information is not in the document, say 'Not mentioned in the document'."""
-        )
+            "system_prompt": DOCUMENT_ANALYZER_PROMPT,
+        },
+    }
+
+
+# ────────────────────────────────────────────────
+# START AGENT RUN
+# ────────────────────────────────────────────────
+@router.post("/{thread_id}/agent/start")
+async def start_agent_run(thread_id: str, request: Request):
+    try:
+        turn = await _prepare_agent_turn(thread_id, request)
+
+        raw_result = await run_openai_agent(turn["message"], **turn["agent_kwargs"])
 
         # ──────────────────────────────────────────
         # ✅ NORMALIZE RESPONSE
@@ -796,33 +770,8 @@ async def start_agent_run(thread_id: str, request: Request):
         if not agent_reply or not isinstance(agent_reply, str):
             agent_reply = "I’m sorry — I couldn’t generate a response this time."
 
-        # ──────────────────────────────────────────
-        # ✅ SAVE ASSISTANT MESSAGE
-        # ──────────────────────────────────────────
-        supabase.table("messages").insert(
-            {
-                "thread_id": thread_id,
-                "role": "assistant",
-                "content": agent_reply,
-                "created_at": datetime.utcnow().isoformat(),
-            }
-        ).execute()
-
-        # ──────────────────────────────────────────
-        # ✅ AUTO-TITLE THREAD
-        # ──────────────────────────────────────────
-        short_title = (message or "Conversation")[:40]
-        if len(message) > 40:
-            short_title += "…"
-
-        supabase.table("threads").update(
-            {
-                "title": short_title,
-                "updated_at": datetime.utcnow().isoformat(),
-            }
-        ).eq("thread_id", thread_id).execute()
-
-        print(f"🧾 Auto-titled thread → {short_title}")
+        # Assistant row is saved now; title, summaries and memory run off the request path
+        await enqueue_turn(thread_id, turn["user_message"], agent_reply)
 
         # ──────────────────────────────────────────
         # ✅ FINAL RESPONSE (FRONTEND SAFE)
@@ -837,6 +786,8 @@ async def start_agent_run(thread_id: str, request: Request):
             }
         )
 
+    except HTTPException:
+        raise  # Re-raise authentication/authorization errors
     except Exception as e:
         print("❌ agent/start error:", e)
         traceback.print_exc()
@@ -1725,6 +1676,64 @@ Latest update:
         )
 
 
+# ────────────────────────────────────────────────
+# STREAM AGENT RUN (SSE)
+# ────────────────────────────────────────────────
+@router.post("/{thread_id}/agent/stream")
+async def stream_agent_run(thread_id: str, request: Request):
+    """
+    ⚡ STREAMING variant of /agent/start.
+    Same memory / OCR / vision assembly, but the reply is sent as SSE
+    deltas while the model generates it. The assistant message is saved
+    once the stream closes.
+    """
+    try:
+        turn = await _prepare_agent_turn(thread_id, request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print("❌ agent/stream setup error:", e)
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def generate():
+        parts: List[str] = []
+        saved = False
+        try:
+            async for delta in stream_openai_agent(turn["message"], **turn["agent_kwargs"]):
+                parts.append(delta)
+                yield f"data: {json.dumps({'content': delta})}\n\n"
+
+            agent_reply = stabilize_output("".join(parts))
+            saved = True
+            await enqueue_turn(thread_id, turn["user_message"], agent_reply)
+
+            yield f"data: {json.dumps({'done': True, 'assistant_reply': agent_reply})}\n\n"
+
+        except Exception as e:
+            print(f"❌ Streaming error: {e}")
+            traceback.print_exc()
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+
+        finally:
+            # Client went away mid-stream: keep what was generated. The
+            # response is being torn down, so save from a detached task
+            if not saved and parts:
+                asyncio.create_task(
+                    enqueue_turn(thread_id, turn["user_message"], stabilize_output("".join(parts)))
+                )
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 # ────────────────────────────────────────────────
 # TRIPLET ENDPOINT (✅ SECURITY ENHANCED + VERDICT)
 # ────────────────────────────────────────────────
@@ -1753,8 +1762,6 @@ async def triplet_comparison(request: Request):
         print(f"💬 Triplet message: {message}")
         print(f"🤖 Models requested: {models}")
         
-        results = {}
-        
         # ═══════════════════════════════════════════════════════════
         # HELPER FUNCTION - Extract text from any response format
         # ═══════════════════════════════════════════════════════════
@@ -1777,7 +1784,7 @@ async def triplet_comparison(request: Request):
         # ═══════════════════════════════════════════════════════════
         # OPENAI
         # ═══════════════════════════════════════════════════════════
-        if "openai" in models:
+        async def run_openai() -> str:
             try:
                 print("🟢 Running OpenAI...")
                 
@@ -1792,216 +1799,213 @@ async def triplet_comparison(request: Request):
                     long_term_memory="",
                 )
                 
-                results["openai"] = extract_text(openai_result)
-                print(f"✅ OpenAI completed: {len(results['openai'])} chars")
+                text = extract_text(openai_result)
+                print(f"✅ OpenAI completed: {len(text)} chars")
+                return text
                 
             except Exception as e:
                 error_msg = str(e)
                 print(f"❌ OpenAI failed: {error_msg}")
-                results["openai"] = f"OpenAI Error: {error_msg[:300]}"
+                return f"OpenAI Error: {error_msg[:300]}"
         
         # ═══════════════════════════════════════════════════════════
         # DEEPSEEK - With multiple fallback strategies
         # ═══════════════════════════════════════════════════════════
-        if "deepseek" in models:
-            deepseek_success = False
-            
+        async def run_deepseek() -> str:
             # STRATEGY 1: Try importing and using DeepSeek service
-            if not deepseek_success:
-                try:
-                    print("🔵 Trying DeepSeek service import...")
-                    from backend.services.deepseek import run_deepseek_agent
-                    
-                    deepseek_result = await run_deepseek_agent(
-                        message,
-                        model_name="deepseek-chat",
-                        agent="default",
-                        ocr=[],
-                        vision=[],
-                        conversation="",
-                        mid_summary=None,
-                        long_term_memory="",
-                    )
-                    
-                    results["deepseek"] = extract_text(deepseek_result)
-                    deepseek_success = True
-                    print(f"✅ DeepSeek completed: {len(results['deepseek'])} chars")
-                    
-                except ImportError as e:
-                    print(f"⚠️ DeepSeek service not found: {e}")
-                except Exception as e:
-                    print(f"❌ DeepSeek service error: {str(e)[:200]}")
+            try:
+                print("🔵 Trying DeepSeek service import...")
+                from backend.services.deepseek import run_deepseek_agent
+                
+                deepseek_result = await run_deepseek_agent(
+                    message,
+                    model_name="deepseek-chat",
+                    agent="default",
+                    ocr=[],
+                    vision=[],
+                    conversation="",
+                    mid_summary=None,
+                    long_term_memory="",
+                )
+                
+                text = extract_text(deepseek_result)
+                print(f"✅ DeepSeek completed: {len(text)} chars")
+                return text
+                
+            except ImportError as e:
+                print(f"⚠️ DeepSeek service not found: {e}")
+            except Exception as e:
+                print(f"❌ DeepSeek service error: {str(e)[:200]}")
             
             # STRATEGY 2: Try direct API call
-            if not deepseek_success:
-                try:
-                    print("🔵 Trying direct DeepSeek API call...")
-                    import os
-                    import httpx
-                    
-                    deepseek_key = os.getenv("DEEPSEEK_API_KEY")
-                    
-                    if deepseek_key:
-                        async with httpx.AsyncClient(timeout=30.0) as client:
-                            response = await client.post(
-                                "https://api.deepseek.com/v1/chat/completions",
-                                headers={
-                                    "Authorization": f"Bearer {deepseek_key}",
-                                    "Content-Type": "application/json",
-                                },
-                                json={
-                                    "model": "deepseek-chat",
-                                    "messages": [{"role": "user", "content": message}],
-                                    "temperature": 0.7,
-                                    "max_tokens": 1000,
-                                },
-                            )
-                            
-                            data = response.json()
-                            results["deepseek"] = data["choices"][0]["message"]["content"]
-                            deepseek_success = True
-                            print(f"✅ DeepSeek API completed: {len(results['deepseek'])} chars")
-                    
-                except Exception as e:
-                    print(f"❌ DeepSeek direct API error: {str(e)[:200]}")
+            try:
+                print("🔵 Trying direct DeepSeek API call...")
+                import os
+                import httpx
+                
+                deepseek_key = os.getenv("DEEPSEEK_API_KEY")
+                
+                if deepseek_key:
+                    async with httpx.AsyncClient(timeout=30.0) as client:
+                        response = await client.post(
+                            "https://api.deepseek.com/v1/chat/completions",
+                            headers={
+                                "Authorization": f"Bearer {deepseek_key}",
+                                "Content-Type": "application/json",
+                            },
+                            json={
+                                "model": "deepseek-chat",
+                                "messages": [{"role": "user", "content": message}],
+                                "temperature": 0.7,
+                                "max_tokens": 1000,
+                            },
+                        )
+                        
+                        data = response.json()
+                        text = data["choices"][0]["message"]["content"]
+                        print(f"✅ DeepSeek API completed: {len(text)} chars")
+                        return text
+                
+            except Exception as e:
+                print(f"❌ DeepSeek direct API error: {str(e)[:200]}")
             
             # STRATEGY 3: Fallback to OpenAI
-            if not deepseek_success:
-                try:
-                    print("🟠 Using OpenAI as DeepSeek fallback...")
-                    
-                    fallback_result = await run_openai_agent(
-                        message,
-                        model_name="gpt-4o-mini",
-                        agent="default",
-                        ocr=[],
-                        vision=[],
-                        conversation="",
-                        mid_summary=None,
-                        long_term_memory="",
-                    )
-                    
-                    results["deepseek"] = "[Using OpenAI as fallback - DeepSeek not configured]\n\n" + extract_text(fallback_result)
-                    print(f"✅ DeepSeek (fallback) completed: {len(results['deepseek'])} chars")
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    print(f"❌ DeepSeek fallback failed: {error_msg}")
-                    results["deepseek"] = f"DeepSeek Error: {error_msg[:300]}"
+            try:
+                print("🟠 Using OpenAI as DeepSeek fallback...")
+                
+                fallback_result = await run_openai_agent(
+                    message,
+                    model_name="gpt-4o-mini",
+                    agent="default",
+                    ocr=[],
+                    vision=[],
+                    conversation="",
+                    mid_summary=None,
+                    long_term_memory="",
+                )
+                
+                text = "[Using OpenAI as fallback - DeepSeek not configured]\n\n" + extract_text(fallback_result)
+                print(f"✅ DeepSeek (fallback) completed: {len(text)} chars")
+                return text
+                
+            except Exception as e:
+                error_msg = str(e)
+                print(f"❌ DeepSeek fallback failed: {error_msg}")
+                return f"DeepSeek Error: {error_msg[:300]}"
         
         # ═══════════════════════════════════════════════════════════
         # CLAUDE - With multiple fallback strategies
         # ═══════════════════════════════════════════════════════════
-        if "claude" in models:
-            claude_success = False
-            
+        async def run_claude() -> str:
             # STRATEGY 1: Try importing and using Claude service
-            if not claude_success:
-                try:
-                    print("🟠 Trying Claude service import...")
-                    from backend.services.claude import run_claude_agent
-                    
-                    claude_result = await run_claude_agent(
-                        message,
-                        model_name="claude-sonnet-4-20250514",
-                        agent="default",
-                        ocr=[],
-                        vision=[],
-                        conversation="",
-                        mid_summary=None,
-                        long_term_memory="",
-                    )
-                    
-                    results["claude"] = extract_text(claude_result)
-                    claude_success = True
-                    print(f"✅ Claude completed: {len(results['claude'])} chars")
-                    
-                except ImportError as e:
-                    print(f"⚠️ Claude service not found: {e}")
-                except Exception as e:
-                    print(f"❌ Claude service error: {str(e)[:200]}")
+            try:
+                print("🟠 Trying Claude service import...")
+                from backend.services.claude import run_claude_agent
+                
+                claude_result = await run_claude_agent(
+                    message,
+                    model_name="claude-sonnet-4-20250514",
+                    agent="default",
+                    ocr=[],
+                    vision=[],
+                    conversation="",
+                    mid_summary=None,
+                    long_term_memory="",
+                )
+                
+                text = extract_text(claude_result)
+                print(f"✅ Claude completed: {len(text)} chars")
+                return text
+                
+            except ImportError as e:
+                print(f"⚠️ Claude service not found: {e}")
+            except Exception as e:
+                print(f"❌ Claude service error: {str(e)[:200]}")
             
             # STRATEGY 2: Try direct API call with Anthropic SDK (with retry logic)
-            if not claude_success:
-                try:
-                    print("🟠 Trying direct Claude API call...")
-                    import os
-                    import asyncio
-                    from anthropic import AsyncAnthropic
-                    
-                    claude_key = os.getenv("ANTHROPIC_API_KEY")
-                    
-                    if claude_key:
-                        client = AsyncAnthropic(api_key=claude_key)
-                        
-                        # ✅ RETRY LOGIC for 529 overload errors
-                        max_retries = 3
-                        retry_delay = 2
-                        
-                        for attempt in range(max_retries):
-                            try:
-                                if attempt > 0:
-                                    print(f"   Retry attempt {attempt + 1}/{max_retries}...")
-                                
-                                response = await client.messages.create(
-                                    model="claude-sonnet-4-20250514",
-                                    max_tokens=1024,
-                                    messages=[{"role": "user", "content": message}]
-                                )
-                                
-                                results["claude"] = response.content[0].text
-                                claude_success = True
-                                print(f"✅ Claude API completed: {len(results['claude'])} chars")
-                                break
-                                
-                            except Exception as retry_error:
-                                error_str = str(retry_error)
-                                
-                                # Check for 529 overload error
-                                if ("529" in error_str or "overloaded" in error_str.lower()) and attempt < max_retries - 1:
-                                    wait_time = retry_delay * (2 ** attempt)
-                                    print(f"⚠️ Claude overloaded (529), waiting {wait_time}s before retry...")
-                                    await asyncio.sleep(wait_time)
-                                    continue
-                                else:
-                                    # Last attempt or non-retryable error
-                                    raise retry_error
-                    else:
-                        print("⚠️ No ANTHROPIC_API_KEY found in environment")
+            try:
+                print("🟠 Trying direct Claude API call...")
+                import os
+                from anthropic import AsyncAnthropic
+                
+                claude_key = os.getenv("ANTHROPIC_API_KEY")
+                
+                if claude_key:
+                    client = AsyncAnthropic(api_key=claude_key)
                     
-                except Exception as e:
-                    error_msg = str(e)
-                    print(f"❌ Claude API error: {error_msg[:200]}")
+                    # ✅ RETRY LOGIC for 529 overload errors
+                    max_retries = 3
+                    retry_delay = 2
                     
-                    # User-friendly error messages
-                    if "529" in error_msg or "overloaded" in error_msg.lower():
-                        results["claude"] = "⏳ Claude API is experiencing high traffic. Please try again in a moment."
-                    elif "401" in error_msg or "authentication" in error_msg.lower():
-                        results["claude"] = "🔑 Claude API authentication failed. Please check your ANTHROPIC_API_KEY."
+                    for attempt in range(max_retries):
+                        try:
+                            if attempt > 0:
+                                print(f"   Retry attempt {attempt + 1}/{max_retries}...")
+                            
+                            response = await client.messages.create(
+                                model="claude-sonnet-4-20250514",
+                                max_tokens=1024,
+                                messages=[{"role": "user", "content": message}]
+                            )
+                            
+                            text = response.content[0].text
+                            print(f"✅ Claude API completed: {len(text)} chars")
+                            return text
+                            
+                        except Exception as retry_error:
+                            error_str = str(retry_error)
+                            
+                            # Check for 529 overload error
+                            if ("529" in error_str or "overloaded" in error_str.lower()) and attempt < max_retries - 1:
+                                wait_time = retry_delay * (2 ** attempt)
+                                print(f"⚠️ Claude overloaded (529), waiting {wait_time}s before retry...")
+                                await asyncio.sleep(wait_time)
+                                continue
+                            else:
+                                # Last attempt or non-retryable error
+                                raise retry_error
+                else:
+                    print("⚠️ No ANTHROPIC_API_KEY found in environment")
+                
+            except Exception as e:
+                print(f"❌ Claude API error: {str(e)[:200]}")
             
             # STRATEGY 3: Fallback to OpenAI
-            if not claude_success:
-                try:
-                    print("🟠 Using OpenAI as Claude fallback...")
-                    
-                    fallback_result = await run_openai_agent(
-                        message,
-                        model_name="gpt-4o-mini",
-                        agent="default",
-                        ocr=[],
-                        vision=[],
-                        conversation="",
-                        mid_summary=None,
-                        long_term_memory="",
-                    )
-                    
-                    results["claude"] = "[Using OpenAI as fallback - Claude temporarily unavailable]\n\n" + extract_text(fallback_result)
-                    print(f"✅ Claude (fallback) completed: {len(results['claude'])} chars")
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    print(f"❌ Claude fallback failed: {error_msg}")
-                    results["claude"] = f"❌ All Claude strategies failed: {error_msg[:250]}"
+            try:
+                print("🟠 Using OpenAI as Claude fallback...")
+                
+                fallback_result = await run_openai_agent(
+                    message,
+                    model_name="gpt-4o-mini",
+                    agent="default",
+                    ocr=[],
+                    vision=[],
+                    conversation="",
+                    mid_summary=None,
+                    long_term_memory="",
+                )
+                
+                text = "[Using OpenAI as fallback - Claude temporarily unavailable]\n\n" + extract_text(fallback_result)
+                print(f"✅ Claude (fallback) completed: {len(text)} chars")
+                return text
+                
+            except Exception as e:
+                error_msg = str(e)
+                print(f"❌ Claude fallback failed: {error_msg}")
+                return f"❌ All Claude strategies failed: {error_msg[:250]}"
+        
+        # ═══════════════════════════════════════════════════════════
+        # RUN REQUESTED MODELS CONCURRENTLY
+        # ═══════════════════════════════════════════════════════════
+        # Each provider's fallback chain runs inside its own task, so the
+        # slowest provider (not the sum of all of them) sets the latency
+        runners = {"openai": run_openai, "deepseek": run_deepseek, "claude": run_claude}
+        selected = [name for name in runners if name in models]
+        
+        started = asyncio.get_event_loop().time()
+        responses = await asyncio.gather(*(runners[name]() for name in selected))
+        results = dict(zip(selected, responses))
+        print(f"⚡ Models: {asyncio.get_event_loop().time() - started:.1f}s")
         
         # ═══════════════════════════════════════════════════════════ #
         # LOG COMPLETION STATUS
@@ -1,16 +1,15 @@
 # backend/routes/triplet.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
-from io import BytesIO
-import base64
 import asyncio
 import json
 
-from backend.utils.attachment_extractor import extract_attachment_text
-from backend.services.openai_agent import analyze_image_with_openai
+from backend.routes.thread import get_current_user_id, require_user
+from backend.services.attachment_pipeline import ATTACHMENT_TEXT_MAX_CHARS, process_attachments
+from backend.services.ingestion_jobs import ingestion_jobs
 from ..services.triplet_engine import run_triplet_streaming
 
 router = APIRouter()
@@ -19,12 +18,19 @@ router = APIRouter()
 class TripletRequest(BaseModel):
     prompt: str
     attachments: Optional[List[Dict[str, Any]]] = []
+    # job_ids from /api/documents/ingest
+    document_ids: Optional[List[str]] = []
     document_context: Optional[str] = None
     skip_ai_verdict: Optional[bool] = False
+    # Stream each model's tokens as {"model", "delta"} frames (stream endpoint only)
+    stream_tokens: Optional[bool] = False
+    # Verdict once this many responses are in, or after deadline_seconds
+    quorum: Optional[int] = None
+    deadline_seconds: Optional[float] = None
 
 
 @router.post("/triplet/stream")
-async def triplet_stream_endpoint(payload: TripletRequest):
+async def triplet_stream_endpoint(request: Request, payload: TripletRequest):
     """
     ⚡ STREAMING Triplet - Shows each model result as it completes
     User sees responses immediately instead of waiting 21 seconds!
@@ -36,44 +42,33 @@ async def triplet_stream_endpoint(payload: TripletRequest):
     if not payload.prompt or not payload.prompt.strip():
         raise HTTPException(status_code=400, detail="Prompt is required")
 
+    # Ingested documents belong to one user: referencing them requires auth
+    user_id = None
+    if payload.document_ids:
+        user_id = require_user(await get_current_user_id(request))
+
     # Process attachments (same as before)
     extracted_documents: List[str] = []
     vision_extracts: List[str] = []
 
-    if not payload.document_context and payload.attachments:
+    if not payload.document_context and (payload.attachments or payload.document_ids):
         print("\n📄 Processing attachments...")
         
-        for idx, file in enumerate(payload.attachments):
-            mime = file.get("type", "")
-            base64_data = file.get("base64")
-            name = file.get("name", f"attachment_{idx+1}")
-
-            if not base64_data:
-                continue
-
-            if base64_data.startswith("data:"):
-                base64_data = base64_data.split(",", 1)[1]
-
-            if mime == "application/pdf":
-                try:
-                    pdf_bytes = base64.b64decode(base64_data)
-                    text = extract_attachment_text(BytesIO(pdf_bytes))
-                    if text and text.strip():
-                        extracted_documents.append(f"📄 PDF — {name}:\n\n{text.strip()}")
-                except Exception as e:
-                    print(f"❌ PDF error: {e}")
-
-            elif mime.startswith("image/"):
-                try:
-                    description = await analyze_image_with_openai(
-                        base64_data=base64_data,
-                        mime_type=mime,
-                        prompt="Analyze this image concisely."
-                    )
-                    if description and description.strip():
-                        vision_extracts.append(f"🖼️ IMAGE — {name}:\n\n{description.strip()}")
-                except Exception as e:
-                    print(f"❌ Image error: {e}")
+        results, ingested = await asyncio.gather(
+            process_attachments(
+                payload.attachments,
+                vision_prompt="Analyze this image concisely.",
+            ),
+            ingestion_jobs.resolve_documents(payload.document_ids, user_id, max_chars=ATTACHMENT_TEXT_MAX_CHARS),
+        )
+        results += ingested
+
+        for result in results:
+            name = result["name"]
+            if result["kind"] == "pdf" and result.get("text"):
+                extracted_documents.append(f"📄 PDF — {name}:\n\n{result['text']}")
+            elif result["kind"] == "image" and result.get("description"):
+                vision_extracts.append(f"🖼️ IMAGE — {name}:\n\n{result['description']}")
 
     # Build context
     document_context = payload.document_context
@@ -103,7 +98,10 @@ Answer based on context and knowledge. Be concise."""
             async for chunk in run_triplet_streaming(
                 prompt=final_prompt,
                 attachments=payload.attachments,
-                skip_ai_verdict=payload.skip_ai_verdict
+                skip_ai_verdict=payload.skip_ai_verdict,
+                stream_tokens=bool(payload.stream_tokens),
+                quorum=payload.quorum,
+                deadline=payload.deadline_seconds,
             ):
                 yield f"data: {json.dumps(chunk)}\n\n"
             
@@ -149,7 +147,9 @@ async def triplet_endpoint(payload: TripletRequest):
         result = await run_triplet(
             prompt=payload.prompt,
             attachments=payload.attachments,
-            skip_ai_verdict=payload.skip_ai_verdict
+            skip_ai_verdict=payload.skip_ai_verdict,
+            quorum=payload.quorum,
+            deadline=payload.deadline_seconds,
         )
         return result
     except Exception as e:
@@ -0,0 +1,132 @@
+# backend/services/attachment_pipeline.py
+
+"""
+Attachment Pipeline
+-------------------
+Shared by the thread agent, chat and triplet routes.
+
+All attachments of a turn are processed concurrently:
+- PDFs: text extraction runs in PdfExtractionService's process pool,
+  split by page range (CPU-bound pdfplumber never touches the event loop)
+- Images: OpenAI Vision calls, bounded by a semaphore
+
+A turn with several attachments therefore costs roughly the slowest one
+instead of the sum of all of them. Results come back in input order.
+
+PDF text is capped at ATTACHMENT_TEXT_MAX_CHARS: extraction stops once the
+cap is reached, so pages that would be trimmed from the prompt anyway are
+never parsed or OCR'd.
+"""
+
+import os
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from backend.services.openai_agent import analyze_image_with_openai
+from backend.services.pdf_extraction import pdf_extraction_service
+from backend.utils.base64_utils import check_base64_size
+
+ATTACHMENT_VISION_CONCURRENCY = int(os.getenv("ATTACHMENT_VISION_CONCURRENCY", "4"))
+# Per-PDF text budget (0 = no limit)
+ATTACHMENT_TEXT_MAX_CHARS = int(os.getenv("ATTACHMENT_TEXT_MAX_CHARS", "60000"))
+
+DEFAULT_VISION_PROMPT = "Analyze this image and describe what you see."
+
+_vision_semaphore: Optional[asyncio.Semaphore] = None
+
+
+# -------------------------------------------------------------------
+# Concurrency limits
+# -------------------------------------------------------------------
+def _get_vision_semaphore() -> asyncio.Semaphore:
+    global _vision_semaphore
+    if _vision_semaphore is None:
+        _vision_semaphore = asyncio.Semaphore(ATTACHMENT_VISION_CONCURRENCY)
+    return _vision_semaphore
+
+
+# -------------------------------------------------------------------
+# Single attachment
+# -------------------------------------------------------------------
+async def extract_pdf(base64_data: str, max_chars: Optional[int] = None) -> str:
+    return await pdf_extraction_service.extract_base64(base64_data, max_chars=max_chars)
+
+
+async def analyze_image(base64_data: str, mime: str, prompt: str) -> str:
+    async with _get_vision_semaphore():
+        return await analyze_image_with_openai(
+            base64_data=base64_data,
+            mime_type=mime,
+            prompt=prompt,
+        )
+
+
+async def _process_one(
+    idx: int,
+    file: Dict[str, Any],
+    vision_prompt: str,
+    max_chars: Optional[int],
+) -> Optional[Dict[str, Any]]:
+    mime = file.get("type", "") or ""
+    base64_data = file.get("base64")
+    name = file.get("name") or f"attachment_{idx + 1}"
+
+    if not base64_data:
+        return None
+
+    if mime == "application/pdf":
+        kind = "pdf"
+    elif mime.startswith("image"):
+        kind = "image"
+    else:
+        return None
+
+    result: Dict[str, Any] = {"name": name, "type": mime, "kind": kind}
+    try:
+        # Reject oversize files from the encoded length, before any decoding
+        check_base64_size(base64_data, field_name=name)
+
+        if kind == "pdf":
+            print(f"   📄 Extracting PDF: {name}...")
+            result["text"] = (await extract_pdf(base64_data, max_chars)).strip()
+            print(f"      ✅ {name}: {len(result['text'])} characters")
+        else:
+            print(f"   🖼️ Analyzing image: {name}...")
+            result["description"] = (await analyze_image(base64_data, mime, vision_prompt)).strip()
+            print(f"      ✅ {name}: {len(result['description'])} characters")
+    except Exception as e:
+        print(f"      ❌ {kind.upper()} processing failed for {name}: {e}")
+        result["error"] = str(e)
+
+    return result
+
+
+# -------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------
+async def process_attachments(
+    attachments: Optional[List[Dict[str, Any]]],
+    vision_prompt: str = DEFAULT_VISION_PROMPT,
+    max_chars: Optional[int] = ATTACHMENT_TEXT_MAX_CHARS,
+) -> List[Dict[str, Any]]:
+    """
+    Process every PDF / image attachment concurrently.
+    PDF text stops at ``max_chars`` (None / 0 = whole document).
+
+    Each result is ``{"name", "type", "kind": "pdf" | "image"}`` plus
+    ``"text"`` (PDF) or ``"description"`` (image), or ``"error"`` if that
+    attachment failed. Unsupported or empty attachments are skipped.
+    """
+    if not attachments:
+        return []
+
+    max_chars = max_chars or None
+
+    print(f"\n📄 Processing {len(attachments)} attachments concurrently...")
+    results = await asyncio.gather(
+        *(
+            _process_one(idx, file, vision_prompt, max_chars)
+            for idx, file in enumerate(attachments)
+        )
+    )
+    return [r for r in results if r is not None]
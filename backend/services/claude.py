@@ -5,6 +5,7 @@ import os
 from typing import Optional, List, Dict, Any
 from anthropic import AsyncAnthropic
 from dotenv import load_dotenv
+from backend.utils.base64_utils import base64_payload
 
 load_dotenv()
 
@@ -144,8 +145,7 @@ async def analyze_image_with_claude(
         client = get_claude_client()
         
         # Remove data URI prefix if present
-        if base64_data.startswith("data:"):
-            base64_data = base64_data.split(",", 1)[1]
+        base64_data = base64_payload(base64_data)
         
         response = await client.messages.create(
             model="claude-sonnet-4-20250514",  # Updated model
@@ -0,0 +1,284 @@
+# backend/services/context_budget.py
+
+"""
+Token-Budgeted Context Assembler
+--------------------------------
+Packs the memory sections of the agent prompt (MTM, LTM, vision, STM, OCR)
+under a per-model token budget instead of fixed line / character limits.
+
+1. Every section is measured in tokens (tiktoken when available, a
+   script-aware estimate otherwise).
+2. Each section first gets up to its share of the budget.
+3. Budget left over by small sections flows to the ones that still need
+   it, documents first, then recent conversation.
+4. Each section is then cut to its allowance at a natural boundary
+   (sentence, bullet, message line, document prefix).
+
+Counting is CPU-bound on long documents; async callers run the assembler
+in a worker thread (see openai_agent.build_agent_messages).
+"""
+
+import os
+import math
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+# Optional exact tokenizer (ships with litellm)
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+# Context window per model family (longest prefix wins)
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "o1": 200000,
+    "o3": 200000,
+    "o4-mini": 200000,
+}
+DEFAULT_CONTEXT_WINDOW = 16385
+
+# Cost cap: never send more than this many prompt tokens, even to large windows
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "16000"))
+CONTEXT_SAFETY_MARGIN = 512
+
+# First-pass share of the memory budget per section, in priority order
+SECTION_SHARES = {
+    "mtm": 0.05,
+    "ltm": 0.10,
+    "vision": 0.10,
+    "stm": 0.30,
+    "ocr": 0.45,
+}
+# Who gets the budget small sections did not use
+OVERFLOW_ORDER = ("ocr", "stm", "ltm", "vision", "mtm")
+
+TRUNCATION_MARK = " …[truncated]"
+# Upper bound for turning a token budget into characters (Latin text;
+# Arabic and other scripts need fewer characters per token)
+CHARS_PER_TOKEN = 4
+
+
+# -------------------------------------------------------------------
+# Token counting
+# -------------------------------------------------------------------
+@lru_cache(maxsize=16)
+def _get_encoding(model_name: str):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # The BPE file is downloaded on first use; estimate if that fails
+        print(f"⚠️ tiktoken encoding unavailable, estimating tokens: {e}")
+        return None
+
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 chars/token for Latin text; Arabic and other scripts tokenize denser
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    other_chars = len(text) - ascii_chars
+    return math.ceil(ascii_chars / CHARS_PER_TOKEN + other_chars / 2)
+
+
+def count_tokens(text: Optional[str], model_name: str = "gpt-4o-mini") -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return _estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model_name: str = "gpt-4o-mini") -> str:
+    """Keep the head of ``text`` that fits in ``max_tokens``."""
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text, model_name) <= max_tokens:
+        return text
+
+    encoding = _get_encoding(model_name)
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return encoding.decode(tokens[:max_tokens])
+
+    # Estimate only: binary search the longest prefix that fits
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if _estimate_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+def _truncate_with_mark(text: str, max_tokens: int, model_name: str) -> str:
+    mark_tokens = count_tokens(TRUNCATION_MARK, model_name)
+    head = truncate_to_tokens(text, max_tokens - mark_tokens, model_name)
+    return head + TRUNCATION_MARK if head else ""
+
+
+def get_prompt_budget(model_name: str, max_output_tokens: int) -> int:
+    """Prompt tokens allowed for ``model_name`` after reserving the reply."""
+    window = DEFAULT_CONTEXT_WINDOW
+    best = ""
+    for prefix, size in MODEL_CONTEXT_WINDOWS.items():
+        if (model_name or "").startswith(prefix) and len(prefix) > len(best):
+            best, window = prefix, size
+
+    available = window - max_output_tokens - CONTEXT_SAFETY_MARGIN
+    return max(0, min(available, CONTEXT_TOKEN_BUDGET))
+
+
+# -------------------------------------------------------------------
+# Section fitters
+# -------------------------------------------------------------------
+def _fit_sentences(text: str, budget: int, model_name: str) -> str:
+    """MTM: keep whole leading sentences."""
+    if not text or budget <= 0:
+        return ""
+    if count_tokens(text, model_name) <= budget:
+        return text
+
+    kept: List[str] = []
+    used = 0
+    for sentence in text.split(". "):
+        cost = count_tokens(sentence, model_name) + 1
+        if used + cost > budget:
+            break
+        kept.append(sentence)
+        used += cost
+
+    if not kept:
+        return _truncate_with_mark(text, budget, model_name)
+    return ". ".join(kept).rstrip(".") + "."
+
+
+def _fit_lines_head(lines: List[str], budget: int, model_name: str) -> List[str]:
+    """LTM: lines are already ordered by importance; keep from the top."""
+    kept: List[str] = []
+    used = 0
+    for line in lines:
+        cost = count_tokens(line, model_name) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return kept
+
+
+def _fit_lines_tail(lines: List[str], budget: int, model_name: str) -> List[str]:
+    """STM: keep the most recent lines; a single oversized newest line is cut."""
+    kept: List[str] = []
+    used = 0
+    for line in reversed(lines):
+        cost = count_tokens(line, model_name) + 1
+        if used + cost > budget:
+            if not kept:
+                cut = _truncate_with_mark(line, budget - 1, model_name)
+                if cut:
+                    kept.append(cut)
+            break
+        kept.append(line)
+        used += cost
+    kept.reverse()
+    return kept
+
+
+def _fit_items(
+    items: List[Dict[str, Any]],
+    field: str,
+    budget: int,
+    model_name: str,
+) -> List[Dict[str, Any]]:
+    """
+    OCR / vision: share the allowance across items in order. Each item may
+    use an even split of what is left, so budget a short item leaves unused
+    goes to the ones after it.
+    """
+    kept: List[Dict[str, Any]] = []
+    remaining = budget
+    for idx, item in enumerate(items):
+        if remaining <= 0:
+            break
+        allowance = remaining // (len(items) - idx)
+        text = item.get(field) or ""
+        if count_tokens(text, model_name) > allowance:
+            text = _truncate_with_mark(text, allowance, model_name)
+        if not text.strip():
+            continue
+        kept.append({**item, field: text})
+        remaining -= count_tokens(text, model_name)
+    return kept
+
+
+# -------------------------------------------------------------------
+# Assembler
+# -------------------------------------------------------------------
+def assemble_context(
+    budget: int,
+    model_name: str = "gpt-4o-mini",
+    mtm: str = "",
+    ltm: Optional[List[str]] = None,
+    stm: Optional[List[str]] = None,
+    ocr: Optional[List[Dict[str, Any]]] = None,
+    vision: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Pack the memory sections into ``budget`` tokens.
+
+    Returns the fitted sections under the same keys plus a ``usage`` dict
+    with the token need / allowance for each section.
+    """
+    ltm = ltm or []
+    stm = stm or []
+    ocr = ocr or []
+    vision = vision or []
+    budget = max(0, budget)
+
+    need = {
+        "mtm": count_tokens(mtm, model_name),
+        "ltm": sum(count_tokens(ln, model_name) + 1 for ln in ltm),
+        "vision": sum(count_tokens(v.get("description"), model_name) for v in vision),
+        "stm": sum(count_tokens(ln, model_name) + 1 for ln in stm),
+        "ocr": sum(count_tokens(d.get("text"), model_name) for d in ocr),
+    }
+
+    # Pass 1: everyone up to their share
+    allow = {
+        name: min(need[name], int(budget * share))
+        for name, share in SECTION_SHARES.items()
+    }
+
+    # Pass 2: hand out what is left
+    leftover = budget - sum(allow.values())
+    for name in OVERFLOW_ORDER:
+        if leftover <= 0:
+            break
+        extra = min(need[name] - allow[name], leftover)
+        if extra > 0:
+            allow[name] += extra
+            leftover -= extra
+
+    return {
+        "mtm": _fit_sentences(mtm, allow["mtm"], model_name),
+        "ltm": _fit_lines_head(ltm, allow["ltm"], model_name),
+        "vision": _fit_items(vision, "description", allow["vision"], model_name),
+        "stm": _fit_lines_tail(stm, allow["stm"], model_name),
+        "ocr": _fit_items(ocr, "text", allow["ocr"], model_name),
+        "usage": {
+            "budget": budget,
+            "need": need,
+            "allow": allow,
+        },
+    }
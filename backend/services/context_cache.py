@@ -0,0 +1,261 @@
+# backend/services/context_cache.py
+
+"""
+Thread Context Cache
+--------------------
+Two-tier cache for the per-thread memory context returned by
+``repository.load_thread_context`` (ownership, STM tail, MTM, LTM, documents).
+
+- L1: in-process LRU, bounded by number of threads, short TTL
+- L2: shared Redis tier (backend/services/redis.py), longer TTL
+
+Writes in thread.py go through the ``record_*`` helpers below, which update
+the shared cached context atomically (write-through) instead of
+invalidating it, so consecutive turns in an active conversation never go
+back to the database.
+
+The Redis tier is optional (see redis_tier.py): without it the cache keeps
+working as L1 only.
+"""
+
+import os
+import copy
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from backend.db import repository
+from backend.services.redis_tier import RedisTier
+
+# Same window sizes the context loader uses, so write-through trims match
+STM_LIMIT = 60
+LTM_LIMIT = 10
+DOC_LIMIT = 3
+
+CONTEXT_CACHE_MAX_THREADS = int(os.getenv("CONTEXT_CACHE_MAX_THREADS", "1024"))
+# L1 is per worker; keep it short so other workers' writes become visible
+CONTEXT_CACHE_L1_TTL = float(os.getenv("CONTEXT_CACHE_L1_TTL", "30"))
+CONTEXT_CACHE_TTL = int(os.getenv("CONTEXT_CACHE_TTL", "3600"))
+CONTEXT_CACHE_REDIS = os.getenv("CONTEXT_CACHE_REDIS", "true").lower() == "true"
+
+REDIS_KEY_PREFIX = "thread_context:"
+
+
+class ThreadContextCache:
+    def __init__(
+        self,
+        max_threads: int = CONTEXT_CACHE_MAX_THREADS,
+        l1_ttl: float = CONTEXT_CACHE_L1_TTL,
+        ttl: int = CONTEXT_CACHE_TTL,
+        use_redis: bool = CONTEXT_CACHE_REDIS,
+        redis_client: Any = None,
+    ):
+        self.max_threads = max_threads
+        self.l1_ttl = l1_ttl
+        self.ttl = ttl
+        self.redis = RedisTier("Context cache", enabled=use_redis, client=redis_client)
+
+        self._entries: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    # -------------------------------------------------------------------
+    # L1 (in-process LRU)
+    # -------------------------------------------------------------------
+    def _l1_get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(thread_id)
+        if entry is None:
+            return None
+
+        stored_at, ctx = entry
+        if time.monotonic() - stored_at > self.l1_ttl:
+            del self._entries[thread_id]
+            return None
+
+        self._entries.move_to_end(thread_id)
+        return ctx
+
+    def _l1_set(self, thread_id: str, ctx: Dict[str, Any]) -> None:
+        self._entries[thread_id] = (time.monotonic(), ctx)
+        self._entries.move_to_end(thread_id)
+
+        while len(self._entries) > self.max_threads:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _l1_update(self, thread_id: str, mutate) -> None:
+        ctx = self._l1_get(thread_id)
+        if ctx is None:
+            return
+
+        # Callers may still hold the cached dict; mutate a copy
+        ctx = copy.deepcopy(ctx)
+        mutate(ctx)
+        self.writes += 1
+        self._l1_set(thread_id, ctx)
+
+    # -------------------------------------------------------------------
+    # L2 (Redis)
+    # -------------------------------------------------------------------
+    async def _l2_get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.redis.get(REDIS_KEY_PREFIX + thread_id)
+        try:
+            return json.loads(raw) if raw else None
+        except ValueError:
+            return None
+
+    async def _l2_set(self, thread_id: str, ctx: Dict[str, Any]) -> None:
+        await self.redis.set(
+            REDIS_KEY_PREFIX + thread_id,
+            json.dumps(ctx, ensure_ascii=False, default=str),
+            ex=self.ttl,
+        )
+
+    async def _l2_delete(self, thread_id: str) -> None:
+        await self.redis.delete(REDIS_KEY_PREFIX + thread_id)
+
+    # -------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------
+    async def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        ctx = self._l1_get(thread_id)
+        if ctx is not None:
+            self.l1_hits += 1
+            return ctx
+
+        ctx = await self._l2_get(thread_id)
+        if ctx is not None:
+            self.l2_hits += 1
+            self._l1_set(thread_id, ctx)
+            return ctx
+
+        self.misses += 1
+        return None
+
+    async def set(self, thread_id: str, ctx: Dict[str, Any]) -> None:
+        self._l1_set(thread_id, ctx)
+        await self._l2_set(thread_id, ctx)
+
+    async def invalidate(self, thread_id: str) -> None:
+        self._entries.pop(thread_id, None)
+        await self._l2_delete(thread_id)
+
+    async def _update(self, thread_id: str, mutate) -> None:
+        """
+        Write-through: apply ``mutate`` to the shared (Redis) context as one
+        atomic read-modify-write, then refresh this worker's L1 from the
+        result. L1 copies are never written back: they can be up to
+        ``l1_ttl`` old and would overwrite other workers' writes.
+
+        Redis tier disabled or unreachable → L1 is the only copy, so
+        ``mutate`` is applied to it. Redis up but the key missing (or the
+        update kept conflicting) → this worker's L1 entry is dropped and the
+        next read loads fresh rows from the database.
+        """
+        def apply(raw: str) -> str:
+            ctx = json.loads(raw)
+            mutate(ctx)
+            return json.dumps(ctx, ensure_ascii=False, default=str)
+
+        raw = await self.redis.update(REDIS_KEY_PREFIX + thread_id, apply, ex=self.ttl)
+        if raw is None:
+            if not self.redis.available:
+                self._l1_update(thread_id, mutate)
+            else:
+                self._entries.pop(thread_id, None)
+            return
+
+        self.writes += 1
+        self._l1_set(thread_id, json.loads(raw))
+
+    async def record_message(self, thread_id: str, row: Dict[str, Any]) -> None:
+        def mutate(ctx: Dict[str, Any]) -> None:
+            stm = ctx.setdefault("stm", [])
+            stm.append({
+                "role": row.get("role"),
+                "content": row.get("content"),
+                "created_at": row.get("created_at"),
+            })
+            del stm[:-STM_LIMIT]
+
+        await self._update(thread_id, mutate)
+
+    async def record_mid_summary(self, thread_id: str, mid_summary: str) -> None:
+        def mutate(ctx: Dict[str, Any]) -> None:
+            ctx["summary"] = mid_summary
+            metadata = ctx.get("metadata")
+            if not isinstance(metadata, dict):
+                metadata = {}
+            memory = metadata.get("memory")
+            if not isinstance(memory, dict):
+                memory = {}
+            metadata["memory"] = {**memory, "mid_summary": mid_summary}
+            ctx["metadata"] = metadata
+
+        await self._update(thread_id, mutate)
+
+    async def record_long_term_memory(self, thread_id: str, row: Dict[str, Any]) -> None:
+        def mutate(ctx: Dict[str, Any]) -> None:
+            ltm = ctx.setdefault("ltm", [])
+            ltm.append({
+                "content": row.get("content"),
+                "memory_type": row.get("memory_type"),
+                "importance": row.get("importance"),
+            })
+            # Same ordering as the loader: importance DESC, then insertion
+            ltm.sort(key=lambda item: -(item.get("importance") or 0))
+            del ltm[LTM_LIMIT:]
+
+            if row.get("memory_type") == "document":
+                documents = ctx.setdefault("documents", [])
+                if len(documents) < DOC_LIMIT:
+                    documents.append({"content": row.get("content")})
+
+        await self._update(thread_id, mutate)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_threads": self.max_threads,
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": round((self.l1_hits + self.l2_hits) / lookups, 3) if lookups else 0.0,
+            "redis_enabled": self.redis.available,
+        }
+
+
+context_cache = ThreadContextCache()
+
+
+async def get_thread_context(thread_id: str, user_id: str) -> Dict[str, Any]:
+    """
+    Cache-aware ``repository.load_thread_context``.
+
+    Only contexts the caller owns are cached; ownership is re-checked
+    against the cached owner on every hit.
+    """
+    ctx = await context_cache.get(thread_id)
+    if ctx is not None:
+        if ctx.get("owner") == user_id:
+            return ctx
+        return {"found": True, "is_owner": False, "owner": ctx.get("owner")}
+
+    ctx = await repository.load_thread_context(
+        thread_id,
+        user_id,
+        stm_limit=STM_LIMIT,
+        ltm_limit=LTM_LIMIT,
+        doc_limit=DOC_LIMIT,
+    )
+    if ctx.get("is_owner"):
+        await context_cache.set(thread_id, ctx)
+    return ctx
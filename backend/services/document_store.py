@@ -0,0 +1,380 @@
+# backend/services/document_store.py
+
+"""
+Document Store
+--------------
+Chunked storage + lexical retrieval for documents uploaded to a thread.
+
+Extracted text is split into page-local paragraph chunks (page number and
+character offsets in the extracted text are kept) and saved to the
+``document_chunks`` table. Follow-up questions are answered from the top-k
+chunks ranked by BM25 instead of re-sending whole documents every turn.
+
+Tokenization is Arabic-aware: diacritics and tatweel are removed, alef /
+yeh / teh marbuta variants and Arabic-Indic digits are normalized, and the
+definite article and its attached conjunctions / prepositions (ال، وال،
+بال، وبال، لل ...) are stripped, so "العقد" matches "عقد" and "بالعقد".
+
+Per-thread indexes are kept in an in-process LRU with a short TTL (like the
+L1 of context_cache.py), so a conversation about a document only loads its
+chunks from the database once per TTL window. Chunking and index building
+are CPU-bound (documents run to hundreds of thousands of characters) and
+run in a worker thread, off the event loop.
+"""
+
+import os
+import re
+import asyncio
+import math
+import time
+import hashlib
+import heapq
+from collections import Counter, OrderedDict, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from backend.db import repository
+
+DOC_CHUNK_CHARS = int(os.getenv("DOC_CHUNK_CHARS", "1200"))
+DOC_RETRIEVAL_TOP_K = int(os.getenv("DOC_RETRIEVAL_TOP_K", "6"))
+DOC_INDEX_MAX_THREADS = int(os.getenv("DOC_INDEX_MAX_THREADS", "256"))
+# Per worker; keep it short so chunks added by other workers become visible
+DOC_INDEX_TTL = float(os.getenv("DOC_INDEX_TTL", "60"))
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+# -------------------------------------------------------------------
+# Tokenization
+# -------------------------------------------------------------------
+_ARABIC_DIACRITICS = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+
+_ARABIC_NORMALIZE = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه",
+    **{chr(0x0660 + d): str(d) for d in range(10)},  # Arabic-Indic digits
+    **{chr(0x06F0 + d): str(d) for d in range(10)},  # Persian digits
+})
+
+_TOKEN = re.compile(r"\w+")
+
+# Longest first; only stripped when at least two letters remain
+ARABIC_PREFIXES = ("وبال", "وكال", "فبال", "ولل", "فلل", "وال", "بال", "كال", "فال", "لل", "ال")
+
+# Stored in normalized form
+STOPWORDS = {
+    # English
+    "a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "is",
+    "are", "was", "were", "be", "been", "it", "its", "this", "that",
+    "these", "those", "with", "as", "at", "by", "from", "what", "which",
+    "who", "how", "when", "where", "do", "does", "did", "i", "you", "me",
+    "my", "your", "we", "our", "can", "could", "should", "would", "will",
+    "please", "about", "tell", "there", "any", "if", "not", "no",
+    # Arabic
+    "في", "من", "علي", "الي", "عن", "ان", "او", "و", "ما", "ماذا", "هل",
+    "هذا", "هذه", "ذلك", "تلك", "التي", "الذي", "الذين", "كان", "كانت",
+    "مع", "كيف", "متي", "اين", "لا", "لم", "لن", "هو", "هي", "انا", "نحن",
+    "انت", "هم", "قد", "ثم", "كل", "بعد", "قبل", "عند", "بين",
+}
+
+
+def _is_arabic_token(token: str) -> bool:
+    return "\u0600" <= token[0] <= "\u06ff"
+
+
+def normalize(text: str) -> str:
+    return _ARABIC_DIACRITICS.sub("", (text or "").lower()).translate(_ARABIC_NORMALIZE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, normalized search terms of ``text`` (stopwords dropped)."""
+    tokens: List[str] = []
+    for token in _TOKEN.findall(normalize(text)):
+        if token in STOPWORDS:
+            continue
+        if _is_arabic_token(token):
+            for prefix in ARABIC_PREFIXES:
+                if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+                    token = token[len(prefix):]
+                    break
+        if len(token) < 2 and not token.isdigit():
+            continue
+        tokens.append(token)
+    return tokens
+
+
+# -------------------------------------------------------------------
+# Chunking
+# -------------------------------------------------------------------
+# Same markers attachment_extractor / file_extractor write between pages
+_PAGE_MARKER = re.compile(r"^--- (?:OCR )?Page (\d+) ---[ \t]*$", re.MULTILINE)
+# A run of text without a blank line in it
+_PARAGRAPH = re.compile(r"(?:[^\n]|\n(?![ \t]*\n))+")
+
+
+def document_id_for(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _page_segments(text: str) -> Iterator[Tuple[Optional[int], int, int]]:
+    """(page_number, start, end) spans; page_number is None without markers."""
+    markers = list(_PAGE_MARKER.finditer(text))
+    if not markers:
+        yield None, 0, len(text)
+        return
+
+    if markers[0].start() > 0:
+        yield None, 0, markers[0].start()
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        yield int(marker.group(1)), marker.end(), end
+
+
+def _split_span(text: str, start: int, end: int, max_chars: int) -> Iterator[Tuple[int, int]]:
+    """Cut an oversized paragraph at whitespace into pieces of <= max_chars."""
+    while end - start > max_chars:
+        cut = text.rfind(" ", start + 1, start + max_chars)
+        if cut <= start:
+            cut = start + max_chars
+        yield start, cut
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if start < end:
+        yield start, end
+
+
+def chunk_document(text: str, max_chars: int = DOC_CHUNK_CHARS) -> List[Dict[str, Any]]:
+    """
+    Split extracted text into chunks of whole paragraphs (up to
+    ``max_chars``) that never cross a page boundary. Offsets refer to
+    positions in ``text``.
+    """
+    chunks: List[Dict[str, Any]] = []
+
+    def flush(page_number: Optional[int], start: int, end: int) -> None:
+        chunks.append({
+            "chunk_index": len(chunks),
+            "page_number": page_number,
+            "char_start": start,
+            "char_end": end,
+            "content": text[start:end].strip(),
+        })
+
+    for page_number, seg_start, seg_end in _page_segments(text):
+        current_start: Optional[int] = None
+        current_end = 0
+
+        for paragraph in _PARAGRAPH.finditer(text, seg_start, seg_end):
+            if not paragraph.group().strip():
+                continue
+            for piece_start, piece_end in _split_span(text, paragraph.start(), paragraph.end(), max_chars):
+                if current_start is not None and piece_end - current_start > max_chars:
+                    flush(page_number, current_start, current_end)
+                    current_start = None
+                if current_start is None:
+                    current_start = piece_start
+                current_end = piece_end
+
+        if current_start is not None:
+            flush(page_number, current_start, current_end)
+
+    return chunks
+
+
+# -------------------------------------------------------------------
+# BM25 index
+# -------------------------------------------------------------------
+class BM25Index:
+    def __init__(self, chunks: List[Dict[str, Any]], k1: float = BM25_K1, b: float = BM25_B):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.document_ids = {chunk.get("document_id") for chunk in chunks}
+
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths: List[int] = []
+        for i, chunk in enumerate(chunks):
+            terms = Counter(tokenize(chunk.get("content") or ""))
+            self.lengths.append(sum(terms.values()))
+            for term, freq in terms.items():
+                self.postings[term].append((i, freq))
+
+        n = len(chunks)
+        self.avg_length = (sum(self.lengths) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def search(self, query: str, k: int = DOC_RETRIEVAL_TOP_K) -> List[Dict[str, Any]]:
+        """Top ``k`` chunks for ``query`` (best first), each with a "score"."""
+        if not self.chunks or not self.avg_length:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, freq in self.postings[term]:
+                norm = 1 - self.b + self.b * self.lengths[i] / self.avg_length
+                scores[i] += idf * freq * (self.k1 + 1) / (freq + self.k1 * norm)
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [{**self.chunks[i], "score": round(score, 4)} for i, score in best]
+
+    def latest_document_chunks(self, k: int = DOC_RETRIEVAL_TOP_K) -> List[Dict[str, Any]]:
+        """First ``k`` chunks of the most recently stored document."""
+        if not self.chunks:
+            return []
+        latest = max(self.chunks, key=lambda chunk: chunk.get("created_at") or "")
+        document = [c for c in self.chunks if c.get("document_id") == latest.get("document_id")]
+        return document[:k]
+
+
+# -------------------------------------------------------------------
+# Store
+# -------------------------------------------------------------------
+def _chunk_rows(
+    thread_id: str,
+    documents: List[Dict[str, Any]],
+    seen: set,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """``document_chunks`` rows for the documents not in ``seen``, and how many documents that was."""
+    now = datetime.utcnow().isoformat()
+    rows: List[Dict[str, Any]] = []
+    added = 0
+    for doc in documents:
+        text = doc.get("text") or ""
+        if not text.strip():
+            continue
+        document_id = document_id_for(text)
+        if document_id in seen:
+            continue
+        seen.add(document_id)
+
+        for chunk in chunk_document(text):
+            rows.append({
+                "thread_id": thread_id,
+                "document_id": document_id,
+                "document_name": doc.get("name"),
+                "created_at": now,
+                **chunk,
+            })
+        added += 1
+    return rows, added
+
+
+class DocumentStore:
+    def __init__(self, max_threads: int = DOC_INDEX_MAX_THREADS, ttl: float = DOC_INDEX_TTL):
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self._indexes: "OrderedDict[str, tuple[float, BM25Index]]" = OrderedDict()
+
+        self.index_hits = 0
+        self.index_loads = 0
+        self.documents_added = 0
+        self.searches = 0
+
+    async def _get_index(self, thread_id: str) -> BM25Index:
+        entry = self._indexes.get(thread_id)
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+            self._indexes.move_to_end(thread_id)
+            self.index_hits += 1
+            return entry[1]
+
+        chunks = await repository.list_document_chunks(
+            thread_id,
+            columns="document_id, document_name, chunk_index, page_number, "
+                    "char_start, char_end, content, created_at",
+        )
+        index = await asyncio.to_thread(BM25Index, chunks)
+        self.index_loads += 1
+
+        self._indexes[thread_id] = (time.monotonic(), index)
+        self._indexes.move_to_end(thread_id)
+        while len(self._indexes) > self.max_threads:
+            self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, thread_id: str) -> None:
+        self._indexes.pop(thread_id, None)
+
+    async def add_documents(self, thread_id: str, documents: List[Dict[str, Any]]) -> int:
+        """
+        Chunk and store ``[{"name", "text"}]``. Documents already stored in
+        the thread (same extracted text) are skipped. Returns chunks stored.
+        """
+        index = await self._get_index(thread_id)
+        rows, added = await asyncio.to_thread(
+            _chunk_rows, thread_id, documents, set(index.document_ids)
+        )
+        self.documents_added += added
+
+        if not rows:
+            return 0
+
+        inserted = await repository.insert_document_chunks(rows)
+        self.invalidate(thread_id)
+        print(f"📚 Stored {inserted} document chunks for thread {thread_id}")
+        return inserted
+
+    async def search(
+        self,
+        thread_id: str,
+        query: str,
+        k: int = DOC_RETRIEVAL_TOP_K,
+        fallback_to_latest: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-k chunks of the thread's documents for ``query``. With
+        ``fallback_to_latest`` a query that matches nothing ("summarize
+        it") gets the opening chunks of the latest document instead.
+        """
+        index = await self._get_index(thread_id)
+        self.searches += 1
+
+        chunks = index.search(query, k)
+        if not chunks and fallback_to_latest:
+            chunks = index.latest_document_chunks(k)
+        return chunks
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "indexed_threads": len(self._indexes),
+            "max_threads": self.max_threads,
+            "index_hits": self.index_hits,
+            "index_loads": self.index_loads,
+            "documents_added": self.documents_added,
+            "searches": self.searches,
+        }
+
+
+def chunks_to_context(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Group retrieved chunks into ``[{"name", "text"}]`` items (the shape the
+    agent's OCR section takes): one item per document, ordered by its best
+    chunk, excerpts in reading order and tagged with their page.
+    """
+    by_document: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+    for chunk in chunks:
+        by_document.setdefault(chunk.get("document_id"), []).append(chunk)
+
+    items = []
+    for document_chunks in by_document.values():
+        document_chunks.sort(key=lambda chunk: chunk.get("chunk_index") or 0)
+        excerpts = []
+        for chunk in document_chunks:
+            page = chunk.get("page_number")
+            label = f"[Page {page}]" if page else f"[Excerpt {chunk.get('chunk_index', 0) + 1}]"
+            excerpts.append(f"{label}\n{chunk.get('content', '')}")
+        items.append({
+            "name": f"{document_chunks[0].get('document_name') or 'Document'} (relevant excerpts)",
+            "text": "\n\n".join(excerpts),
+        })
+    return items
+
+
+document_store = DocumentStore()
@@ -0,0 +1,196 @@
+# backend/services/extraction_cache.py
+
+"""
+Extraction Cache
+----------------
+Content-addressed cache for extracted document text.
+
+Key: SHA-256 of the decoded file bytes + extractor name + extractor version,
+so the same PDF re-uploaded to another thread, or resent by chat / triplet,
+is extracted once. Bumping an extractor's version invalidates its entries.
+
+- Local tier: one JSON file per entry in EXTRACTION_CACHE_DIR, bounded by
+  EXTRACTION_CACHE_MAX_BYTES with LRU eviction (file mtime = last access)
+- Redis tier: shared across workers / instances, EXTRACTION_CACHE_TTL expiry
+
+Both tiers honour the same TTL. Empty results are never cached so a failed
+extraction is retried next time.
+"""
+
+import os
+import json
+import time
+import mmap
+import hashlib
+import asyncio
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from backend.services.redis_tier import RedisTier
+
+EXTRACTION_CACHE_DIR = os.getenv(
+    "EXTRACTION_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "extraction_cache"),
+)
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+EXTRACTION_CACHE_TTL = int(os.getenv("EXTRACTION_CACHE_TTL", str(7 * 24 * 3600)))
+EXTRACTION_CACHE_REDIS = os.getenv("EXTRACTION_CACHE_REDIS", "true").lower() == "true"
+# Very large extractions stay local; they are not worth a Redis round trip
+EXTRACTION_CACHE_REDIS_MAX_CHARS = int(os.getenv("EXTRACTION_CACHE_REDIS_MAX_CHARS", "1000000"))
+
+REDIS_KEY_PREFIX = "extraction:"
+SWEEP_EVERY_BYTES = 16 * 1024 * 1024  # run LRU eviction after this much new data
+
+
+def content_key(data: bytes, extractor: str, version: str) -> str:
+    return f"{hashlib.sha256(data).hexdigest()}-{extractor}-{version}"
+
+
+def file_content_key(path: str, extractor: str, version: str) -> str:
+    """Same key as content_key for a file on disk, hashed through mmap (no copy)."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return content_key(b"", extractor, version)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return f"{hashlib.sha256(mapped).hexdigest()}-{extractor}-{version}"
+
+
+class ExtractionCache:
+    def __init__(
+        self,
+        directory: str = EXTRACTION_CACHE_DIR,
+        max_bytes: int = EXTRACTION_CACHE_MAX_BYTES,
+        ttl: int = EXTRACTION_CACHE_TTL,
+        use_redis: bool = EXTRACTION_CACHE_REDIS,
+        redis_client: Any = None,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.redis = RedisTier("Extraction cache", enabled=use_redis, client=redis_client)
+
+        self._lock = threading.Lock()
+        self._written_since_sweep = SWEEP_EVERY_BYTES  # sweep on first write
+
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # -------------------------------------------------------------------
+    # Local tier (sync: also used from worker threads / processes)
+    # -------------------------------------------------------------------
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get_local(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ Extraction cache: dropping unreadable entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+
+        # mtime = last access, which is what LRU eviction sorts on
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("text")
+
+    def set_local(self, key: str, text: str) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            payload = json.dumps({"created_at": time.time(), "text": text}, ensure_ascii=False)
+
+            # Write-then-rename so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            print(f"⚠️ Extraction cache local write failed: {e}")
+            return
+
+        with self._lock:
+            self._written_since_sweep += len(payload)
+            should_sweep = self._written_since_sweep >= SWEEP_EVERY_BYTES
+            if should_sweep:
+                self._written_since_sweep = 0
+        if should_sweep:
+            self.sweep()
+
+    def sweep(self) -> None:
+        """Delete expired entries, then least recently used ones over the size cap."""
+        try:
+            entries = []
+            for path in self.directory.glob("*.json"):
+                try:
+                    stat = path.stat()
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                except FileNotFoundError:
+                    continue
+        except FileNotFoundError:
+            return
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        # Entries untouched for longer than the TTL are expired by definition
+        expire_before = time.time() - self.ttl
+
+        for mtime, size, path in entries:
+            if total <= self.max_bytes and mtime >= expire_before:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evictions += 1
+
+    # -------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------
+    async def get(self, key: str) -> Optional[str]:
+        text = await asyncio.to_thread(self.get_local, key)
+        if text is not None:
+            self.local_hits += 1
+            return text
+
+        text = await self.redis.get(REDIS_KEY_PREFIX + key)
+        if text is not None:
+            self.redis_hits += 1
+            await asyncio.to_thread(self.set_local, key, text)
+            return text
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, text: str) -> None:
+        if not text:
+            return
+        await asyncio.to_thread(self.set_local, key, text)
+        # Very large extractions stay local
+        if len(text) <= EXTRACTION_CACHE_REDIS_MAX_CHARS:
+            await self.redis.set(REDIS_KEY_PREFIX + key, text, ex=self.ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.local_hits + self.redis_hits) / lookups, 3) if lookups else 0.0,
+            "redis_enabled": self.redis.available,
+        }
+
+
+extraction_cache = ExtractionCache()
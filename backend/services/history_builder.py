@@ -11,29 +11,20 @@ retains continuity without forgetting earlier turns.
 """
 
 from typing import List, Dict, Any
-from backend.db.supabase_client import get_supabase
+from backend.db import repository
 import traceback
 
 
 # -------------------------------------------------------------------
 # Load last N messages from DB (role-based)
 # -------------------------------------------------------------------
-def load_recent_messages(thread_id: str, limit: int = 6) -> List[Dict[str, str]]:
+async def load_recent_messages(thread_id: str, limit: int = 6) -> List[Dict[str, str]]:
     """
     Load only the last N messages from DB as role/content pairs.
     Perfect for modern ChatML format.
     """
     try:
-        resp = (
-            supabase.table("messages")
-            .select("role, content")
-            .eq("thread_id", thread_id)
-            .order("created_at", desc=False)
-            .limit(limit)
-            .execute()
-        )
-
-        rows = resp.data or []
+        rows = await repository.list_recent_messages(thread_id, "role, content", limit=limit)
         messages = []
 
         for row in rows:
@@ -58,16 +49,9 @@ def load_recent_messages(thread_id: str, limit: int = 6) -> List[Dict[str, str]]
 # -------------------------------------------------------------------
 # Load *all* DB messages for summarization
 # -------------------------------------------------------------------
-def load_full_history(thread_id: str) -> List[Dict[str, str]]:
+async def load_full_history(thread_id: str) -> List[Dict[str, str]]:
     try:
-        resp = (
-            supabase.table("messages")
-            .select("role, content")
-            .eq("thread_id", thread_id)
-            .order("created_at", desc=False)
-            .execute()
-        )
-        return resp.data or []
+        return await repository.list_messages(thread_id, "role, content")
 
     except Exception as e:
         print("⚠️ load_full_history failed:", e)
@@ -109,7 +93,7 @@ def summarize_older_history(full_history: List[Dict[str, str]], recent_count: in
 # -------------------------------------------------------------------
 # Main entry: produce final chat messages for Gemini
 # -------------------------------------------------------------------
-def build_history_messages(thread_id: str, limit: int = 6) -> List[Dict[str, Any]]:
+async def build_history_messages(thread_id: str, limit: int = 6) -> List[Dict[str, Any]]:
     """
     FINAL OUTPUT FORMAT:
     [
@@ -123,13 +107,13 @@ def build_history_messages(thread_id: str, limit: int = 6) -> List[Dict[str, Any
     """
 
     # 1) Load full history for summarization
-    full = load_full_history(thread_id)
+    full = await load_full_history(thread_id)
 
     # 2) Summarize older content
     summary = summarize_older_history(full, limit)
 
     # 3) Load last N messages
-    recent = load_recent_messages(thread_id, limit)
+    recent = await load_recent_messages(thread_id, limit)
 
     messages: List[Dict[str, Any]] = []
 
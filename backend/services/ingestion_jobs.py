@@ -0,0 +1,332 @@
+# backend/services/ingestion_jobs.py
+
+"""
+Document Ingestion Jobs
+-----------------------
+Background extraction for uploaded documents, so a large PDF no longer
+holds an agent / chat / triplet request open while it is parsed and OCR'd.
+
+  1. POST /api/documents/upload (multipart, spooled to a temp file) or
+     /api/documents/ingest (JSON + base64) accepts the file and returns a
+     job_id immediately (see routes/documents.py)
+  2. the job runs in the background (PDFs through PdfExtractionService,
+     images through the Vision call), at most INGESTION_WORKERS at a time
+  3. progress ("page 12/80") is published to SSE subscribers as page
+     ranges finish
+  4. later thread / chat / triplet calls pass ``document_ids`` and get the
+     finished result in the same shape process_attachments returns
+
+Job state (progress) lives in this process. Finished results are also
+stored in the ingested_documents table (never evicted, unlike the
+extraction cache), so a document can be referenced from any worker once
+it is done.
+"""
+
+import os
+import time
+import uuid
+import base64
+import asyncio
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from backend.db import repository
+from backend.services.attachment_pipeline import DEFAULT_VISION_PROMPT, analyze_image
+from backend.services.long_document_qa import LONG_DOC_MAX_CHARS
+from backend.services.pdf_extraction import pdf_extraction_service
+
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "4"))
+INGESTION_MAX_JOBS = int(os.getenv("INGESTION_MAX_JOBS", "1000"))
+INGESTION_JOB_TTL = int(os.getenv("INGESTION_JOB_TTL", "3600"))
+# Ingested documents are kept whole; callers trim to their own budget
+INGESTION_MAX_CHARS = int(os.getenv("INGESTION_MAX_CHARS", str(LONG_DOC_MAX_CHARS)))
+# A chat call referencing a job that is still running waits this long
+INGESTION_WAIT_SECONDS = float(os.getenv("INGESTION_WAIT_SECONDS", "60"))
+# SSE keep-alive: the current state is re-sent if nothing changed
+INGESTION_HEARTBEAT_SECONDS = float(os.getenv("INGESTION_HEARTBEAT_SECONDS", "15"))
+
+TERMINAL_STATUSES = ("done", "failed")
+
+
+def _read_source(source: Union[bytes, str]) -> bytes:
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read()
+    return source
+
+
+class IngestionJobs:
+    def __init__(
+        self,
+        workers: int = INGESTION_WORKERS,
+        max_jobs: int = INGESTION_MAX_JOBS,
+        ttl: int = INGESTION_JOB_TTL,
+    ):
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._tasks: set = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    # -------------------------------------------------------------------
+    # Job state
+    # -------------------------------------------------------------------
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        return self._semaphore
+
+    def _prune(self) -> None:
+        now = time.time()
+        for job_id in list(self._jobs):
+            job = self._jobs[job_id]
+            expired = job["status"] in TERMINAL_STATUSES and now - job["updated_at"] > self.ttl
+            if expired or (len(self._jobs) > self.max_jobs and job["status"] in TERMINAL_STATUSES):
+                del self._jobs[job_id]
+                self._changed.pop(job_id, None)
+
+    def _update(self, job: Dict[str, Any], **values: Any) -> None:
+        job.update(values)
+        job["updated_at"] = time.time()
+
+        # Wake every subscriber, then arm a fresh event for the next change
+        changed = self._changed.get(job["job_id"])
+        self._changed[job["job_id"]] = asyncio.Event()
+        if changed:
+            changed.set()
+
+    @staticmethod
+    def public(job: Dict[str, Any]) -> Dict[str, Any]:
+        state = {k: v for k, v in job.items() if not k.startswith("_") and k != "user_id"}
+        if job.get("pages_total"):
+            state["progress"] = f"page {job['pages_done']}/{job['pages_total']}"
+        return state
+
+    # -------------------------------------------------------------------
+    # Submit / run
+    # -------------------------------------------------------------------
+    def submit(
+        self,
+        source: Union[bytes, str],
+        name: str,
+        mime: str,
+        user_id: str,
+    ) -> Dict[str, Any]:
+        """
+        Register a job and start it in the background; returns its state.
+        ``source`` is the file bytes or the path of a temp file, which the
+        job owns and deletes when it finishes.
+        """
+        if mime == "application/pdf":
+            kind = "pdf"
+        elif mime.startswith("image"):
+            kind = "image"
+        else:
+            raise ValueError(f"Unsupported file type: {mime or 'unknown'}")
+
+        size_bytes = os.path.getsize(source) if isinstance(source, str) else len(source)
+
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "name": name,
+            "type": mime,
+            "kind": kind,
+            "size_bytes": size_bytes,
+            "pages_done": 0,
+            "pages_total": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "user_id": user_id,
+        }
+
+        self._prune()
+        self._jobs[job_id] = job
+        self._changed[job_id] = asyncio.Event()
+        self.submitted += 1
+
+        task = asyncio.create_task(self._run(job, source))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        print(f"📥 Ingestion job {job_id} queued: {name} ({size_bytes} bytes)")
+        return self.public(job)
+
+    async def _run(self, job: Dict[str, Any], source: Union[bytes, str]) -> None:
+        async with self._get_semaphore():
+            self._update(job, status="running")
+            started = time.perf_counter()
+            try:
+                result = {"name": job["name"], "type": job["type"], "kind": job["kind"]}
+                if job["kind"] == "pdf":
+                    text = await pdf_extraction_service.extract(
+                        source,
+                        max_chars=INGESTION_MAX_CHARS,
+                        on_progress=lambda done, total: self._update(job, pages_done=done, pages_total=total),
+                    )
+                    result["text"] = text.strip()
+                else:
+                    # The Vision API takes the image inline as base64 anyway
+                    data = await asyncio.to_thread(_read_source, source)
+                    base64_data = await asyncio.to_thread(base64.b64encode, data)
+                    description = await analyze_image(base64_data.decode("ascii"), job["type"], DEFAULT_VISION_PROMPT)
+                    result["description"] = description.strip()
+
+                job["_result"] = result
+                try:
+                    await repository.insert_ingested_document({
+                        **result,
+                        "job_id": job["job_id"],
+                        "user_id": job["user_id"],
+                    })
+                except Exception as e:
+                    # Still served from this worker until the job is pruned
+                    print(f"⚠️ Ingestion job {job['job_id']}: result not stored: {e}")
+
+                self.completed += 1
+                self._update(
+                    job,
+                    status="done",
+                    chars=len(result.get("text") or result.get("description") or ""),
+                    seconds=round(time.perf_counter() - started, 2),
+                )
+                print(f"✅ Ingestion job {job['job_id']} done in {job['seconds']}s")
+
+            except Exception as e:
+                self.failed += 1
+                print(f"❌ Ingestion job {job['job_id']} failed: {e}")
+                self._update(job, status="failed", error=str(e))
+
+            finally:
+                if isinstance(source, str):
+                    try:
+                        os.unlink(source)
+                    except OSError:
+                        pass
+
+    # -------------------------------------------------------------------
+    # Read
+    # -------------------------------------------------------------------
+    def get(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """The job, only if ``user_id`` owns it."""
+        job = self._jobs.get(job_id)
+        if job is None or not user_id or job["user_id"] != user_id:
+            return None
+        return job
+
+    async def events(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Job state after every change (and as a heartbeat) until it ends."""
+        while True:
+            job = self._jobs.get(job_id)
+            if job is None:
+                yield {"job_id": job_id, "status": "unknown"}
+                return
+
+            changed = self._changed.get(job_id) or asyncio.Event()
+            yield self.public(job)
+            if job["status"] in TERMINAL_STATUSES:
+                return
+
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=INGESTION_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _wait(self, job_id: str, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        async for state in self.events(job_id):
+            if state["status"] in TERMINAL_STATUSES or time.monotonic() >= deadline:
+                return
+
+    async def _load_result(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        if not user_id:
+            return None
+
+        job = self._jobs.get(job_id)
+        if job is not None:
+            if job["user_id"] != user_id:
+                return None
+            if job["status"] not in TERMINAL_STATUSES:
+                print(f"⏳ Waiting for ingestion job {job_id}...")
+                await self._wait(job_id, INGESTION_WAIT_SECONDS)
+            if job.get("_result"):
+                return job["_result"]
+            if job["status"] == "failed":
+                return {"name": job["name"], "type": job["type"], "kind": job["kind"], "error": job["error"]}
+            if job["status"] != "done":
+                return {
+                    "name": job["name"], "type": job["type"], "kind": job["kind"],
+                    "error": "Document is still being processed",
+                }
+
+        # Finished on another worker (or this one, before a restart)
+        try:
+            uuid.UUID(job_id)
+        except ValueError:
+            return None
+        try:
+            stored = await repository.get_ingested_document(job_id, user_id)
+        except Exception as e:
+            print(f"⚠️ Ingested document lookup failed for {job_id}: {e}")
+            return None
+        if stored is None:
+            return None
+        return {k: v for k, v in stored.items() if v is not None}
+
+    async def resolve_documents(
+        self,
+        document_ids: Optional[List[str]],
+        user_id: str,
+        max_chars: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Finished documents for ``document_ids`` as process_attachments-style
+        results (``{"name", "type", "kind", "text" | "description" | "error"}``),
+        in the given order. Only documents ingested by ``user_id`` are
+        returned; unknown ids and ids owned by someone else are skipped.
+        """
+        if not document_ids:
+            return []
+
+        loaded = await asyncio.gather(
+            *(self._load_result(str(job_id), user_id) for job_id in document_ids)
+        )
+
+        results = []
+        for job_id, result in zip(document_ids, loaded):
+            if result is None:
+                print(f"⚠️ Ingested document not found: {job_id}")
+                continue
+            result = {**result, "document_id": str(job_id)}
+            if max_chars and result.get("text"):
+                result["text"] = result["text"][:max_chars]
+            results.append(result)
+
+        print(f"📎 Resolved {len(results)}/{len(document_ids)} ingested documents")
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        running = sum(1 for job in self._jobs.values() if job["status"] == "running")
+        queued = sum(1 for job in self._jobs.values() if job["status"] == "queued")
+        return {
+            "workers": self.workers,
+            "jobs": len(self._jobs),
+            "running": running,
+            "queued": queued,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+ingestion_jobs = IngestionJobs()
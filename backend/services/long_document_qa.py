@@ -0,0 +1,269 @@
+# backend/services/long_document_qa.py
+
+"""
+Long Document Q&A (map-reduce)
+------------------------------
+A document larger than the OCR share of the prompt budget used to be cut
+to fit, so questions about its later pages could not be answered.
+
+Long-document mode answers the question over the whole document instead:
+
+- map:    the text is split into groups of consecutive chunks (page-aware,
+          see document_store.chunk_document) and the question is asked of
+          every group concurrently with a cheap model, bounded by a
+          semaphore
+- reduce: the partial answers, tagged with their page ranges, replace the
+          document text in the agent's OCR section, so the normal agent
+          call (memory, persona, streaming) writes the final response
+
+The map calls run in parallel, so a turn costs roughly one short map call
+plus the usual agent call regardless of the document length. Token counting
+and splitting of the (up to 400k character) text run in a worker thread.
+"""
+
+import os
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from backend.services.context_budget import (
+    CHARS_PER_TOKEN,
+    CONTEXT_TOKEN_BUDGET,
+    SECTION_SHARES,
+    count_tokens,
+    get_prompt_budget,
+    truncate_to_tokens,
+)
+from backend.services.document_store import chunk_document
+from backend.services.openai_agent import AGENT_MAX_TOKENS, get_openai_client
+from backend.utils.retry import retry
+
+LONG_DOC_QA_ENABLED = os.getenv("LONG_DOC_QA_ENABLED", "true").lower() == "true"
+LONG_DOC_QA_MODEL = os.getenv("LONG_DOC_QA_MODEL", "gpt-4o-mini")
+LONG_DOC_QA_CONCURRENCY = int(os.getenv("LONG_DOC_QA_CONCURRENCY", "8"))
+# Document text per map call
+LONG_DOC_MAP_TOKENS = int(os.getenv("LONG_DOC_MAP_TOKENS", "6000"))
+LONG_DOC_MAP_MAX_TOKENS = int(os.getenv("LONG_DOC_MAP_MAX_TOKENS", "400"))
+# Cost guard: documents are read up to this many map calls
+LONG_DOC_MAX_PARTS = int(os.getenv("LONG_DOC_MAX_PARTS", "40"))
+# Hard ceiling on extraction per document (see document_char_budget)
+LONG_DOC_MAX_CHARS = int(os.getenv("LONG_DOC_MAX_CHARS", "400000"))
+# Documents up to this size go to the agent as they are
+LONG_DOC_THRESHOLD_TOKENS = int(
+    os.getenv("LONG_DOC_THRESHOLD_TOKENS", str(int(CONTEXT_TOKEN_BUDGET * SECTION_SHARES["ocr"])))
+)
+
+NO_RELEVANT_INFO = "NO_RELEVANT_INFO"
+
+MAP_SYSTEM_PROMPT = (
+    "You read one part of a longer document and extract what answers the user's question. "
+    "Use ONLY the text of this part. Copy numbers, amounts, dates and names exactly. "
+    "Mention the page for every fact (the text is tagged with [Page N]). "
+    "Answer in the language of the question. "
+    f"If this part contains nothing relevant, reply exactly {NO_RELEVANT_INFO}."
+)
+
+_map_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_map_semaphore() -> asyncio.Semaphore:
+    global _map_semaphore
+    if _map_semaphore is None:
+        _map_semaphore = asyncio.Semaphore(LONG_DOC_QA_CONCURRENCY)
+    return _map_semaphore
+
+
+# -------------------------------------------------------------------
+# Split
+# -------------------------------------------------------------------
+def _page_label(first: Optional[int], last: Optional[int]) -> str:
+    if first is None:
+        return "unpaged text"
+    return f"page {first}" if first == last else f"pages {first}-{last}"
+
+
+def split_for_map(text: str, max_tokens: int = LONG_DOC_MAP_TOKENS) -> List[Dict[str, Any]]:
+    """
+    Pack consecutive page-local chunks into parts of at most ``max_tokens``.
+    Each part is ``{"label", "text"}``, text tagged with [Page N] headers.
+    """
+    parts: List[Dict[str, Any]] = []
+    lines: List[str] = []
+    used = 0
+    first_page = last_page = None
+    current_page = object()
+
+    def flush() -> None:
+        if lines:
+            parts.append({"label": _page_label(first_page, last_page), "text": "\n\n".join(lines)})
+
+    for chunk in chunk_document(text):
+        content = chunk["content"]
+        page = chunk["page_number"]
+        tokens = count_tokens(content)
+
+        if lines and used + tokens > max_tokens:
+            flush()
+            lines, used = [], 0
+            first_page = last_page = None
+            current_page = object()
+
+        if tokens > max_tokens:
+            content = truncate_to_tokens(content, max_tokens)
+            tokens = max_tokens
+
+        if page != current_page:
+            lines.append(f"[Page {page}]" if page is not None else "[Text]")
+            current_page = page
+        lines.append(content)
+        used += tokens
+
+        if page is not None:
+            first_page = page if first_page is None else first_page
+            last_page = page
+
+    flush()
+    return parts
+
+
+# -------------------------------------------------------------------
+# Map
+# -------------------------------------------------------------------
+async def _map_part(question: str, document_name: str, part: Dict[str, Any], index: int, total: int) -> str:
+    client = get_openai_client()
+
+    async def call() -> str:
+        response = await client.chat.completions.create(
+            model=LONG_DOC_QA_MODEL,
+            messages=[
+                {"role": "system", "content": MAP_SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": (
+                        f"Document: {document_name} — part {index}/{total} ({part['label']})\n\n"
+                        f"{part['text']}\n\n"
+                        f"Question: {question}"
+                    ),
+                },
+            ],
+            temperature=0,
+            max_tokens=LONG_DOC_MAP_MAX_TOKENS,
+        )
+        return (response.choices[0].message.content or "").strip()
+
+    async with _get_map_semaphore():
+        return await retry(call, max_attempts=2, delay_seconds=1)
+
+
+async def map_document(question: str, document_name: str, text: str) -> str:
+    """
+    Ask ``question`` of every part of the document concurrently and return
+    the relevant partial answers as one text, in document order.
+    """
+    parts = await asyncio.to_thread(split_for_map, text)
+    total_parts = len(parts)
+    if len(parts) > LONG_DOC_MAX_PARTS:
+        print(f"⚠️ {document_name}: {len(parts)} parts, reading the first {LONG_DOC_MAX_PARTS}")
+        parts = parts[:LONG_DOC_MAX_PARTS]
+
+    print(f"🗺️ Long-document mode: {document_name} → {len(parts)} parts")
+    results = await asyncio.gather(
+        *(
+            _map_part(question, document_name, part, i, len(parts))
+            for i, part in enumerate(parts, start=1)
+        ),
+        return_exceptions=True,
+    )
+
+    notes: List[str] = []
+    failed = []
+    for part, result in zip(parts, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ Map call failed for {document_name} ({part['label']}): {result}")
+            failed.append(part["label"])
+            continue
+        if not result or NO_RELEVANT_INFO in result[:len(NO_RELEVANT_INFO) + 5]:
+            continue
+        notes.append(f"[{part['label']}]\n{result}")
+
+    header = (
+        f"Partial answers extracted from all {len(parts)} parts of this document "
+        f"for the current question (parts without relevant content are omitted)."
+    )
+    if total_parts > len(parts):
+        header += f" Only the first {len(parts)} of {total_parts} parts were read (up to {parts[-1]['label']})."
+    if failed:
+        header += f" These parts could not be read: {', '.join(failed)}."
+    if not notes:
+        notes.append("No part of the document contains information relevant to the question.")
+
+    print(f"✅ {document_name}: {len(notes)} relevant parts")
+    return header + "\n\n" + "\n\n".join(notes)
+
+
+# -------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------
+def document_char_budget(model_name: str = "gpt-4o-mini") -> int:
+    """
+    Characters of a document worth extracting for one turn, from the
+    tokens the turn can actually spend on it: everything the map step
+    reads (LONG_DOC_MAX_PARTS parts of LONG_DOC_MAP_TOKENS) in long-document
+    mode, otherwise the model's prompt budget. Extraction stops there.
+    """
+    if LONG_DOC_QA_ENABLED:
+        tokens = LONG_DOC_MAX_PARTS * LONG_DOC_MAP_TOKENS
+    else:
+        tokens = get_prompt_budget(model_name, AGENT_MAX_TOKENS)
+    return min(LONG_DOC_MAX_CHARS, tokens * CHARS_PER_TOKEN)
+
+
+def is_long_document(text: str, model_name: str = "gpt-4o-mini") -> bool:
+    return count_tokens(text, model_name) > LONG_DOC_THRESHOLD_TOKENS
+
+
+def _long_document_indexes(documents: List[Dict[str, Any]], model_name: str) -> List[int]:
+    return [
+        i for i, doc in enumerate(documents)
+        if is_long_document(doc.get("text") or "", model_name)
+    ]
+
+
+async def answer_over_long_documents(
+    question: str,
+    documents: List[Dict[str, Any]],
+    model_name: str = "gpt-4o-mini",
+) -> List[Dict[str, Any]]:
+    """
+    Map step for a turn's ``[{"name", "text"}]`` documents: long documents
+    are replaced by the partial answers for ``question`` (the agent call
+    is the reduce step); short ones are returned unchanged.
+    """
+    if not LONG_DOC_QA_ENABLED or not question.strip():
+        return documents
+
+    long_indexes = await asyncio.to_thread(_long_document_indexes, documents, model_name)
+    if not long_indexes:
+        return documents
+
+    mapped = await asyncio.gather(
+        *(
+            map_document(question, documents[i].get("name") or "Document", documents[i]["text"])
+            for i in long_indexes
+        ),
+        return_exceptions=True,
+    )
+
+    result = list(documents)
+    for i, notes in zip(long_indexes, mapped):
+        if isinstance(notes, Exception):
+            # Fall back to what fits the prompt, as before long-document mode
+            print(f"⚠️ Long-document mode failed for {documents[i].get('name')}: {notes}")
+            result[i] = {
+                **documents[i],
+                "text": await asyncio.to_thread(
+                    truncate_to_tokens, documents[i]["text"], LONG_DOC_THRESHOLD_TOKENS, model_name
+                ),
+            }
+            continue
+        result[i] = {**documents[i], "text": notes, "long_document": True}
+    return result
@@ -5,15 +5,23 @@ import json
 import asyncio
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import AsyncIterator, Optional, List, Dict, Any
 
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
 
+from backend.services.context_budget import assemble_context, count_tokens, get_prompt_budget
+from backend.utils.base64_utils import as_data_uri
+
 # Optional: safe load (main.py already loads .env globally)
 # Keeping this doesn't hurt in local testing.
 load_dotenv(dotenv_path=Path(__file__).resolve().parents[1] / ".env")
 
+# Reply length reserved out of the model's context window
+AGENT_MAX_TOKENS = 2500
+# Headers, separators, date line and reminders around the memory sections
+FUSION_OVERHEAD_TOKENS = 600
+
 # ============================================================
 # OpenAI client (singleton)
 # ============================================================
@@ -442,6 +450,37 @@ async def generate_short_summary(text: str) -> str:
         return ""
 
 
+async def generate_mid_term_summary(old_summary: str | None, latest_update: str) -> str:
+    """
+    Roll the thread's mid-term memory forward with the latest turn summary.
+    Returns the new 1–3 sentence MTM (raises on API errors so callers can retry).
+    """
+    client = get_openai_client()
+
+    prompt = f"""
+Summarize the conversation so far into a concise mid-term memory summary.
+Keep it to 1–3 sentences. Capture only the key user goals, facts, or decisions.
+
+Previous summary:
+{old_summary or ''}
+
+Latest update:
+{latest_update or ''}
+""".strip()
+
+    response = await client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "You are a precise summarization assistant."},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.3,
+        max_tokens=120,
+    )
+
+    return (response.choices[0].message.content or "").strip()
+
+
 # ============================================================
 # 🆕 IMAGE ANALYSIS WITH VISION (CRITICAL - from gemini.py)
 # ============================================================
@@ -455,8 +494,7 @@ async def analyze_image_with_openai(
 
     try:
         # Ensure proper data URI format for OpenAI Vision
-        if not base64_data.startswith("data:"):
-            base64_data = f"data:{mime_type};base64,{base64_data}"
+        base64_data = as_data_uri(base64_data, mime_type)
 
         response = await client.chat.completions.create(
             model="gpt-4o-mini",
@@ -488,7 +526,7 @@ async def analyze_image_with_openai(
 # OpenAI agent runner (NOW memory-aware)
 # ============================================================
 
-async def run_openai_agent(
+def build_agent_messages(
     message: str,
     agent: str = "default",
     model_name: str = "gpt-4o-mini",
@@ -497,20 +535,10 @@ async def run_openai_agent(
     conversation: str | None = None,
     ocr: List[Dict[str, Any]] | None = None,
     vision: List[Dict[str, Any]] | None = None,
-    **kwargs,
-) -> str:
+) -> List[Dict[str, Any]]:
     """
-    Memory-aware OpenAI agent (drop-in replacement for Gemini).
-
-    Accepts the same memory-ish inputs the Gemini runner used:
-    - conversation (STM)
-    - mid_summary (MTM)
-    - long_term_memory (LTM)
-    - ocr, vision
-
-    Returns:
-    - If model outputs a strict JSON tool-call → return JSON string
-    - Else → return stabilized Markdown reply
+    Build the [system, user] chat messages for the memory-aware agent.
+    Shared by run_openai_agent and stream_openai_agent.
     """
 
     now_utc = datetime.now(timezone.utc)
@@ -518,76 +546,68 @@ async def run_openai_agent(
     current_time_utc = now_utc.strftime("%H:%M:%S UTC")
 
     # -------------------------
-    # Trim MTM (max 2 sentences)
+    # Raw memory sections
     # -------------------------
-    def _limit_sentences(text: str, max_sentences: int = 2) -> str:
-        if not text:
-            return ""
-        parts = text.split(". ")
-        limited = ". ".join(parts[:max_sentences])
-        if text.strip().endswith("."):
-            limited += "."
-        return limited
-
-    mid_clean = _limit_sentences(mid_summary) if mid_summary else ""
+    mid_clean = (mid_summary or "").strip()
 
-    # -------------------------
-    # Trim LTM (header + top 3 bullets)
-    # -------------------------
-    trimmed_ltm = ""
+    ltm_list: List[str] = []
     if long_term_memory:
-        ltm_lines = [ln for ln in long_term_memory.splitlines() if ln.strip()]
-        header = ""
-        bullets: List[str] = []
-        for ln in ltm_lines:
-            if not header and not ln.strip().startswith("-"):
-                header = ln.strip()
-            elif ln.strip().startswith("-"):
-                bullets.append(ln.strip())
-        kept_bullets = bullets[:3]
-        lines_out: List[str] = []
-        if header:
-            lines_out.append(header)
-        lines_out.extend(kept_bullets)
-        trimmed_ltm = "\n".join(lines_out).strip()
+        ltm_list = [ln.strip() for ln in long_term_memory.splitlines() if ln.strip()]
 
-    # -------------------------
-    # Trim STM conversation (keep last 10 lines)
-    # -------------------------
-    trimmed_conversation = ""
+    stm_list: List[str] = []
     if conversation:
-        conv_lines = [ln for ln in conversation.splitlines() if ln.strip()]
-        if len(conv_lines) > 10:
-            conv_lines = conv_lines[-10:]
-        trimmed_conversation = "\n".join(conv_lines).strip()
+        stm_list = [ln for ln in conversation.splitlines() if ln.strip()]
 
-    # -------------------------
-    # Limit OCR / Vision (safe)
-    # -------------------------
-    limited_ocr: List[Dict[str, Any]] = []
-    for item in ocr or []:
-        text = (item.get("text") or "")[:20000]  # Increased for large Arabic docs
+    raw_ocr: List[Dict[str, Any]] = []
+    for item in (ocr or [])[:5]:  # fusion block shows at most 5 documents
+        text = item.get("text") or ""
         if text.strip():
-            limited_ocr.append({"name": item.get("name"), "text": text})
+            raw_ocr.append({"name": item.get("name"), "text": text})
 
-    limited_vision: List[Dict[str, Any]] = []
-    for idx, item in enumerate(vision or []):
-        if idx >= 2:
-            break
+    raw_vision: List[Dict[str, Any]] = []
+    for item in (vision or [])[:5]:
         desc = (item.get("description") or "").strip()
-        desc_lines = [ln.strip() for ln in desc.splitlines() if ln.strip()]
-        if len(desc_lines) > 3:
-            desc_lines = desc_lines[:3]
-        short_desc = "\n".join(desc_lines)
-        if short_desc:
-            limited_vision.append({"name": item.get("name"), "description": short_desc})
+        if desc:
+            raw_vision.append({"name": item.get("name"), "description": desc})
 
     # -------------------------
-    # Build memory fusion block
+    # Token budget: whatever the fixed prompt leaves for memory
     # -------------------------
-    stm_list = trimmed_conversation.splitlines() if trimmed_conversation else []
-    ltm_list = trimmed_ltm.splitlines() if trimmed_ltm else []
+    fixed_tokens = sum(
+        count_tokens(part, model_name)
+        for part in (
+            GOLDEN_SYSTEM_PROMPT,
+            KINBER_STYLE_BLOCK,
+            COMPLETION_ENFORCEMENT,
+            TOOLS_BLOCK,
+            get_agent_style_instructions(agent),
+            message,
+        )
+    ) + FUSION_OVERHEAD_TOKENS
+
+    memory_budget = get_prompt_budget(model_name, AGENT_MAX_TOKENS) - fixed_tokens
 
+    packed = assemble_context(
+        memory_budget,
+        model_name=model_name,
+        mtm=mid_clean,
+        ltm=ltm_list,
+        stm=stm_list,
+        ocr=raw_ocr,
+        vision=raw_vision,
+    )
+
+    mid_clean = packed["mtm"]
+    ltm_list = packed["ltm"]
+    stm_list = packed["stm"]
+    limited_ocr = packed["ocr"]
+    limited_vision = packed["vision"]
+    trimmed_ltm = "\n".join(ltm_list)
+    trimmed_conversation = "\n".join(stm_list)
+
+    # -------------------------
+    # Build memory fusion block
+    # -------------------------
     memory_fusion_block = build_memory_fusion_block(
         stm=stm_list,
         mtm=mid_clean,
@@ -661,6 +681,60 @@ RULES:
         f"STM={'yes' if trimmed_conversation else 'no'}, "
         f"OCR={len(limited_ocr)}, Vision={len(limited_vision)}"
     )
+    usage = packed["usage"]
+    print(
+        f"🔍 OPENAI: memory tokens budget={usage['budget']} "
+        f"need={usage['need']} allow={usage['allow']}"
+    )
+
+    return [
+        {
+            "role": "system",
+            "content": system_message,
+        },
+        {
+            "role": "user",
+            "content": user_message,
+        },
+    ]
+
+
+async def run_openai_agent(
+    message: str,
+    agent: str = "default",
+    model_name: str = "gpt-4o-mini",
+    mid_summary: str | None = None,
+    long_term_memory: str | None = None,
+    conversation: str | None = None,
+    ocr: List[Dict[str, Any]] | None = None,
+    vision: List[Dict[str, Any]] | None = None,
+    **kwargs,
+) -> str:
+    """
+    Memory-aware OpenAI agent (drop-in replacement for Gemini).
+
+    Accepts the same memory-ish inputs the Gemini runner used:
+    - conversation (STM)
+    - mid_summary (MTM)
+    - long_term_memory (LTM)
+    - ocr, vision
+
+    Returns:
+    - If model outputs a strict JSON tool-call → return JSON string
+    - Else → return stabilized Markdown reply
+    """
+    # Token counting over long documents is CPU-bound: keep it off the loop
+    messages = await asyncio.to_thread(
+        build_agent_messages,
+        message,
+        agent=agent,
+        model_name=model_name,
+        mid_summary=mid_summary,
+        long_term_memory=long_term_memory,
+        conversation=conversation,
+        ocr=ocr,
+        vision=vision,
+    )
 
     # -------------------------
     # Call OpenAI with FULL system memory (Gemini-equivalent)
@@ -670,18 +744,9 @@ RULES:
     try:
         response = await client.chat.completions.create(
             model=model_name,
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_message,
-                },
-                {
-                    "role": "user",
-                    "content": user_message,
-                },
-            ],
+            messages=messages,
             temperature=0.7,  # Slightly higher for more natural, conversational responses
-            max_tokens=2500,  # Increased for comprehensive document analysis
+            max_tokens=AGENT_MAX_TOKENS,
         )
 
         raw = (response.choices[0].message.content or "").strip()
@@ -705,6 +770,60 @@ RULES:
         return f"OpenAI Error: {str(e)}"
 
 
+async def stream_openai_agent(
+    message: str,
+    agent: str = "default",
+    model_name: str = "gpt-4o-mini",
+    mid_summary: str | None = None,
+    long_term_memory: str | None = None,
+    conversation: str | None = None,
+    ocr: List[Dict[str, Any]] | None = None,
+    vision: List[Dict[str, Any]] | None = None,
+    **kwargs,
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of run_openai_agent.
+
+    Same prompt assembly, but yields content deltas as the model produces
+    them (AsyncOpenAI, stream=True). The caller is responsible for joining
+    the deltas and running stabilize_output on the full text.
+    """
+    # Token counting over long documents is CPU-bound: keep it off the loop
+    messages = await asyncio.to_thread(
+        build_agent_messages,
+        message,
+        agent=agent,
+        model_name=model_name,
+        mid_summary=mid_summary,
+        long_term_memory=long_term_memory,
+        conversation=conversation,
+        ocr=ocr,
+        vision=vision,
+    )
+
+    client = get_openai_client()
+
+    try:
+        stream = await client.chat.completions.create(
+            model=model_name,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=AGENT_MAX_TOKENS,
+            stream=True,
+        )
+
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+    except Exception as e:
+        print(f"❌ OpenAI agent stream error: {e}")
+        yield f"OpenAI Error: {str(e)}"
+
+
 # ============================================================
 # 🆕 LEGACY COMPATIBILITY WRAPPER (from gemini.py)
 # ============================================================
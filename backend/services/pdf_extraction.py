@@ -0,0 +1,245 @@
+# backend/services/pdf_extraction.py
+
+"""
+PDF Extraction Service
+----------------------
+Process-pool backed replacement for calling
+``attachment_extractor.extract_attachment_text`` on the request thread.
+
+Large documents are split into page ranges that are extracted in parallel
+across worker processes and reassembled in page order, so a 100-page
+statement costs about (pages / workers) instead of (pages) and never blocks
+the event loop.
+
+Output format is identical to the serial extractor ("--- Page N ---").
+Complete results are stored in the content-addressed extraction cache, so
+a document that was seen before returns without touching the pool.
+"""
+
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+from backend.services.extraction_cache import extraction_cache, content_key, file_content_key
+from backend.utils.attachment_extractor import (
+    PDF_EXTRACTOR_VERSION,
+    PdfSource,
+    extract_page_range,
+    inspect_pdf,
+    join_pages,
+    take_pages,
+)
+from backend.utils.base64_utils import decode_base64, decode_base64_to_temp_file, decoded_size
+
+PDF_EXTRACTION_WORKERS = int(
+    os.getenv("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+PDF_PAGES_PER_CHUNK = int(os.getenv("PDF_PAGES_PER_CHUNK", "8"))
+PDF_EXTRACTION_TIMEOUT = float(os.getenv("PDF_EXTRACTION_TIMEOUT", "120"))
+# Base64 PDFs larger than this are decoded to a temp file, not into memory
+PDF_SPOOL_THRESHOLD_BYTES = int(os.getenv("PDF_SPOOL_THRESHOLD_BYTES", str(4 * 1024 * 1024)))
+
+
+class PdfExtractionService:
+    def __init__(
+        self,
+        max_workers: int = PDF_EXTRACTION_WORKERS,
+        pages_per_chunk: int = PDF_PAGES_PER_CHUNK,
+        timeout: float = PDF_EXTRACTION_TIMEOUT,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.pages_per_chunk = max(1, pages_per_chunk)
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    # -------------------------------------------------------------------
+    # Pool
+    # -------------------------------------------------------------------
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that already runs threads (uvicorn,
+            # DB executor) can deadlock the child on inherited locks
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            print(f"✅ PDF extraction pool ready ({self.max_workers} processes)")
+        return self._pool
+
+    async def _submit(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_pool(), fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a huge file); start fresh next time
+            self._pool = None
+            raise
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+    # -------------------------------------------------------------------
+    # Extraction
+    # -------------------------------------------------------------------
+    def page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        """
+        Split [0, page_count) into ranges of at most ``pages_per_chunk``
+        pages, but small enough that every worker gets something to do.
+        """
+        if page_count <= 0:
+            return []
+        per_worker = -(-page_count // self.max_workers)  # ceil
+        size = max(1, min(self.pages_per_chunk, per_worker))
+        return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+    async def extract(
+        self,
+        pdf_source: PdfSource,
+        use_cache: bool = True,
+        max_chars: Optional[int] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> str:
+        """
+        Extract a PDF's pages in order until ``max_chars`` of text (or the
+        whole document) is reached; later page ranges are never started.
+        If the per-document timeout expires, the pages finished so far are
+        returned (in order) and not cached.
+
+        ``on_progress(pages_done, page_count)`` is called as page ranges
+        finish (not on cache hits).
+
+        ``pdf_source`` is the PDF bytes or the path of a PDF on disk; a path
+        is what the workers receive, so large uploads are never copied
+        into memory here.
+        """
+        if not use_cache:
+            text, _ = await self._extract_pages(pdf_source, max_chars, on_progress)
+            return text
+
+        key_fn = file_content_key if isinstance(pdf_source, str) else content_key
+        key = await asyncio.to_thread(key_fn, pdf_source, "pdf_pages", PDF_EXTRACTOR_VERSION)
+        cached = await extraction_cache.get(key)
+        if cached is not None:
+            print(f"⚡ PDF extraction cache hit ({len(cached)} chars)")
+            return cached[:max_chars] if max_chars is not None else cached
+
+        # A budgeted extraction that stopped early is cached under its budget
+        budget_key = f"{key}-max{max_chars}" if max_chars is not None else None
+        if budget_key:
+            cached = await extraction_cache.get(budget_key)
+            if cached is not None:
+                print(f"⚡ PDF extraction cache hit ({len(cached)} chars, budget {max_chars})")
+                return cached
+
+        text, outcome = await self._extract_pages(pdf_source, max_chars, on_progress)
+        if outcome == "complete":
+            await extraction_cache.set(key, text)
+        elif outcome == "budget" and budget_key:
+            await extraction_cache.set(budget_key, text)
+        return text
+
+    async def _extract_pages(
+        self,
+        pdf_source: PdfSource,
+        max_chars: Optional[int] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Tuple[str, str]:
+        """
+        Returns (text, outcome); outcome is "complete", "budget" (stopped at
+        max_chars) or "partial" (timeout / failed range).
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+
+        # Page count and OCR language in one task; every range reuses the language
+        page_count, document_langs = await asyncio.wait_for(
+            self._submit(inspect_pdf, pdf_source), timeout=self.timeout
+        )
+        pending_ranges = iter(self.page_ranges(page_count))
+        inflight: Deque[Tuple[int, asyncio.Future]] = deque()
+
+        if on_progress:
+            on_progress(0, page_count)
+
+        def submit_next() -> bool:
+            page_range = next(pending_ranges, None)
+            if page_range is None:
+                return False
+            inflight.append((page_range[1], asyncio.ensure_future(
+                self._submit(extract_page_range, pdf_source, *page_range, document_langs)
+            )))
+            return True
+
+        # Every worker busy plus one queued range each; more would only be
+        # wasted if the budget is reached early
+        while len(inflight) < self.max_workers * 2 and submit_next():
+            pass
+
+        pages: List[Tuple[int, str]] = []
+        used_chars = 0
+        outcome = "complete"
+
+        try:
+            while inflight:
+                range_end, task = inflight.popleft()
+                try:
+                    range_pages = await asyncio.wait_for(task, timeout=max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    print(f"⚠️ PDF extraction timed out after {self.timeout}s ({len(pages)} pages done)")
+                    if not pages:
+                        raise asyncio.TimeoutError(f"PDF extraction exceeded {self.timeout}s")
+                    outcome = "partial"
+                    break
+                except Exception as e:
+                    print(f"⚠️ PDF page range failed: {e}")
+                    outcome = "partial"
+                    range_pages = []
+
+                submit_next()
+                if on_progress:
+                    on_progress(range_end, page_count)
+
+                remaining = max_chars - used_chars if max_chars is not None else None
+                taken, fits = take_pages(range_pages, max_chars=remaining)
+                pages.extend(taken)
+                used_chars += sum(len(page_text) for _, page_text in taken)
+
+                if not fits:
+                    if outcome == "complete":
+                        outcome = "budget"
+                    break
+        finally:
+            # Queued ranges are dropped; ranges already running finish in
+            # the background and their result is discarded
+            for _, task in inflight:
+                task.cancel()
+
+        return join_pages(pages), outcome
+
+    async def extract_base64(self, base64_data: str, max_chars: Optional[int] = None) -> str:
+        """
+        Same as ``extract`` for a base64 / data-URI attachment payload.
+        Oversize payloads are rejected before decoding; large ones are
+        decoded in chunks into a temp file that the workers open by path.
+        """
+        if decoded_size(base64_data) <= PDF_SPOOL_THRESHOLD_BYTES:
+            pdf_bytes = await asyncio.to_thread(decode_base64, base64_data, "pdf")
+            return await self.extract(pdf_bytes, max_chars=max_chars)
+
+        path = await asyncio.to_thread(decode_base64_to_temp_file, base64_data, "pdf", suffix=".pdf")
+        try:
+            return await self.extract(path, max_chars=max_chars)
+        finally:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+pdf_extraction_service = PdfExtractionService()
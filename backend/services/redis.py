@@ -9,6 +9,7 @@ from backend.utils.retry import retry
 
 # Redis client and initialization
 client: redis.Redis | None = None
+pool: redis.ConnectionPool | None = None
 _initialized: bool = False
 _init_lock: asyncio.Lock = asyncio.Lock()
 
@@ -17,32 +18,23 @@ REDIS_KEY_TTL: int = 3600 * 24  # 24 hour TTL as safety mechanism
 
 
 async def initialize():
-    """Initialize Redis client using values from config."""
-    global client, _initialized
+    """Initialize the Redis connection pool using values from config."""
+    global client, pool
 
-    if client is None:
-        async with _init_lock:
-            if not _initialized:
-                redis_url = f"redis://{config.REDIS_HOST}:{config.REDIS_PORT}"
-                client = redis.from_url(
-                    redis_url,
-                    password=config.REDIS_PASSWORD or None,
-                    ssl=config.REDIS_SSL,
-                )
-                _initialized = True
-                logger.info("Redis initialized")
-    
     # Connection pool configuration
     max_connections = int(os.getenv("REDIS_MAX_CONNECTIONS", 1024))
     retry_on_timeout = not (os.getenv("REDIS_RETRY_ON_TIMEOUT", "True").lower() != "true")
 
+    redis_host = config.REDIS_HOST
+    redis_port = config.REDIS_PORT
+    scheme = "rediss" if config.REDIS_SSL else "redis"
+
     logger.info(f"Initializing Redis connection pool to {redis_host}:{redis_port} with max {max_connections} connections")
 
     # Create connection pool
-    pool = redis.ConnectionPool(
-        host=redis_host,
-        port=redis_port,
-        password=redis_password,
+    pool = redis.ConnectionPool.from_url(
+        f"{scheme}://{redis_host}:{redis_port}",
+        password=config.REDIS_PASSWORD or None,
         decode_responses=True,
         socket_timeout=5.0,
         socket_connect_timeout=5.0,
@@ -64,7 +56,7 @@ async def initialize_async():
     async with _init_lock:
         if not _initialized:
             logger.info("Initializing Redis connection")
-            initialize()
+            await initialize()
 
         try:
             await client.ping()
@@ -87,7 +79,7 @@ async def close():
         await client.aclose()
         client = None
     
-    if "pool" in globals() and pool:
+    if pool:
         logger.info("Closing Redis connection pool")
         await pool.aclose()
         pool = None
@@ -0,0 +1,119 @@
+# backend/services/redis_tier.py
+
+"""
+Optional Redis tier shared by the in-process caches (context_cache,
+extraction_cache).
+
+Redis is never required: if it is not configured or unreachable, the tier
+is skipped for a cool-down period and every call returns as if the key
+were missing, so the caches keep working from their local tier only.
+"""
+
+import time
+from typing import Any, Callable, Optional
+
+REDIS_RETRY_AFTER = 60  # seconds to skip Redis after a failure
+REDIS_UPDATE_ATTEMPTS = 5  # optimistic read-modify-write retries on conflict
+
+
+class RedisTier:
+    def __init__(self, name: str, enabled: bool = True, client: Any = None):
+        self.name = name
+        self.enabled = enabled
+        # Injected client (tests, scripts); otherwise the app-wide pool
+        self._client = client
+        self._skip_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return self.enabled and time.monotonic() >= self._skip_until
+
+    async def client(self):
+        """The Redis client, or None while the tier is disabled / cooling down."""
+        if not self.available:
+            return None
+        if self._client is not None:
+            return self._client
+        try:
+            # Imported lazily: loading it validates the full app config
+            from backend.services import redis
+            return await redis.get_client()
+        except Exception as e:
+            self.failed(e)
+            return None
+
+    def failed(self, error: Exception) -> None:
+        print(f"⚠️ {self.name} Redis tier unavailable, skipping for {REDIS_RETRY_AFTER}s: {error}")
+        self._skip_until = time.monotonic() + REDIS_RETRY_AFTER
+
+    async def get(self, key: str) -> Optional[str]:
+        client = await self.client()
+        if client is None:
+            return None
+        try:
+            return await client.get(key)
+        except Exception as e:
+            self.failed(e)
+            return None
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None) -> None:
+        client = await self.client()
+        if client is None:
+            return
+        try:
+            await client.set(key, value, ex=ex)
+        except Exception as e:
+            self.failed(e)
+
+    async def delete(self, key: str) -> None:
+        client = await self.client()
+        if client is None:
+            return
+        try:
+            await client.delete(key)
+        except Exception as e:
+            self.failed(e)
+
+    async def update(
+        self,
+        key: str,
+        fn: Callable[[str], str],
+        ex: Optional[int] = None,
+        attempts: int = REDIS_UPDATE_ATTEMPTS,
+    ) -> Optional[str]:
+        """
+        Atomically replace the value at ``key`` with ``fn(value)``
+        (WATCH / MULTI, retried when another writer got there first).
+        Returns the new value; None when the key is missing, Redis is
+        unavailable, or the update kept conflicting (the key is then
+        deleted so readers fall back to the source of truth).
+        """
+        client = await self.client()
+        if client is None:
+            return None
+
+        from redis.exceptions import WatchError
+
+        try:
+            for _ in range(attempts):
+                async with client.pipeline(transaction=True) as pipe:
+                    try:
+                        await pipe.watch(key)
+                        current = await pipe.get(key)
+                        if current is None:
+                            await pipe.unwatch()
+                            return None
+                        value = fn(current)
+                        pipe.multi()
+                        pipe.set(key, value, ex=ex)
+                        await pipe.execute()
+                        return value
+                    except WatchError:
+                        continue
+
+            print(f"⚠️ {self.name}: {key} kept changing during update, dropping it")
+            await client.delete(key)
+            return None
+        except Exception as e:
+            self.failed(e)
+            return None
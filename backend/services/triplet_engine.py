@@ -3,23 +3,38 @@
 import asyncio
 import base64
 import os
-from typing import Dict, List, Optional
-from openai import OpenAI
-from anthropic import Anthropic
+from functools import partial
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from openai import AsyncOpenAI
 
-# Initialize clients with environment variables
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-anthropic_client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+from backend.services.claude import get_claude_client
+from backend.services.openai_agent import get_openai_client
+from backend.utils.base64_utils import as_data_uri, base64_payload, check_base64_size
 
-try:
-    from openai import OpenAI as DeepSeekClient
-    deepseek_client = DeepSeekClient(
-        api_key=os.getenv("DEEPSEEK_API_KEY"),
-        base_url="https://api.deepseek.com"
-    )
-except Exception as e:
-    print(f"⚠️ DeepSeek client init failed: {e}")
-    deepseek_client = None
+# ------------------------------------------------------------
+# Clients (async, shared)
+# ------------------------------------------------------------
+# GPT and Claude reuse the app-wide async clients, so triplet calls share
+# their pooled HTTP connections instead of holding an executor thread each
+_deepseek_client: Optional[AsyncOpenAI] = None
+
+
+def get_deepseek_client() -> Optional[AsyncOpenAI]:
+    """Create/reuse a single AsyncOpenAI client for the DeepSeek API."""
+    global _deepseek_client
+
+    if _deepseek_client is not None:
+        return _deepseek_client
+
+    try:
+        _deepseek_client = AsyncOpenAI(
+            api_key=os.getenv("DEEPSEEK_API_KEY"),
+            base_url="https://api.deepseek.com"
+        )
+    except Exception as e:
+        print(f"⚠️ DeepSeek client init failed: {e}")
+        return None
+    return _deepseek_client
 
 
 # ------------------------------------------------------------
@@ -28,29 +43,89 @@ except Exception as e:
 NEUTRAL_INSTRUCTION = "You are a helpful AI assistant. Provide nuanced, concise, and direct answers. Focus on accuracy and clarity."
 
 
+def _image_attachments(attachments: Optional[List]) -> List[Dict]:
+    """Image attachments within the size limit (checked on the encoded length)."""
+    images = []
+    for att in attachments or []:
+        if not att.get("type", "").startswith("image/") or not att.get("base64"):
+            continue
+        try:
+            check_base64_size(att["base64"], field_name=att.get("name") or "image")
+        except ValueError as e:
+            print(f"⚠️ Skipping image: {e}")
+            continue
+        images.append(att)
+    return images
+
+
+# ------------------------------------------------------------
+# Token streaming (opt-in)
+# ------------------------------------------------------------
+# Called on the event loop with each text delta as the model generates it
+DeltaCallback = Callable[[str], None]
+
+
+async def _openai_deltas(client: AsyncOpenAI, request: Dict) -> AsyncIterator[str]:
+    """Text deltas of a streamed chat completion (OpenAI and DeepSeek)."""
+    stream = await client.chat.completions.create(stream=True, **request)
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def _anthropic_deltas(request: Dict) -> AsyncIterator[str]:
+    async with get_claude_client().messages.stream(**request) as stream:
+        async for text in stream.text_stream:
+            yield text
+
+
+async def _stream_deltas(
+    deltas: AsyncIterator[str],
+    on_delta: DeltaCallback,
+    strip: bool = False,
+) -> str:
+    """
+    Hand every delta to ``on_delta`` and return the full text. With
+    ``strip`` leading whitespace is dropped and trailing whitespace held
+    back until more text follows, so the deltas add up to the stripped text.
+    """
+    parts = []
+    held = ""
+    async for delta in deltas:
+        if strip:
+            if not parts:
+                delta = delta.lstrip()
+            text = held + delta
+            delta = text.rstrip()
+            held = text[len(delta):]
+        if delta:
+            parts.append(delta)
+            on_delta(delta)
+    return "".join(parts)
+
+
 # ------------------------------------------------------------
 # Model calls with IDENTICAL INSTRUCTIONS (Unbiased)
 # ------------------------------------------------------------
-async def _get_gpt(prompt: str, attachments: Optional[List] = None) -> str:
+async def _get_gpt(
+    prompt: str,
+    attachments: Optional[List] = None,
+    on_delta: Optional[DeltaCallback] = None,
+) -> str:
     """Call OpenAI GPT-4o-mini with neutral instructions"""
     try:
         content = []
         
         # Add images if any
-        if attachments:
-            for att in attachments:
-                if att.get("type", "").startswith("image/"):
-                    base64_data = att.get("base64", "")
-                    if base64_data.startswith("data:"):
-                        base64_data = base64_data.split(",", 1)[1]
-                    
-                    content.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{att['type']};base64,{base64_data}",
-                            "detail": "high"  # Changed back to high for better quality
-                        }
-                    })
+        for att in _image_attachments(attachments):
+            content.append({
+                "type": "image_url",
+                "image_url": {
+                    # Data URIs are passed through as-is (no copy)
+                    "url": as_data_uri(att["base64"], att["type"]),
+                    "detail": "high"  # Changed back to high for better quality
+                }
+            })
         
         # Add text prompt
         content.append({"type": "text", "text": prompt})
@@ -67,13 +142,16 @@ async def _get_gpt(prompt: str, attachments: Optional[List] = None) -> str:
             }
         ]
         
-        res = await asyncio.to_thread(
-            openai_client.chat.completions.create,
+        request = dict(
             model="gpt-4o-mini",
             messages=messages,
             temperature=0.3,  # Slightly increased for better responses
             max_tokens=600,   # Increased for more complete answers
         )
+        if on_delta:
+            return await _stream_deltas(_openai_deltas(get_openai_client(), request), on_delta)
+
+        res = await get_openai_client().chat.completions.create(**request)
         return res.choices[0].message.content
     except Exception as e:
         import traceback
@@ -81,36 +159,31 @@ async def _get_gpt(prompt: str, attachments: Optional[List] = None) -> str:
         return f"GPT Error: {str(e)}"
 
 
-async def _get_claude(prompt: str, attachments: Optional[List] = None) -> str:
+async def _get_claude(
+    prompt: str,
+    attachments: Optional[List] = None,
+    on_delta: Optional[DeltaCallback] = None,
+) -> str:
     """Call Claude Sonnet 4.5 with neutral instructions"""
     try:
         content = []
         
         # Add images first
-        if attachments:
-            for att in attachments:
-                if att.get("type", "").startswith("image/"):
-                    base64_data = att.get("base64", "")
-                    if base64_data.startswith("data:"):
-                        base64_data = base64_data.split(",", 1)[1]
-                    
-                    media_type = att.get("type", "image/jpeg")
-                    
-                    content.append({
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": media_type,
-                            "data": base64_data
-                        }
-                    })
+        for att in _image_attachments(attachments):
+            content.append({
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": att.get("type", "image/jpeg"),
+                    "data": base64_payload(att["base64"]),
+                }
+            })
         
         # Add text prompt with neutral instruction
         prompt_with_instruction = f"{prompt}\n\n{NEUTRAL_INSTRUCTION}"
         content.append({"type": "text", "text": prompt_with_instruction})
         
-        res = await asyncio.to_thread(
-            anthropic_client.messages.create,
+        request = dict(
             model="claude-sonnet-4-5-20250929",
             max_tokens=600,   # Increased for more complete answers
             temperature=0.3,  # Slightly increased for better responses
@@ -118,6 +191,10 @@ async def _get_claude(prompt: str, attachments: Optional[List] = None) -> str:
                 {"role": "user", "content": content}
             ],
         )
+        if on_delta:
+            return await _stream_deltas(_anthropic_deltas(request), on_delta)
+
+        res = await get_claude_client().messages.create(**request)
         return "".join(
             block.text for block in res.content
             if hasattr(block, "text")
@@ -128,8 +205,13 @@ async def _get_claude(prompt: str, attachments: Optional[List] = None) -> str:
         return f"Claude Error: {str(e)}"
 
 
-async def _get_deepseek(prompt: str, attachments: Optional[List] = None) -> str:
+async def _get_deepseek(
+    prompt: str,
+    attachments: Optional[List] = None,
+    on_delta: Optional[DeltaCallback] = None,
+) -> str:
     """Call DeepSeek - Text-only model (Vision not supported via API)"""
+    deepseek_client = get_deepseek_client()
     if not deepseek_client:
         return "DeepSeek Error: Client not initialized"
     
@@ -147,8 +229,7 @@ async def _get_deepseek(prompt: str, attachments: Optional[List] = None) -> str:
             enhanced_prompt = prompt
         
         # Make API call (text-only)
-        res = await asyncio.to_thread(
-            deepseek_client.chat.completions.create,
+        request = dict(
             model="deepseek-chat",
             messages=[
                 {"role": "system", "content": NEUTRAL_INSTRUCTION},
@@ -157,6 +238,10 @@ async def _get_deepseek(prompt: str, attachments: Optional[List] = None) -> str:
             max_tokens=600,
             temperature=0.3,
         )
+        if on_delta:
+            return await _stream_deltas(_openai_deltas(deepseek_client, request), on_delta)
+
+        res = await deepseek_client.chat.completions.create(**request)
         
         response = res.choices[0].message.content
         
@@ -168,32 +253,71 @@ async def _get_deepseek(prompt: str, attachments: Optional[List] = None) -> str:
         traceback.print_exc()
         return f"DeepSeek Error: {str(e)}"
 
+# ------------------------------------------------------------
+# Quorum / deadline
+# ------------------------------------------------------------
+# The verdict starts once this many responses are in...
+TRIPLET_QUORUM = int(os.getenv("TRIPLET_QUORUM", "3"))
+# ...or once this many seconds have passed (0 = no deadline)
+TRIPLET_DEADLINE_SECONDS = float(os.getenv("TRIPLET_DEADLINE_SECONDS", "0"))
+# How long the stream keeps waiting for late responses after the verdict started
+TRIPLET_LATE_GRACE_SECONDS = float(os.getenv("TRIPLET_LATE_GRACE_SECONDS", "30"))
+
+# Stand-in for a response that missed the verdict
+MISSING_RESPONSE = "(No response within the time limit)"
+# Verdict frame text when no model produced a usable response in time
+NO_VERDICT = "No verdict: none of the models returned a usable response in time."
+
+TRIPLET_MODELS = {
+    "gpt": _get_gpt,
+    "claude": _get_claude,
+    "deepseek": _get_deepseek,
+}
+# Prefix of each model's error responses ("GPT Error: ...")
+MODEL_LABELS = {"gpt": "GPT", "claude": "Claude", "deepseek": "DeepSeek"}
+
+
+def _is_error_response(model_name: str, response: str) -> bool:
+    return (response or "").startswith(f"{MODEL_LABELS[model_name]} Error:")
+
+
 # ------------------------------------------------------------
 # Unbiased Verdict Generator
 # ------------------------------------------------------------
 async def _generate_blind_verdict(
     prompt: str, 
     results: Dict[str, str], 
-    has_images: bool = False
+    has_images: bool = False,
+    on_delta: Optional[DeltaCallback] = None,
 ) -> str:
     """
     Generate professional unbiased verdict
     All models received identical instructions for fair comparison
+
+    With ``on_delta`` the verdict is streamed; the deltas (including the
+    notes appended at the end) add up to the returned text. A streamed
+    verdict that fails raises instead of returning the error verdict, since
+    part of it may already have been sent.
     """
     try:
         vision_context = ""
         if has_images:
             vision_context = "\nCONTEXT: All three models have vision capabilities and received identical instructions."
+        if any(model not in results for model in TRIPLET_MODELS):
+            vision_context += (
+                f"\nNOTE: A response shown as {MISSING_RESPONSE} did not arrive in time or failed. "
+                "Score it N/A and build the recommended answer from the others."
+            )
 
         blind_prompt = f"""You are an impartial AI judge evaluating three responses to the same question. All models received identical instructions, ensuring a fair comparison.
 
 QUESTION: {prompt}
 
-RESPONSE A: {results.get('gpt', 'N/A')}
+RESPONSE A: {results.get('gpt', MISSING_RESPONSE)}
 
-RESPONSE B: {results.get('claude', 'N/A')}
+RESPONSE B: {results.get('claude', MISSING_RESPONSE)}
 
-RESPONSE C: {results.get('deepseek', 'N/A')}
+RESPONSE C: {results.get('deepseek', MISSING_RESPONSE)}
 {vision_context}
 
 Evaluate based on:
@@ -222,27 +346,37 @@ RECOMMENDED ANSWER
 
 Be objective, fair, and evidence-based."""
 
-        res = await asyncio.to_thread(
-            openai_client.chat.completions.create,
+        request = dict(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": blind_prompt}],
             temperature=0.2,
             max_tokens=700,
         )
-        
-        verdict_text = res.choices[0].message.content.strip()
+        if on_delta:
+            verdict_text = await _stream_deltas(
+                _openai_deltas(get_openai_client(), request), on_delta, strip=True
+            )
+        else:
+            res = await get_openai_client().chat.completions.create(**request)
+            verdict_text = (res.choices[0].message.content or "").strip()
         
         if has_images:
             vision_note = "\n\nMODEL CAPABILITIES\n• GPT-4o-mini: Vision support ✓\n• Claude Sonnet 4.5: Vision support ✓\n• DeepSeek: Vision support ✓"
             verdict_text = verdict_text + vision_note
+            if on_delta:
+                on_delta(vision_note)
         
         footer = "\n\n───────────────────────────────────────────────────────────────\nThis verdict was generated by an independent AI judge that did not know which model produced which response."
+        if on_delta:
+            on_delta(footer)
         
         return verdict_text + footer
         
     except Exception as e:
         import traceback
         traceback.print_exc()
+        if on_delta:
+            raise
         
         return f"""EVALUATION SUMMARY
 
@@ -258,16 +392,192 @@ Error: {str(e)}
 This verdict was generated by an independent AI judge that did not know which model produced which response."""
 
 
+# ------------------------------------------------------------
+# Shared fan-out (models → verdict)
+# ------------------------------------------------------------
+async def _triplet_events(
+    prompt: str,
+    attachments: Optional[List],
+    make_verdict: Callable[[Dict[str, str], DeltaCallback], Awaitable[str]],
+    stream_tokens: bool = False,
+    quorum: Optional[int] = None,
+    deadline: Optional[float] = None,
+    late_grace: float = TRIPLET_LATE_GRACE_SECONDS,
+) -> AsyncIterator[Dict]:
+    """
+    Run the three models concurrently and yield their frames in arrival
+    order, then the verdict frame.
+
+    The verdict starts once ``quorum`` usable (non-error) responses are in,
+    every model has finished, or ``deadline`` seconds have passed, whichever
+    comes first, and is computed from the usable responses that arrived by
+    then; with none, the
+    verdict model is not called and a ``no_verdict`` frame is sent instead.
+    Responses that arrive later are still yielded (flagged ``"late"``)
+    until ``late_grace`` seconds after the verdict started; models that
+    miss that too get a timed-out error frame.
+
+    ``make_verdict(responses, on_delta)`` may stream the verdict through
+    ``on_delta``; those deltas become ``verdict_delta`` frames. If it
+    raises, the verdict frame carries the error and ``"error": true``.
+
+    Frames:
+      {"model", "delta"}                        token delta (stream_tokens)
+      {"model", "response", "elapsed"[, "late"]} finished model
+      {"model": "verdict", "verdict_delta"}      verdict token delta
+      {"model": "verdict", "response", "elapsed", "verdict_seconds", "responses"[, "no_verdict" | "error"]}
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    quorum = max(1, min(quorum or TRIPLET_QUORUM, len(TRIPLET_MODELS)))
+    deadline = TRIPLET_DEADLINE_SECONDS if deadline is None else deadline
+    deadline_at = start + deadline if deadline and deadline > 0 else None
+
+    # Deltas, finished responses and the verdict, in arrival order
+    events: asyncio.Queue = asyncio.Queue()
+
+    def emit_delta(model_name: str, delta: str) -> None:
+        events.put_nowait({"model": model_name, "delta": delta})
+
+    async def run_model(model_name: str, get_response) -> None:
+        on_delta = partial(emit_delta, model_name) if stream_tokens else None
+        try:
+            result = await get_response(prompt, attachments, on_delta=on_delta)
+            elapsed = loop.time() - start
+            print(f"✅ {model_name}: {elapsed:.1f}s ({len(result)}ch)")
+            event = {
+                "model": model_name,
+                "response": result,
+                "elapsed": round(elapsed, 1)
+            }
+            if _is_error_response(model_name, result):
+                event["error"] = True
+        except Exception as e:
+            event = {
+                "model": model_name,
+                "response": f"{MODEL_LABELS[model_name]} Error: {str(e)}",
+                "error": True
+            }
+        events.put_nowait(event)
+
+    def emit_verdict_delta(delta: str) -> None:
+        events.put_nowait({"model": "verdict", "verdict_delta": delta})
+
+    async def run_verdict(responses: Dict[str, str]) -> None:
+        verdict_start = loop.time()
+        frame: Dict = {}
+        if not responses:
+            # Nothing to judge: don't ask the verdict model about three blanks
+            frame = {"response": NO_VERDICT, "no_verdict": True}
+        else:
+            try:
+                frame = {"response": await make_verdict(responses, emit_verdict_delta)}
+            except Exception as e:
+                # Terminal frame: any verdict_delta frames sent so far are void
+                frame = {"response": f"Verdict Error: {str(e)}", "error": True}
+        events.put_nowait({
+            "model": "verdict",
+            **frame,
+            "elapsed": round(loop.time() - start, 1),
+            "verdict_seconds": round(loop.time() - verdict_start, 1),
+            "responses": list(responses),
+        })
+
+    # Create tasks for all 3 models with identical instructions
+    tasks = [
+        asyncio.create_task(run_model(model_name, get_response))
+        for model_name, get_response in TRIPLET_MODELS.items()
+    ]
+
+    results: Dict[str, str] = {}
+    failed = set()
+    verdict_task: Optional[asyncio.Task] = None
+    verdict_done = False
+    give_up_at = None
+
+    try:
+        while not (verdict_done and len(results) == len(TRIPLET_MODELS)):
+            now = loop.time()
+            usable_count = len(results) - len(failed)
+            if verdict_task is None and (
+                # Errors don't count toward the quorum: wait for real answers
+                usable_count >= quorum
+                or len(results) == len(TRIPLET_MODELS)
+                or (deadline_at is not None and now >= deadline_at)
+            ):
+                missing = [model for model in TRIPLET_MODELS if model not in results]
+                if missing:
+                    print(f"⏱️ Verdict on {len(results)}/{len(TRIPLET_MODELS)} responses "
+                          f"at {now - start:.1f}s (late: {', '.join(missing)})")
+                usable = {model: text for model, text in results.items() if model not in failed}
+                verdict_task = asyncio.create_task(run_verdict(usable))
+                give_up_at = now + late_grace
+
+            if verdict_task is None:
+                wait_until = deadline_at
+            else:
+                wait_until = give_up_at if verdict_done else None
+            timeout = None if wait_until is None else max(0.0, wait_until - loop.time())
+
+            if not events.empty():
+                event = events.get_nowait()
+            else:
+                try:
+                    event = await asyncio.wait_for(events.get(), timeout)
+                except asyncio.TimeoutError:
+                    if verdict_done:
+                        break
+                    continue
+
+            if "response" not in event:
+                pass
+            elif event["model"] == "verdict":
+                verdict_done = True
+            else:
+                results[event["model"]] = event["response"]
+                if event.get("error"):
+                    failed.add(event["model"])
+                if verdict_task is not None:
+                    event["late"] = True
+            yield event
+
+        # Models that missed the verdict and the grace period
+        for model_name in TRIPLET_MODELS:
+            if model_name not in results:
+                elapsed = loop.time() - start
+                print(f"⏱️ {model_name}: no response after {elapsed:.1f}s")
+                yield {
+                    "model": model_name,
+                    "response": f"{MODEL_LABELS[model_name]} Error: No response within {elapsed:.1f}s",
+                    "error": True,
+                    "timed_out": True,
+                }
+    finally:
+        # Client went away (or models gave up): stop the remaining calls
+        for task in tasks:
+            task.cancel()
+        if verdict_task is not None:
+            verdict_task.cancel()
+
+
 # ------------------------------------------------------------
 # Main Triplet Runner
 # ------------------------------------------------------------
 async def run_triplet(
     prompt: str, 
     attachments: Optional[List] = None, 
-    skip_ai_verdict: bool = False
+    skip_ai_verdict: bool = False,
+    quorum: Optional[int] = None,
+    deadline: Optional[float] = None,
 ) -> dict:
     """
-    Run prompt across 3 models with IDENTICAL INSTRUCTIONS for fair comparison
+    Run prompt across 3 models with IDENTICAL INSTRUCTIONS for fair comparison.
+
+    With ``quorum`` / ``deadline`` the verdict does not wait for a slow
+    model; responses that arrive while the verdict is generated are still
+    returned, anything later is reported as timed out. In that case
+    ``verdict_models`` lists the responses the verdict saw.
     """
     print(f"\n{'═' * 60}")
     print(f"🔀 TRIPLET REQUEST (UNBIASED)")
@@ -280,40 +590,18 @@ async def run_triplet(
         has_images = any(att.get("type", "").startswith("image/") for att in attachments)
         print(f"📎 Attachments: {len(attachments)} files")
         print(f"🖼️  Images: {'Yes' if has_images else 'No'}")
-    
-    # ✅ Run all three models in parallel with identical instructions
-    print(f"⚡ Starting parallel execution (all models: {NEUTRAL_INSTRUCTION})...")
-    start = asyncio.get_event_loop().time()
-    
-    gpt_res, claude_res, deepseek_res = await asyncio.gather(
-        _get_gpt(prompt, attachments),
-        _get_claude(prompt, attachments),
-        _get_deepseek(prompt, attachments),
-    )
-    
-    models_time = asyncio.get_event_loop().time() - start
-    print(f"⚡ Models: {models_time:.1f}s")
-    
-    results = {
-        "gpt": gpt_res,
-        "claude": claude_res,
-        "deepseek": deepseek_res,
-    }
-    
-    print(f"📊 GPT: {'✅' if not gpt_res.startswith('GPT Error:') else '❌'} ({len(gpt_res)}ch)")
-    print(f"📊 Claude: {'✅' if not claude_res.startswith('Claude Error:') else '❌'} ({len(claude_res)}ch)")
-    print(f"📊 DeepSeek: {'✅' if not deepseek_res.startswith('DeepSeek Error:') else '❌'} ({len(deepseek_res)}ch)")
-    
-    # ✅ Generate unbiased verdict
-    if skip_ai_verdict:
-        print(f"⚡ Skipping verdict")
-        verdict = f"""EVALUATION SUMMARY
+
+    async def make_verdict(responses: Dict[str, str], on_delta: DeltaCallback) -> str:
+        # The whole result is returned at once, so the verdict is not streamed
+        if skip_ai_verdict:
+            print(f"⚡ Skipping verdict")
+            return f"""EVALUATION SUMMARY
 
 All three models received identical instructions for fair comparison.
 
-Response A (GPT-4o-mini): {len(gpt_res)} chars
-Response B (Claude Sonnet 4.5): {len(claude_res)} chars  
-Response C (DeepSeek): {len(deepseek_res)} chars
+Response A (GPT-4o-mini): {len(responses.get('gpt', ''))} chars
+Response B (Claude Sonnet 4.5): {len(responses.get('claude', ''))} chars  
+Response C (DeepSeek): {len(responses.get('deepseek', ''))} chars
 
 RECOMMENDED ANSWER
 
@@ -321,14 +609,37 @@ Compare the three responses above to find the answer that best matches your need
 
 ───────────────────────────────────────────────────────────────
 Fair comparison ensured through identical instructions."""
-    else:
+
         print(f"⚡ Generating unbiased verdict...")
         verdict_start = asyncio.get_event_loop().time()
-        verdict = await _generate_blind_verdict(prompt, results, has_images=has_images)
+        verdict = await _generate_blind_verdict(prompt, responses, has_images=has_images)
         verdict_time = asyncio.get_event_loop().time() - verdict_start
         print(f"⚡ Verdict: {verdict_time:.1f}s")
+        return verdict
+    
+    # ✅ Run all three models in parallel with identical instructions
+    print(f"⚡ Starting parallel execution (all models: {NEUTRAL_INSTRUCTION})...")
+    start = asyncio.get_event_loop().time()
+
+    responses: Dict[str, str] = {}
+    verdict_event: Dict = {}
+    # late_grace=0: the call returns as soon as the verdict is ready
+    async for event in _triplet_events(
+        prompt, attachments, make_verdict, quorum=quorum, deadline=deadline, late_grace=0,
+    ):
+        if event["model"] == "verdict":
+            verdict_event = event
+        elif "response" in event:
+            responses[event["model"]] = event["response"]
+
+    results = {model_name: responses[model_name] for model_name in TRIPLET_MODELS}
+    for model_name, label in MODEL_LABELS.items():
+        res = results[model_name]
+        print(f"📊 {label}: {'✅' if not res.startswith(f'{label} Error:') else '❌'} ({len(res)}ch)")
     
-    results["verdict"] = verdict
+    results["verdict"] = verdict_event.get("response", "")
+    if len(verdict_event.get("responses", [])) < len(TRIPLET_MODELS):
+        results["verdict_models"] = verdict_event.get("responses", [])
     
     total = asyncio.get_event_loop().time() - start
     print(f"{'═' * 60}")
@@ -344,10 +655,27 @@ Fair comparison ensured through identical instructions."""
 async def run_triplet_streaming(
     prompt: str, 
     attachments: Optional[List] = None, 
-    skip_ai_verdict: bool = False
+    skip_ai_verdict: bool = False,
+    stream_tokens: bool = False,
+    quorum: Optional[int] = None,
+    deadline: Optional[float] = None,
 ):
     """
-    Stream Triplet results as they complete (with identical instructions)
+    Stream Triplet results as they complete (with identical instructions).
+
+    Each model's ``{"model", "response", "elapsed"}`` frame is yielded as
+    soon as that model finishes, so a fast model is never held back by a
+    slow one. With ``stream_tokens`` the models' token deltas are
+    multiplexed into the same stream as ``{"model", "delta"}`` frames
+    while they generate; the final frame still carries the full response.
+
+    With ``quorum`` / ``deadline`` the verdict frame can arrive before a
+    slow model's; that model's frame follows with ``"late": true``.
+
+    The verdict is always streamed as ``{"model": "verdict",
+    "verdict_delta"}`` frames; the final verdict frame carries the full
+    text and its timing. If the verdict stream fails partway, the final
+    frame carries the error with ``"error": true`` instead.
     """
     print(f"\n{'═' * 60}")
     print(f"🔀⚡ STREAMING TRIPLET (UNBIASED)")
@@ -358,56 +686,26 @@ async def run_triplet_streaming(
         has_images = any(att.get("type", "").startswith("image/") for att in attachments)
     
     start = asyncio.get_event_loop().time()
-    
-    # Create tasks for all 3 models with identical instructions
-    tasks = {
-        "gpt": asyncio.create_task(_get_gpt(prompt, attachments)),
-        "claude": asyncio.create_task(_get_claude(prompt, attachments)),
-        "deepseek": asyncio.create_task(_get_deepseek(prompt, attachments)),
-    }
-    
-    results = {}
-    
-    # Stream each result as it completes
-    for model_name, task in tasks.items():
-        try:
-            result = await task
-            results[model_name] = result
-            elapsed = asyncio.get_event_loop().time() - start
-            
-            print(f"✅ {model_name}: {elapsed:.1f}s ({len(result)}ch)")
-            
-            # Send this model's result immediately
-            yield {
-                "model": model_name,
-                "response": result,
-                "elapsed": round(elapsed, 1)
-            }
-            
-        except Exception as e:
-            error_msg = f"{model_name.upper()} Error: {str(e)}"
-            results[model_name] = error_msg
-            yield {
-                "model": model_name,
-                "response": error_msg,
-                "error": True
-            }
-    
-    # Generate verdict after all models complete
-    if not skip_ai_verdict:
+
+    async def make_verdict(responses: Dict[str, str], on_delta: DeltaCallback) -> str:
+        if skip_ai_verdict:
+            return "Verdict skipped for faster response."
         print(f"⚡ Generating unbiased verdict...")
         verdict_start = asyncio.get_event_loop().time()
-        verdict = await _generate_blind_verdict(prompt, results, has_images=has_images)
+        verdict = await _generate_blind_verdict(prompt, responses, has_images=has_images, on_delta=on_delta)
         verdict_time = asyncio.get_event_loop().time() - verdict_start
         print(f"✅ Verdict: {verdict_time:.1f}s")
-    else:
-        verdict = "Verdict skipped for faster response."
-    
-    # Send verdict
-    yield {
-        "model": "verdict",
-        "response": verdict
-    }
+        return verdict
+
+    async for event in _triplet_events(
+        prompt,
+        attachments,
+        make_verdict,
+        stream_tokens=stream_tokens,
+        quorum=quorum,
+        deadline=deadline,
+    ):
+        yield event
     
     total = asyncio.get_event_loop().time() - start
-    print(f"✅ TOTAL: {total:.1f}s\n")
\ No newline at end of file
+    print(f"✅ TOTAL: {total:.1f}s\n")
@@ -0,0 +1,247 @@
+# backend/services/turn_pipeline.py
+
+"""
+Turn Post-Processing Pipeline
+-----------------------------
+Bookkeeping that used to run inline after the model replied now happens
+here, off the request path:
+
+  1. persist the assistant message
+  2. auto-title the thread
+  3. generate the short (per-turn) summary
+  4. roll the mid-term memory (MTM) forward
+  5. write the turn summary to long-term memory (LTM)
+
+Routes ``await enqueue_turn(...)`` with a completed turn. Step 1 runs before
+it returns, so the assistant row is stored and cached before the client can
+send its next message; the rest is queued and the reply goes out at once.
+
+A small pool of asyncio workers drains the queues. Turns are sharded by
+thread, so one thread's turns are processed in order by a single worker.
+Each step is retried independently so one flaky call does not drop the
+rest; the assistant row carries a client-generated ``message_id`` so a
+retried insert is a no-op.
+"""
+
+import os
+import uuid
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from backend.db import repository
+from backend.services.context_cache import context_cache
+from backend.services.openai_agent import generate_short_summary, generate_mid_term_summary
+from backend.utils.retry import retry
+
+TURN_PIPELINE_WORKERS = int(os.getenv("TURN_PIPELINE_WORKERS", "4"))
+TURN_PIPELINE_QUEUE_SIZE = int(os.getenv("TURN_PIPELINE_QUEUE_SIZE", "1000"))
+TURN_PIPELINE_MAX_ATTEMPTS = int(os.getenv("TURN_PIPELINE_MAX_ATTEMPTS", "3"))
+
+_queues: List[asyncio.Queue] = []
+_workers: List[asyncio.Task] = []
+
+_stats = {
+    "enqueued": 0,
+    "processed": 0,
+    "step_failures": 0,
+}
+
+
+# -------------------------------------------------------------------
+# Steps
+# -------------------------------------------------------------------
+async def _save_assistant_message(event: Dict[str, Any]) -> None:
+    row = {
+        "message_id": event["message_id"],
+        "thread_id": event["thread_id"],
+        "role": "assistant",
+        "content": event["agent_reply"],
+        "created_at": event["created_at"],
+    }
+    await repository.insert_messages(row)
+    await context_cache.record_message(event["thread_id"], row)
+
+
+async def _auto_title(event: Dict[str, Any]) -> None:
+    user_message = event.get("user_message") or ""
+
+    short_title = (user_message or "Conversation")[:40]
+    if len(user_message) > 40:
+        short_title += "…"
+
+    await repository.update_thread(
+        event["thread_id"],
+        {
+            "title": short_title,
+            "updated_at": datetime.utcnow().isoformat(),
+        },
+    )
+    print(f"🧾 Auto-titled thread → {short_title}")
+
+
+async def _roll_mid_term_memory(event: Dict[str, Any], short_summary: str) -> None:
+    """
+    Read-modify-write of the thread summary. The write only applies if the
+    thread row is unchanged since the read (``updated_at`` compare-and-set),
+    so two workers rolling the same thread cannot drop each other's turn;
+    the loser raises and ``_run_step`` retries it from a fresh read.
+    """
+    thread_id = event["thread_id"]
+
+    row = await repository.get_thread(thread_id, "summary, metadata, updated_at") or {}
+    metadata = row.get("metadata")
+    if not isinstance(metadata, dict):
+        metadata = {}
+    memory = metadata.get("memory")
+    if not isinstance(memory, dict):
+        memory = {}
+
+    old_summary = memory.get("mid_summary") or row.get("summary")
+    new_mtm = await generate_mid_term_summary(old_summary, short_summary)
+    if not new_mtm:
+        return
+
+    updated = await repository.update_thread_if_unchanged(
+        thread_id,
+        {
+            "summary": new_mtm,
+            "metadata": {**metadata, "memory": {**memory, "mid_summary": new_mtm}},
+            "updated_at": datetime.utcnow().isoformat(),
+        },
+        row.get("updated_at"),
+    )
+    if not updated:
+        raise RuntimeError(f"thread {thread_id} changed during the MTM roll")
+
+    await context_cache.record_mid_summary(thread_id, new_mtm)
+    print("🧠 MTM saved:", new_mtm[:80])
+
+
+async def _save_summary_memory(event: Dict[str, Any], short_summary: str) -> None:
+    row = {
+        "thread_id": event["thread_id"],
+        "memory_type": "summary",
+        "content": short_summary,
+        "importance": 2,  # Low: routine turn summary
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    await repository.insert_long_term_memory(row)
+    await context_cache.record_long_term_memory(event["thread_id"], row)
+
+
+async def _run_step(name: str, fn) -> bool:
+    try:
+        await retry(fn, max_attempts=TURN_PIPELINE_MAX_ATTEMPTS, delay_seconds=1)
+        return True
+    except Exception as e:
+        _stats["step_failures"] += 1
+        print(f"⚠️ Turn pipeline step '{name}' failed: {e}")
+        return False
+
+
+async def process_turn(event: Dict[str, Any]) -> None:
+    """Run the post-reply steps that follow the assistant message."""
+    await _run_step("auto_title", lambda: _auto_title(event))
+
+    short_summary = ""
+    try:
+        short_summary = await generate_short_summary(event["agent_reply"])
+    except Exception as e:
+        print(f"⚠️ Turn pipeline short summary failed: {e}")
+
+    if short_summary:
+        await _run_step("mid_term_memory", lambda: _roll_mid_term_memory(event, short_summary))
+        await _run_step("long_term_memory", lambda: _save_summary_memory(event, short_summary))
+
+    _stats["processed"] += 1
+
+
+# -------------------------------------------------------------------
+# Queue + workers
+# -------------------------------------------------------------------
+async def _worker(worker_id: int) -> None:
+    queue = _queues[worker_id]
+    while True:
+        event = await queue.get()
+        try:
+            await process_turn(event)
+        except Exception as e:
+            print(f"❌ Turn pipeline worker {worker_id} error: {e}")
+        finally:
+            queue.task_done()
+
+
+def _queue_for(thread_id: str) -> asyncio.Queue:
+    """Each thread always lands on the same worker, so its turns stay in order."""
+    return _queues[hash(thread_id) % len(_queues)]
+
+
+def start_workers() -> None:
+    if _workers:
+        return
+
+    if not _queues:
+        per_worker = max(1, TURN_PIPELINE_QUEUE_SIZE // TURN_PIPELINE_WORKERS)
+        _queues.extend(asyncio.Queue(maxsize=per_worker) for _ in range(TURN_PIPELINE_WORKERS))
+
+    for i in range(len(_queues)):
+        _workers.append(asyncio.create_task(_worker(i)))
+
+    print(f"✅ Turn pipeline started ({TURN_PIPELINE_WORKERS} workers)")
+
+
+async def stop_workers(timeout: float = 10.0) -> None:
+    """Drain pending turns (up to ``timeout`` seconds), then stop the workers."""
+    if _queues:
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in _queues)), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"⚠️ Turn pipeline stopped with {_pending()} turns pending")
+
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+async def enqueue_turn(thread_id: str, user_message: str, agent_reply: str) -> None:
+    """
+    Store and cache the assistant message, then hand the rest of the
+    completed turn to the background pipeline.
+    ``created_at`` and ``message_id`` are stamped now so message ordering
+    and retries do not depend on when (or how often) a write runs.
+    """
+    start_workers()
+
+    event = {
+        "thread_id": thread_id,
+        "user_message": user_message,
+        "agent_reply": agent_reply,
+        "created_at": datetime.utcnow().isoformat(),
+        "message_id": str(uuid.uuid4()),
+    }
+
+    await _run_step("save_assistant_message", lambda: _save_assistant_message(event))
+
+    try:
+        _queue_for(thread_id).put_nowait(event)
+        _stats["enqueued"] += 1
+    except asyncio.QueueFull:
+        # Never block the response on bookkeeping; run it detached instead
+        print("⚠️ Turn pipeline queue full, processing turn in a detached task")
+        asyncio.create_task(process_turn(event))
+
+
+def _pending() -> int:
+    return sum(queue.qsize() for queue in _queues)
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        **_stats,
+        "pending": _pending(),
+        "workers": len(_workers),
+    }
@@ -0,0 +1,108 @@
+-- Single round-trip context loader for the memory-aware thread agent.
+--
+-- start_agent_run used to issue one query per memory tier (ownership, STM,
+-- MTM, account_id, LTM, document LTM). This function returns all of them as
+-- one JSONB document so the pre-LLM latency is a single PostgREST RPC.
+BEGIN;
+
+CREATE OR REPLACE FUNCTION load_thread_context(
+    p_thread_id UUID,
+    p_user_id TEXT,
+    p_stm_limit INTEGER DEFAULT 60,
+    p_ltm_limit INTEGER DEFAULT 10,
+    p_doc_limit INTEGER DEFAULT 3
+)
+RETURNS JSONB
+SECURITY DEFINER
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    thread_row RECORD;
+    thread_owner TEXT;
+    stm JSONB;
+    ltm JSONB;
+    documents JSONB;
+BEGIN
+    SELECT t.account_id, t.user_id, t.summary, t.metadata
+    INTO thread_row
+    FROM threads t
+    WHERE t.thread_id = p_thread_id
+    LIMIT 1;
+
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('found', FALSE, 'is_owner', FALSE);
+    END IF;
+
+    thread_owner := COALESCE(thread_row.account_id::TEXT, thread_row.user_id::TEXT);
+
+    -- Never leak memory rows to someone who does not own the thread
+    IF thread_owner IS DISTINCT FROM p_user_id THEN
+        RETURN jsonb_build_object(
+            'found', TRUE,
+            'is_owner', FALSE,
+            'owner', thread_owner
+        );
+    END IF;
+
+    -- Short-term memory: the latest N messages, returned oldest first
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'role', m.role,
+               'content', m.content,
+               'created_at', m.created_at
+           ) ORDER BY m.created_at ASC), '[]'::JSONB)
+    INTO stm
+    FROM (
+        SELECT role, content, created_at
+        FROM messages
+        WHERE thread_id = p_thread_id
+        ORDER BY created_at DESC
+        LIMIT p_stm_limit
+    ) m;
+
+    -- Long-term memory: most important facts first
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'content', l.content,
+               'memory_type', l.memory_type,
+               'importance', l.importance
+           ) ORDER BY l.importance DESC, l.created_at ASC), '[]'::JSONB)
+    INTO ltm
+    FROM (
+        SELECT content, memory_type, importance, created_at
+        FROM long_term_memory
+        WHERE thread_id = p_thread_id
+        ORDER BY importance DESC, created_at ASC
+        LIMIT p_ltm_limit
+    ) l;
+
+    -- Document memories (PDF previews saved at upload time)
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'content', d.content
+           ) ORDER BY d.created_at ASC), '[]'::JSONB)
+    INTO documents
+    FROM (
+        SELECT content, created_at
+        FROM long_term_memory
+        WHERE thread_id = p_thread_id
+        AND memory_type = 'document'
+        ORDER BY created_at ASC
+        LIMIT p_doc_limit
+    ) d;
+
+    RETURN jsonb_build_object(
+        'found', TRUE,
+        'is_owner', TRUE,
+        'owner', thread_owner,
+        'account_id', thread_row.account_id,
+        'summary', thread_row.summary,
+        'metadata', COALESCE(thread_row.metadata, '{}'::JSONB),
+        'stm', stm,
+        'ltm', ltm,
+        'documents', documents
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION load_thread_context(UUID, TEXT, INTEGER, INTEGER, INTEGER) TO service_role;
+
+COMMIT;
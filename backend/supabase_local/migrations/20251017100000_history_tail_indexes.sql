@@ -0,0 +1,36 @@
+-- Composite indexes for the "latest N" conversation and memory reads.
+--
+-- The STM loaders ask for the newest messages of one thread:
+--     WHERE thread_id = $1 [AND created_at < $cursor]
+--     ORDER BY created_at DESC LIMIT $n
+-- With only idx_messages_thread_id / idx_messages_created_at Postgres either
+-- reads every row of the thread and sorts, or walks the global created_at
+-- index filtering by thread. (thread_id, created_at DESC) turns both the
+-- first page and every keyset page into one bounded index range scan.
+--
+-- Verify on a local database:
+--     EXPLAIN SELECT role, content, created_at FROM messages
+--     WHERE thread_id = '<uuid>' ORDER BY created_at DESC LIMIT 60;
+-- should show "Index Scan using idx_messages_thread_id_created_at" under
+-- "Limit", with no Sort node.
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_messages_thread_id_created_at
+    ON messages (thread_id, created_at DESC);
+
+-- long_term_memory is created outside these migrations on some deployments
+DO $$
+BEGIN
+    IF to_regclass('public.long_term_memory') IS NOT NULL THEN
+        -- LTM loader: ORDER BY importance DESC, created_at ASC LIMIT n
+        EXECUTE 'CREATE INDEX IF NOT EXISTS idx_long_term_memory_thread_importance
+                 ON long_term_memory (thread_id, importance DESC, created_at)';
+
+        -- Document memories: memory_type = ''document'' ORDER BY created_at
+        EXECUTE 'CREATE INDEX IF NOT EXISTS idx_long_term_memory_thread_documents
+                 ON long_term_memory (thread_id, created_at)
+                 WHERE memory_type = ''document''';
+    END IF;
+END $$;
+
+COMMIT;
@@ -0,0 +1,50 @@
+-- Page / paragraph chunks of documents uploaded to a thread.
+--
+-- Extracted document text used to be injected whole on every follow-up
+-- turn (OCR_EXTRACT blocks, [DOCUMENT CONTEXT] system messages, document
+-- previews in long_term_memory). Documents are now stored here as chunks
+-- with their page number and character offsets in the extracted text, and
+-- follow-up turns inject only the top-k chunks ranked by BM25 (see
+-- backend/services/document_store.py).
+--
+-- document_id is the SHA-256 of the extracted text, so re-uploading the
+-- same document to a thread does not store it twice.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS document_chunks (
+    chunk_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    thread_id UUID NOT NULL REFERENCES threads(thread_id) ON DELETE CASCADE,
+    document_id TEXT NOT NULL,
+    document_name TEXT,
+    chunk_index INTEGER NOT NULL,
+    page_number INTEGER,
+    char_start INTEGER NOT NULL,
+    char_end INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW()) NOT NULL,
+    UNIQUE (thread_id, document_id, chunk_index)
+);
+
+-- The unique constraint's index also serves the per-thread load:
+--     WHERE thread_id = $1 ORDER BY document_id, chunk_index
+
+ALTER TABLE document_chunks ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY document_chunks_select_policy ON document_chunks
+    FOR SELECT
+    USING (
+        EXISTS (
+            SELECT 1 FROM threads
+            LEFT JOIN projects ON threads.project_id = projects.project_id
+            WHERE threads.thread_id = document_chunks.thread_id
+            AND (
+                basejump.has_role_on_account(threads.account_id) = true OR
+                basejump.has_role_on_account(projects.account_id) = true
+            )
+        )
+    );
+
+GRANT ALL PRIVILEGES ON TABLE document_chunks TO service_role;
+GRANT SELECT ON TABLE document_chunks TO authenticated;
+
+COMMIT;
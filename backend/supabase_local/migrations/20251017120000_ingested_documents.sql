@@ -0,0 +1,28 @@
+-- Results of background document ingestion jobs (see
+-- backend/services/ingestion_jobs.py).
+--
+-- A finished job's extracted text used to live only in the extraction
+-- cache, which is size-bounded and LRU-evicted: under load a job could
+-- report "done" while its text had already been dropped. Results are kept
+-- here instead, and are only ever read back by the user who ingested them.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS ingested_documents (
+    job_id UUID PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    name TEXT,
+    type TEXT,
+    kind TEXT NOT NULL,
+    text TEXT,
+    description TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW()) NOT NULL
+);
+
+-- Lookups are always WHERE job_id = $1 AND user_id = $2 (primary key)
+
+ALTER TABLE ingested_documents ENABLE ROW LEVEL SECURITY;
+
+-- Accessed by the backend only
+GRANT ALL PRIVILEGES ON TABLE ingested_documents TO service_role;
+
+COMMIT;
@@ -0,0 +1,18 @@
+-- Keyset index for paging a thread's history on (created_at, message_id).
+--
+-- Paging on created_at alone skips messages that share a timestamp across a
+-- page boundary, so list_recent_messages breaks ties on message_id:
+--     WHERE thread_id = $1 AND created_at <= $c
+--       AND (created_at < $c OR (created_at = $c AND message_id < $id))
+--     ORDER BY created_at DESC, message_id DESC LIMIT $n
+-- (thread_id, created_at DESC, message_id DESC) serves that and the first
+-- page as one bounded index range scan with no Sort node, and supersedes
+-- idx_messages_thread_id_created_at. Checked by tests/test_history_indexes.py.
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_messages_thread_id_created_at_message_id
+    ON messages (thread_id, created_at DESC, message_id DESC);
+
+DROP INDEX IF EXISTS idx_messages_thread_id_created_at;
+
+COMMIT;
@@ -0,0 +1,7 @@
+# backend/tests/conftest.py
+
+import os
+
+# Provider clients are built at import time; tests never reach the APIs
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
@@ -0,0 +1,64 @@
+# backend/tests/test_base64_utils.py
+
+import base64
+import os
+
+import pytest
+
+from backend.utils.base64_utils import Base64TooLarge, decode_base64, iter_decode_base64
+
+
+def decode_in_chunks(data, chunk_chars, **kwargs):
+    return b"".join(iter_decode_base64(data, chunk_chars=chunk_chars, **kwargs))
+
+
+@pytest.mark.parametrize("data", ["abc=def", "YWJj=ZGVm", "YQ==YWJj", "YQ==\nYWJj"])
+@pytest.mark.parametrize("chunk_chars", [4, 8, 1024])
+def test_padding_before_the_final_quantum_is_rejected(data, chunk_chars):
+    with pytest.raises(ValueError):
+        decode_in_chunks(data, chunk_chars)
+    with pytest.raises(ValueError):
+        decode_in_chunks(data.encode(), chunk_chars)
+
+
+def test_padding_in_the_middle_is_rejected_by_decode_base64():
+    with pytest.raises(ValueError, match="padding"):
+        decode_base64("abc=def")
+
+
+@pytest.mark.parametrize("data", ["abcde", "YWJjZ", "Y"])
+def test_bad_length_is_rejected(data):
+    with pytest.raises(ValueError):
+        decode_base64(data)
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 4, 5, 31, 32, 33])
+@pytest.mark.parametrize("chunk_chars", [4, 8, 12, 16])
+def test_chunk_boundary_splits_match_a_single_decode(size, chunk_chars):
+    raw = os.urandom(size)
+    encoded = base64.b64encode(raw).decode()
+
+    assert decode_in_chunks(encoded, chunk_chars) == raw
+    assert decode_in_chunks(encoded.rstrip("="), chunk_chars) == raw  # missing padding
+    # Whitespace shifts where each chunk's 4-character quanta start
+    spaced = " ".join(encoded[i:i + 3] for i in range(0, len(encoded), 3))
+    assert decode_in_chunks(spaced, chunk_chars) == raw
+    assert decode_in_chunks(spaced.encode(), chunk_chars) == raw
+
+
+def test_data_uri_prefix_is_skipped():
+    uri = "data:application/pdf;base64," + base64.b64encode(b"%PDF-1.7").decode()
+    assert decode_in_chunks(uri, 4) == b"%PDF-1.7"
+
+
+def test_max_bytes_cutoff():
+    encoded = base64.b64encode(b"x" * 30).decode()
+
+    assert decode_base64(encoded, max_bytes=30) == b"x" * 30
+    with pytest.raises(Base64TooLarge):
+        decode_base64(encoded, max_bytes=29)
+
+    # Rejected from the encoded length alone, before anything is decoded
+    chunks = iter_decode_base64("!" * 80, max_bytes=10)
+    with pytest.raises(Base64TooLarge):
+        next(chunks)
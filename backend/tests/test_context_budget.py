@@ -0,0 +1,119 @@
+# backend/tests/test_context_budget.py
+
+from backend.services.context_budget import (
+    TRUNCATION_MARK,
+    assemble_context,
+    count_tokens,
+    get_prompt_budget,
+    truncate_to_tokens,
+)
+
+
+def lines_tokens(lines):
+    return sum(count_tokens(line) + 1 for line in lines)
+
+
+def test_everything_fits_untouched_under_a_large_budget():
+    packed = assemble_context(
+        10000,
+        mtm="The user is planning a trip.",
+        ltm=["Prefers window seats"],
+        stm=["user: hi", "assistant: hello"],
+        ocr=[{"name": "ticket.pdf", "text": "Flight 123 to Riyadh"}],
+    )
+
+    assert packed["mtm"] == "The user is planning a trip."
+    assert packed["ltm"] == ["Prefers window seats"]
+    assert packed["stm"] == ["user: hi", "assistant: hello"]
+    assert packed["ocr"] == [{"name": "ticket.pdf", "text": "Flight 123 to Riyadh"}]
+
+
+def test_sections_are_trimmed_to_the_budget():
+    stm = [f"user: message number {i} about the contract terms" for i in range(200)]
+    ltm = [f"Fact {i}: the customer prefers invoices in SAR" for i in range(100)]
+    ocr = [{"name": "contract.pdf", "text": "clause " * 5000}]
+
+    packed = assemble_context(1000, mtm="Summary. " * 200, ltm=ltm, stm=stm, ocr=ocr)
+    allow = packed["usage"]["allow"]
+
+    assert sum(allow.values()) <= 1000
+    assert count_tokens(packed["mtm"]) <= allow["mtm"]
+    assert lines_tokens(packed["ltm"]) <= allow["ltm"]
+    assert lines_tokens(packed["stm"]) <= allow["stm"]
+    assert sum(count_tokens(d["text"]) for d in packed["ocr"]) <= allow["ocr"]
+
+    # STM keeps the newest messages, LTM the most important (first) ones
+    assert packed["stm"][-1] == stm[-1]
+    assert packed["ltm"][0] == ltm[0]
+    assert packed["ocr"][0]["text"].endswith(TRUNCATION_MARK)
+
+
+def test_budget_left_by_small_sections_flows_to_documents():
+    ocr = [{"name": "report.pdf", "text": "figure " * 3000}]
+    packed = assemble_context(1000, stm=["user: hi"], ocr=ocr)
+
+    allow = packed["usage"]["allow"]
+    assert allow["ocr"] > int(1000 * 0.45)
+    assert sum(allow.values()) == 1000
+
+
+def test_oversized_newest_message_is_cut_not_dropped():
+    packed = assemble_context(200, stm=["user: old", "user: " + "long " * 2000])
+    assert len(packed["stm"]) == 1
+    assert packed["stm"][0].startswith("user: long")
+    assert packed["stm"][0].endswith(TRUNCATION_MARK)
+
+
+def test_truncate_to_tokens_keeps_a_prefix():
+    text = "word " * 1000
+    head = truncate_to_tokens(text, 50)
+    assert text.startswith(head)
+    assert count_tokens(head) <= 50
+    assert truncate_to_tokens("short", 50) == "short"
+    assert truncate_to_tokens(text, 0) == ""
+
+
+def test_prompt_budget_reserves_the_reply_and_caps_cost():
+    assert get_prompt_budget("gpt-4", 2500) == 8192 - 2500 - 512
+    assert get_prompt_budget("gpt-4o-mini", 2500) <= 16000
+    assert get_prompt_budget("unknown-model", 20000) == 0
+
+
+async def test_agent_prompt_is_assembled_off_the_event_loop(monkeypatch):
+    import threading
+    from types import SimpleNamespace
+
+    from backend.services import openai_agent
+
+    threads = []
+
+    def build_agent_messages(message, **kwargs):
+        threads.append(threading.current_thread())
+        return [{"role": "user", "content": message}]
+
+    async def create(**kwargs):
+        message = SimpleNamespace(content="hello")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(openai_agent, "build_agent_messages", build_agent_messages)
+    monkeypatch.setattr(openai_agent, "get_openai_client", lambda: client)
+
+    assert await openai_agent.run_openai_agent("hi") == "hello"
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_counting_falls_back_to_the_estimate_when_tiktoken_cannot_load(monkeypatch):
+    from backend.services import context_budget
+
+    class OfflineTiktoken:
+        @staticmethod
+        def encoding_for_model(model_name):
+            raise ConnectionError("cannot download o200k_base.tiktoken")
+
+    monkeypatch.setattr(context_budget, "tiktoken", OfflineTiktoken)
+    context_budget._get_encoding.cache_clear()
+    try:
+        assert count_tokens("abcd" * 10, "offline-model") == 10
+    finally:
+        context_budget._get_encoding.cache_clear()
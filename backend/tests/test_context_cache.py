@@ -0,0 +1,74 @@
+# backend/tests/test_context_cache.py
+
+import fakeredis.aioredis
+
+from backend.services.context_cache import ThreadContextCache
+
+
+def message(content):
+    return {"role": "user", "content": content, "created_at": "2025-10-17T12:00:00Z"}
+
+
+async def test_writes_from_a_stale_worker_do_not_drop_other_writes():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    worker_a = ThreadContextCache(redis_client=redis)
+    worker_b = ThreadContextCache(redis_client=redis)
+
+    await worker_a.set("t1", {"stm": []})
+    assert await worker_b.get("t1") == {"stm": []}  # B now holds an L1 copy
+
+    await worker_a.record_message("t1", message("first"))
+    await worker_b.record_message("t1", message("second"))  # B's L1 is stale
+
+    fresh = ThreadContextCache(redis_client=redis)
+    contents = [m["content"] for m in (await fresh.get("t1"))["stm"]]
+    assert contents == ["first", "second"]
+
+    # The writer's L1 is refreshed from the shared copy
+    assert [m["content"] for m in (await worker_b.get("t1"))["stm"]] == ["first", "second"]
+
+
+async def test_update_without_a_shared_entry_drops_the_local_copy():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    cache = ThreadContextCache(redis_client=redis)
+    cache._l1_set("t1", {"stm": []})
+
+    await cache.record_message("t1", message("first"))
+
+    assert await cache.get("t1") is None
+    assert cache.writes == 0
+
+
+async def test_without_redis_writes_go_to_the_local_copy():
+    cache = ThreadContextCache(use_redis=False)
+    await cache.set("t1", {"stm": []})
+    held = await cache.get("t1")
+
+    await cache.record_message("t1", message("first"))
+    await cache.record_message("t1", message("second"))
+
+    ctx = await cache.get("t1")
+    assert [m["content"] for m in ctx["stm"]] == ["first", "second"]
+    assert cache.writes == 2
+    assert held == {"stm": []}  # callers' copies are not mutated
+
+
+class UnreachableRedis:
+    async def get(self, key):
+        raise ConnectionError("redis down")
+
+    async def set(self, key, value, ex=None):
+        raise ConnectionError("redis down")
+
+    def pipeline(self, transaction=True):
+        raise ConnectionError("redis down")
+
+
+async def test_unreachable_redis_keeps_working_from_the_local_copy():
+    cache = ThreadContextCache(redis_client=UnreachableRedis())
+    await cache.set("t1", {"stm": []})
+
+    await cache.record_message("t1", message("first"))
+
+    ctx = await cache.get("t1")
+    assert [m["content"] for m in ctx["stm"]] == ["first"]
@@ -0,0 +1,108 @@
+# backend/tests/test_document_store.py
+
+import pytest
+
+from backend.services import document_store as store_module
+from backend.services.document_store import BM25Index, DocumentStore, chunk_document, tokenize
+
+
+# -------------------------------------------------------------------
+# Chunk boundaries
+# -------------------------------------------------------------------
+PAGED = (
+    "Cover note\n\n"
+    "--- Page 1 ---\n"
+    "First paragraph of page one.\n\n"
+    "Second paragraph of page one.\n"
+    "--- OCR Page 2 ---\n"
+    "Only paragraph of page two."
+)
+
+
+def test_chunks_never_cross_pages():
+    chunks = chunk_document(PAGED, max_chars=1000)
+
+    assert [c["page_number"] for c in chunks] == [None, 1, 2]
+    assert chunks[1]["content"] == "First paragraph of page one.\n\nSecond paragraph of page one."
+    for chunk in chunks:
+        assert "--- " not in chunk["content"]
+
+
+def test_offsets_point_into_the_text():
+    for chunk in chunk_document(PAGED, max_chars=30):
+        assert PAGED[chunk["char_start"]:chunk["char_end"]].strip() == chunk["content"]
+
+
+def test_paragraphs_are_packed_up_to_max_chars():
+    text = "\n\n".join(f"Paragraph number {i}." for i in range(10))
+    chunks = chunk_document(text, max_chars=45)
+
+    assert all(len(c["content"]) <= 45 for c in chunks)
+    assert len(chunks) == 5  # two 19-character paragraphs per chunk
+    assert [c["chunk_index"] for c in chunks] == list(range(5))
+
+
+def test_oversized_paragraph_is_cut_at_whitespace():
+    text = " ".join(["word"] * 100)
+    chunks = chunk_document(text, max_chars=50)
+
+    assert all(len(c["content"]) <= 50 for c in chunks)
+    assert all(set(c["content"].split()) == {"word"} for c in chunks)
+    assert sum(len(c["content"].split()) for c in chunks) == 100
+
+
+# -------------------------------------------------------------------
+# Arabic normalization in BM25
+# -------------------------------------------------------------------
+def test_arabic_prefixes_and_diacritics_are_normalized():
+    assert tokenize("العقد") == tokenize("بالعقد") == tokenize("وبالعقد") == tokenize("عقد") == ["عقد"]
+    assert tokenize("العَقْدُ") == ["عقد"]  # diacritics
+    assert tokenize("أحمد") == tokenize("احمد") == tokenize("إحمد")  # alef variants
+    assert tokenize("مدرسة") == tokenize("مدرسه")  # teh marbuta
+    assert tokenize("سنة ٢٠٢٥") == ["سنه", "2025"]  # Arabic-Indic digits
+
+
+def test_arabic_query_matches_normalized_chunk():
+    index = BM25Index([
+        {"document_id": "d1", "content": "The invoice total is due in March."},
+        {"document_id": "d1", "content": "تم توقيع العقد بين الطرفين في الرياض."},
+        {"document_id": "d1", "content": "شروط الدفع مذكورة في الملحق."},
+    ])
+
+    results = index.search("ماذا يقول بالعقد؟", k=1)
+    assert [r["content"] for r in results] == ["تم توقيع العقد بين الطرفين في الرياض."]
+
+
+# -------------------------------------------------------------------
+# Store
+# -------------------------------------------------------------------
+class FakeRepository:
+    def __init__(self):
+        self.rows = []
+
+    async def list_document_chunks(self, thread_id, columns="*"):
+        return [row for row in self.rows if row["thread_id"] == thread_id]
+
+    async def insert_document_chunks(self, rows):
+        self.rows.extend(rows)
+        return len(rows)
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    repo = FakeRepository()
+    monkeypatch.setattr(store_module, "repository", repo)
+    return repo
+
+
+async def test_add_documents_stores_chunks_once(repo):
+    store = DocumentStore()
+    documents = [{"name": "contract.pdf", "text": PAGED}]
+
+    assert await store.add_documents("t1", documents) == 3
+    assert await store.add_documents("t1", documents) == 0  # same text already stored
+    assert store.documents_added == 1
+
+    results = await store.search("t1", "paragraph page two", k=1)
+    assert results[0]["page_number"] == 2
+    assert results[0]["document_name"] == "contract.pdf"
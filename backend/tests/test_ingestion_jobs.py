@@ -0,0 +1,123 @@
+# backend/tests/test_ingestion_jobs.py
+
+import time
+
+import pytest
+
+from backend.services.ingestion_jobs import IngestionJobs
+
+
+def _finished_job(jobs: IngestionJobs, job_id: str, user_id: str, text: str) -> None:
+    now = time.time()
+    jobs._jobs[job_id] = {
+        "job_id": job_id,
+        "status": "done",
+        "name": "statement.pdf",
+        "type": "application/pdf",
+        "kind": "pdf",
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+        "user_id": user_id,
+        "_result": {"name": "statement.pdf", "type": "application/pdf", "kind": "pdf", "text": text},
+    }
+
+
+@pytest.fixture
+def jobs():
+    jobs = IngestionJobs()
+    _finished_job(jobs, "job-alice", "alice", "alice's statement")
+    return jobs
+
+
+async def test_owner_gets_document(jobs):
+    results = await jobs.resolve_documents(["job-alice"], "alice")
+    assert [r["text"] for r in results] == ["alice's statement"]
+    assert results[0]["document_id"] == "job-alice"
+
+
+async def test_other_user_gets_nothing(jobs):
+    assert await jobs.resolve_documents(["job-alice"], "mallory") == []
+
+
+async def test_missing_user_gets_nothing(jobs):
+    assert await jobs.resolve_documents(["job-alice"], None) == []
+    assert await jobs.resolve_documents(["job-alice"], "") == []
+
+
+async def test_get_checks_owner(jobs):
+    assert jobs.get("job-alice", "alice")["job_id"] == "job-alice"
+    assert jobs.get("job-alice", "mallory") is None
+    assert jobs.get("job-alice", None) is None
+
+
+async def test_max_chars_trims_text(jobs):
+    results = await jobs.resolve_documents(["job-alice"], "alice", max_chars=5)
+    assert results[0]["text"] == "alice"
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/api/chat/stream", {"messages": [{"role": "user", "content": "hi"}], "document_ids": ["job-alice"]}),
+    ("/api/triplet/stream", {"prompt": "hi", "document_ids": ["job-alice"]}),
+])
+def test_document_ids_require_auth(path, body):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from backend.routes import chat, triplet
+
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/chat")
+    app.include_router(triplet.router, prefix="/api")
+
+    response = TestClient(app).post(path, json=body)
+    assert response.status_code == 401
+
+
+@pytest.fixture
+def stored_documents(monkeypatch):
+    """ingested_documents rows, as the repository would return them."""
+    from backend.db import repository
+    from backend.services import ingestion_jobs as module
+
+    rows = {}
+
+    async def insert_ingested_document(row):
+        rows[row["job_id"]] = dict(row)
+        return [row]
+
+    async def get_ingested_document(job_id, user_id):
+        row = rows.get(job_id)
+        if row is None or row["user_id"] != user_id:
+            return None
+        return {k: row.get(k) for k in ("name", "type", "kind", "text", "description")}
+
+    async def extract(source, max_chars=None, on_progress=None):
+        on_progress(1, 1)
+        return " extracted text "
+
+    monkeypatch.setattr(repository, "insert_ingested_document", insert_ingested_document)
+    monkeypatch.setattr(repository, "get_ingested_document", get_ingested_document)
+    monkeypatch.setattr(module.pdf_extraction_service, "extract", extract)
+    return rows
+
+
+async def test_finished_job_is_readable_from_another_worker(stored_documents):
+    worker_a = IngestionJobs()
+    job = worker_a.submit(b"%PDF-", "a.pdf", "application/pdf", "alice")
+    async for state in worker_a.events(job["job_id"]):
+        pass
+    assert state["status"] == "done"
+    assert stored_documents[job["job_id"]]["user_id"] == "alice"
+
+    # A worker that never saw the job (or the cache entry) still finds it
+    worker_b = IngestionJobs()
+    results = await worker_b.resolve_documents([job["job_id"]], "alice")
+    assert [r["text"] for r in results] == ["extracted text"]
+    assert "description" not in results[0]
+
+    assert await worker_b.resolve_documents([job["job_id"]], "mallory") == []
+
+
+async def test_malformed_job_id_is_skipped(stored_documents):
+    assert await IngestionJobs().resolve_documents(["../../etc"], "alice") == []
@@ -0,0 +1,108 @@
+# backend/tests/test_long_document_qa.py
+
+import pytest
+
+from backend.services import long_document_qa
+from backend.services.context_budget import count_tokens
+from backend.services.long_document_qa import answer_over_long_documents, split_for_map
+
+
+def paged_document(pages, words_per_page=300):
+    return "\n".join(
+        f"--- Page {page} ---\n" + " ".join(f"p{page}w{i}" for i in range(words_per_page))
+        for page in range(1, pages + 1)
+    )
+
+
+def test_split_for_map_respects_the_part_budget_and_page_order():
+    parts = split_for_map(paged_document(12), max_tokens=1500)
+
+    assert len(parts) > 1
+    for part in parts:
+        # [Page N] headers are the only text not counted against the budget
+        body = "\n\n".join(ln for ln in part["text"].split("\n\n") if not ln.startswith("[Page"))
+        assert count_tokens(body) <= 1500
+
+    assert parts[0]["label"].startswith("pages 1-")
+    assert parts[-1]["label"].endswith("12")
+    text = "\n".join(part["text"] for part in parts)
+    assert text.index("[Page 3]") < text.index("[Page 4]")
+
+
+def test_split_for_map_cuts_a_chunk_larger_than_a_part():
+    parts = split_for_map(" ".join(["word"] * 5000), max_tokens=200)
+    assert all(count_tokens(part["text"]) <= 210 for part in parts)
+
+
+@pytest.fixture
+def mapped(monkeypatch):
+    calls = []
+
+    async def fake_map_part(question, document_name, part, index, total):
+        calls.append(part["label"])
+        return f"answer from {part['label']}" if index == 1 else long_document_qa.NO_RELEVANT_INFO
+
+    monkeypatch.setattr(long_document_qa, "_map_part", fake_map_part)
+    monkeypatch.setattr(long_document_qa, "LONG_DOC_THRESHOLD_TOKENS", 500)
+    return calls
+
+
+async def test_long_documents_are_replaced_by_partial_answers(mapped):
+    documents = [
+        {"name": "short.txt", "text": "A short note."},
+        {"name": "long.pdf", "text": paged_document(40)},
+    ]
+
+    result = await answer_over_long_documents("what is on page 1?", documents)
+
+    assert result[0] == documents[0]
+    assert result[1]["long_document"] is True
+    assert "answer from pages 1-" in result[1]["text"]
+    assert "NO_RELEVANT_INFO" not in result[1]["text"]
+    assert len(mapped) > 1
+
+
+async def test_failed_map_falls_back_to_the_truncated_text(monkeypatch, mapped):
+    async def failing_map_document(question, name, text):
+        raise RuntimeError("map failed")
+
+    monkeypatch.setattr(long_document_qa, "map_document", failing_map_document)
+    document = {"name": "long.pdf", "text": paged_document(10)}
+
+    [result] = await answer_over_long_documents("anything?", [document])
+
+    assert "long_document" not in result
+    assert count_tokens(result["text"]) <= 500
+    assert document["text"].startswith(result["text"])
+
+
+async def test_splitting_runs_off_the_event_loop(monkeypatch, mapped):
+    import threading
+
+    threads = []
+
+    def fake_split(text):
+        threads.append(threading.current_thread())
+        return [{"label": "page 1", "text": text}]
+
+    monkeypatch.setattr(long_document_qa, "split_for_map", fake_split)
+    await long_document_qa.map_document("q?", "doc.pdf", "text")
+
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_document_char_budget_follows_the_prompt_budget(monkeypatch):
+    monkeypatch.setattr(long_document_qa, "LONG_DOC_QA_ENABLED", False)
+
+    assert long_document_qa.document_char_budget("gpt-4") == (8192 - 2500 - 512) * 4
+    assert long_document_qa.document_char_budget("gpt-4o-mini") == 16000 * 4
+
+
+def test_document_char_budget_follows_the_map_capacity(monkeypatch):
+    monkeypatch.setattr(long_document_qa, "LONG_DOC_QA_ENABLED", True)
+    monkeypatch.setattr(long_document_qa, "LONG_DOC_MAX_PARTS", 5)
+    monkeypatch.setattr(long_document_qa, "LONG_DOC_MAP_TOKENS", 1000)
+    assert long_document_qa.document_char_budget() == 5 * 1000 * 4
+
+    monkeypatch.setattr(long_document_qa, "LONG_DOC_MAX_CHARS", 12000)
+    assert long_document_qa.document_char_budget() == 12000
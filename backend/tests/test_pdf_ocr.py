@@ -0,0 +1,147 @@
+# backend/tests/test_pdf_ocr.py
+
+import subprocess
+import sys
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from backend.utils import ocr_backend, pdf_ocr
+from backend.utils.attachment_extractor import extract_attachment_text
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+@pytest.fixture
+def no_ocr(monkeypatch):
+    def missing():
+        raise ImportError("pytesseract is not installed")
+
+    monkeypatch.setattr(ocr_backend, "get_ocr_backend", missing)
+    monkeypatch.setattr(pdf_ocr, "_ocr_missing", False)
+
+
+def _scanned_pdf() -> bytes:
+    # One image-only page: no text layer, so it would need OCR
+    out = BytesIO()
+    Image.new("RGB", (400, 300), "white").save(out, format="PDF")
+    return out.getvalue()
+
+
+def test_routes_import_without_ocr_packages():
+    code = (
+        "import sys\n"
+        "for name in ('pytesseract', 'pdf2image', 'tesserocr'):\n"
+        "    sys.modules[name] = None\n"
+        "import backend.utils.attachment_extractor\n"
+        "import backend.utils.file_extractor\n"
+        "import backend.services.pdf_extraction\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_ocr_image_without_engine_returns_empty(no_ocr):
+    assert pdf_ocr.ocr_available() is False
+    assert pdf_ocr.ocr_image(Image.new("RGB", (10, 10))) == ""
+
+
+def test_iter_ocr_pages_without_engine_yields_empty_pages(no_ocr):
+    pages = list(pdf_ocr.iter_ocr_pages(b"%PDF-", page_numbers=[2, 5]))
+    assert pages == [(2, ""), (5, "")]
+
+
+def test_scanned_pdf_without_engine_extracts_nothing(no_ocr):
+    assert extract_attachment_text(BytesIO(_scanned_pdf())) == ""
+
+
+def _scanned_pdf_pages(count: int) -> bytes:
+    out = BytesIO()
+    pages = [Image.new("RGB", (400, 300), "white") for _ in range(count)]
+    pages[0].save(out, format="PDF", save_all=True, append_images=pages[1:])
+    return out.getvalue()
+
+
+async def test_ocr_language_is_detected_once_per_document(monkeypatch):
+    from backend.services.pdf_extraction import PdfExtractionService
+    from backend.utils import attachment_extractor
+
+    osd_calls = []
+    ocr_langs = []
+
+    def osd(image):
+        osd_calls.append(image.size)
+        return "ara"
+
+    def fake_ocr_image(image, lang):
+        ocr_langs.append(lang)
+        return "نص ممسوح ضوئيا"
+
+    monkeypatch.setattr(attachment_extractor, "ocr_available", lambda: True)
+    monkeypatch.setattr(attachment_extractor, "ocr_image", fake_ocr_image)
+    monkeypatch.setattr(attachment_extractor, "detect_langs_osd", osd)
+    monkeypatch.setattr(pdf_ocr, "detect_langs_osd", osd)
+
+    service = PdfExtractionService(max_workers=3, pages_per_chunk=2)
+
+    async def inline(fn, *args):
+        # Run the worker-process tasks here so the patches above apply
+        return fn(*args)
+
+    monkeypatch.setattr(service, "_submit", inline)
+    text = await service.extract(_scanned_pdf_pages(6), use_cache=False)
+
+    assert text.count("--- Page") == 6
+    assert len(osd_calls) == 1
+    assert ocr_langs == ["ara"] * 6
+
+
+def test_language_picker_uses_the_document_decision(monkeypatch):
+    monkeypatch.setattr(pdf_ocr, "OCR_LANG_DETECTION", True)
+    monkeypatch.setattr(pdf_ocr, "detect_langs_osd", lambda image: pytest.fail("OSD ran again"))
+
+    picker = pdf_ocr.LanguagePicker({}, document_langs="eng")
+    assert picker.pick(3, Image.new("RGB", (10, 10))) == "eng"
+
+    # Text on neighbouring pages still wins for mixed documents
+    picker = pdf_ocr.LanguagePicker({2: "هذا نص عربي طويل بما يكفي لتحديد اللغة " * 3}, document_langs="eng")
+    assert picker.pick(3, Image.new("RGB", (10, 10))) == "ara"
+
+
+def test_language_picker_sees_pages_added_after_it_was_built(monkeypatch):
+    monkeypatch.setattr(pdf_ocr, "OCR_LANG_DETECTION", True)
+    monkeypatch.setattr(pdf_ocr, "detect_langs_osd", lambda image: None)
+
+    texts = {}
+    picker = pdf_ocr.LanguagePicker(texts, default="eng")
+    texts[1] = "هذا نص عربي طويل بما يكفي لتحديد اللغة " * 3
+
+    assert picker.page_texts is texts
+    assert picker.pick(2, Image.new("RGB", (10, 10))) == "ara"
+
+
+def test_scanned_page_uses_the_script_of_the_text_layer_before_it(monkeypatch):
+    from backend.utils import attachment_extractor
+    from backend.utils.attachment_extractor import iter_pdf_pages
+
+    layers = iter(["هذا نص عربي طويل بما يكفي لتحديد اللغة " * 3, ""])
+    ocr_langs = []
+
+    def fake_ocr_image(image, lang):
+        ocr_langs.append(lang)
+        return "نص ممسوح ضوئيا"
+
+    monkeypatch.setattr(pdf_ocr, "OCR_LANG_DETECTION", True)
+    monkeypatch.setattr(pdf_ocr, "detect_langs_osd", lambda image: pytest.fail("OSD ran"))
+    monkeypatch.setattr(attachment_extractor, "_extract_text_layer", lambda page: next(layers))
+    monkeypatch.setattr(attachment_extractor, "ocr_available", lambda: True)
+    monkeypatch.setattr(attachment_extractor, "ocr_image", fake_ocr_image)
+
+    pages = list(iter_pdf_pages(_scanned_pdf_pages(2)))
+
+    assert [number for number, _ in pages] == [1, 2]
+    assert ocr_langs == ["ara"]
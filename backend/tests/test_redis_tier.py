@@ -0,0 +1,96 @@
+# backend/tests/test_redis_tier.py
+
+import fakeredis.aioredis
+
+from backend.services.redis_tier import RedisTier
+
+
+class BrokenRedis:
+    def __init__(self):
+        self.calls = 0
+
+    async def get(self, key):
+        self.calls += 1
+        raise ConnectionError("connection refused")
+
+
+async def test_round_trip():
+    tier = RedisTier("Test", client=fakeredis.aioredis.FakeRedis(decode_responses=True))
+    await tier.set("k", "v", ex=60)
+    assert await tier.get("k") == "v"
+    await tier.delete("k")
+    assert await tier.get("k") is None
+
+
+async def test_failure_skips_the_tier():
+    broken = BrokenRedis()
+    tier = RedisTier("Test", client=broken)
+
+    assert await tier.get("k") is None
+    assert tier.available is False
+
+    # Cooling down: Redis is not contacted again
+    assert await tier.get("k") is None
+    assert broken.calls == 1
+
+
+async def test_disabled_tier_is_never_used():
+    broken = BrokenRedis()
+    tier = RedisTier("Test", enabled=False, client=broken)
+    assert await tier.get("k") is None
+    assert broken.calls == 0
+
+
+async def test_extraction_cache_shares_entries_through_redis(tmp_path):
+    from backend.services.extraction_cache import ExtractionCache
+
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    worker_a = ExtractionCache(directory=str(tmp_path / "a"), redis_client=redis)
+    worker_b = ExtractionCache(directory=str(tmp_path / "b"), redis_client=redis)
+
+    await worker_a.set("doc", "text")
+    assert await worker_b.get("doc") == "text"
+    assert worker_b.redis_hits == 1
+
+
+async def test_update_is_read_modify_write():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    tier = RedisTier("Test", client=redis)
+
+    assert await tier.update("k", lambda v: v + "!") is None  # missing key
+    await redis.set("k", "a")
+    assert await tier.update("k", lambda v: v + "b", ex=60) == "ab"
+    assert await redis.get("k") == "ab"
+    assert 0 < await redis.ttl("k") <= 60
+
+
+async def test_update_gives_up_and_drops_a_contended_key():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    tier = RedisTier("Test", client=redis)
+    await redis.set("k", "0")
+
+    # Another writer changes the key between WATCH and EXEC every time
+    real_pipeline = redis.pipeline
+
+    def pipeline(*args, **kwargs):
+        pipe = real_pipeline(*args, **kwargs)
+        real_execute = pipe.execute
+
+        async def execute(*a, **kw):
+            await redis.set("k", "other")
+            return await real_execute(*a, **kw)
+
+        pipe.execute = execute
+        return pipe
+
+    redis.pipeline = pipeline
+    calls = []
+
+    def fn(value):
+        calls.append(value)
+        return value + "!"
+
+    assert await tier.update("k", fn, attempts=3) is None
+    assert len(calls) == 3
+    assert await redis.get("k") is None
+    assert tier.available  # contention is not an outage
@@ -0,0 +1,195 @@
+# backend/tests/test_triplet_engine.py
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services import triplet_engine
+
+
+def model(response, delay=0.0):
+    async def get_response(prompt, attachments, on_delta=None):
+        await asyncio.sleep(delay)
+        return response
+    return get_response
+
+
+@pytest.fixture
+def verdicts():
+    calls = []
+
+    async def make_verdict(responses, on_delta):
+        calls.append(dict(responses))
+        return "verdict"
+
+    make_verdict.calls = calls
+    return make_verdict
+
+
+async def collect(make_verdict, **kwargs):
+    return [event async for event in triplet_engine._triplet_events("q?", None, make_verdict, **kwargs)]
+
+
+def verdict_frame(events):
+    [frame] = [e for e in events if e["model"] == "verdict" and "response" in e]
+    return frame
+
+
+async def test_no_response_by_the_deadline_gives_no_verdict(monkeypatch, verdicts):
+    monkeypatch.setattr(triplet_engine, "TRIPLET_MODELS", {
+        "gpt": model("late", delay=5),
+        "claude": model("late", delay=5),
+        "deepseek": model("late", delay=5),
+    })
+
+    events = await collect(verdicts, deadline=0.05, late_grace=0.05)
+
+    frame = verdict_frame(events)
+    assert frame["no_verdict"] is True
+    assert frame["response"] == triplet_engine.NO_VERDICT
+    assert frame["responses"] == []
+    assert verdicts.calls == []
+    assert sum(1 for e in events if e.get("timed_out")) == 3
+
+
+async def test_only_errors_give_no_verdict(monkeypatch, verdicts):
+    monkeypatch.setattr(triplet_engine, "TRIPLET_MODELS", {
+        "gpt": model("GPT Error: rate limited"),
+        "claude": model("Claude Error: overloaded"),
+        "deepseek": model("DeepSeek Error: Client not initialized"),
+    })
+
+    events = await collect(verdicts)
+
+    assert verdict_frame(events).get("no_verdict") is True
+    assert verdicts.calls == []
+    assert all(e.get("error") for e in events if e["model"] != "verdict")
+
+
+async def test_verdict_only_sees_usable_responses(monkeypatch, verdicts):
+    monkeypatch.setattr(triplet_engine, "TRIPLET_MODELS", {
+        "gpt": model("answer a"),
+        "claude": model("answer b"),
+        "deepseek": model("DeepSeek Error: Client not initialized"),
+    })
+
+    events = await collect(verdicts)
+
+    frame = verdict_frame(events)
+    assert frame["response"] == "verdict"
+    assert "no_verdict" not in frame
+    assert verdicts.calls == [{"gpt": "answer a", "claude": "answer b"}]
+    assert sorted(frame["responses"]) == ["claude", "gpt"]
+
+
+async def test_deadline_verdict_uses_what_arrived(monkeypatch, verdicts):
+    monkeypatch.setattr(triplet_engine, "TRIPLET_MODELS", {
+        "gpt": model("fast"),
+        "claude": model("slow", delay=5),
+        "deepseek": model("slow", delay=5),
+    })
+
+    events = await collect(verdicts, deadline=0.05, late_grace=0.05)
+
+    assert verdict_frame(events)["responses"] == ["gpt"]
+    assert verdicts.calls == [{"gpt": "fast"}]
+
+
+async def test_errors_do_not_count_toward_the_quorum(monkeypatch, verdicts):
+    monkeypatch.setattr(triplet_engine, "TRIPLET_MODELS", {
+        "gpt": model("real answer", delay=0.1),
+        "claude": model("Claude Error: 529 overloaded"),
+        "deepseek": model("DeepSeek Error: rate limited"),
+    })
+
+    events = await collect(verdicts, quorum=2, deadline=5)
+
+    frame = verdict_frame(events)
+    assert "no_verdict" not in frame
+    assert verdicts.calls == [{"gpt": "real answer"}]
+    assert not any(e.get("late") for e in events)
+
+
+async def test_quorum_of_usable_responses_starts_the_verdict(monkeypatch, verdicts):
+    monkeypatch.setattr(triplet_engine, "TRIPLET_MODELS", {
+        "gpt": model("answer a", delay=0.01),
+        "claude": model("Claude Error: 529 overloaded"),
+        "deepseek": model("answer b", delay=0.1),
+    })
+
+    events = await collect(verdicts, quorum=1, deadline=5, late_grace=1)
+
+    # GPT alone makes the quorum; DeepSeek arrives after the verdict started
+    assert verdicts.calls == [{"gpt": "answer a"}]
+    assert [e["model"] for e in events if e.get("late")] == ["deepseek"]
+
+
+# -------------------------------------------------------------------
+# Verdict streaming
+# -------------------------------------------------------------------
+VERDICT_DELTAS = ["\n  ", "Response A: 8/10", " \n", "RECOMMENDED", " ANSWER", "\n\n  "]
+
+
+class FakeOpenAI:
+    def __init__(self, deltas, fail_after=None):
+        self.deltas = deltas
+        self.fail_after = fail_after
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, stream=False, **request):
+        if not stream:
+            message = SimpleNamespace(content="".join(self.deltas))
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        return self.stream()
+
+    async def stream(self):
+        for i, delta in enumerate(self.deltas):
+            if i == self.fail_after:
+                raise ConnectionError("stream reset")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+
+async def test_stream_deltas_strip_adds_up_to_the_stripped_text():
+    async def deltas():
+        for delta in VERDICT_DELTAS:
+            yield delta
+
+    sent = []
+    text = await triplet_engine._stream_deltas(deltas(), sent.append, strip=True)
+
+    assert text == "".join(VERDICT_DELTAS).strip()
+    assert "".join(sent) == text
+
+
+async def test_streamed_and_plain_verdicts_match(monkeypatch):
+    monkeypatch.setattr(triplet_engine, "get_openai_client", lambda: FakeOpenAI(VERDICT_DELTAS))
+    results = {"gpt": "a", "claude": "b", "deepseek": "c"}
+
+    plain = await triplet_engine._generate_blind_verdict("q?", results)
+    sent = []
+    streamed = await triplet_engine._generate_blind_verdict("q?", results, on_delta=sent.append)
+
+    assert streamed == plain
+    assert "".join(sent) == streamed
+    assert streamed.startswith("Response A: 8/10")
+
+
+async def test_failed_verdict_stream_ends_with_an_error_frame(monkeypatch):
+    monkeypatch.setattr(triplet_engine, "TRIPLET_MODELS", {
+        "gpt": model("answer a"),
+        "claude": model("answer b"),
+        "deepseek": model("answer c"),
+    })
+    monkeypatch.setattr(
+        triplet_engine, "get_openai_client", lambda: FakeOpenAI(VERDICT_DELTAS, fail_after=3)
+    )
+
+    events = [event async for event in triplet_engine.run_triplet_streaming("q?")]
+
+    deltas = [e["verdict_delta"] for e in events if "verdict_delta" in e]
+    assert deltas  # part of the verdict was already sent
+    frame = verdict_frame(events)
+    assert frame["error"] is True
+    assert "stream reset" in frame["response"]
+    assert events[-1] is frame
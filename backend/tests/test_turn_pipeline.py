@@ -0,0 +1,111 @@
+# backend/tests/test_turn_pipeline.py
+
+import pytest
+
+from backend.services import turn_pipeline
+
+
+class FakeRepository:
+    def __init__(self):
+        self.messages = {}
+        self.thread = {"summary": "old", "metadata": {}, "updated_at": "t0"}
+        self.insert_calls = 0
+        self.fail_next_insert = False
+
+    async def insert_messages(self, row):
+        self.insert_calls += 1
+        self.messages.setdefault(row["message_id"], row)
+        if self.fail_next_insert:
+            # The row landed but the response was lost: the caller retries
+            self.fail_next_insert = False
+            raise TimeoutError("read timed out")
+        return [row]
+
+    async def get_thread(self, thread_id, columns="*"):
+        return dict(self.thread)
+
+    async def update_thread_if_unchanged(self, thread_id, values, updated_at):
+        if self.thread["updated_at"] != updated_at:
+            return False
+        self.thread.update(values)
+        return True
+
+
+class FakeContextCache:
+    def __init__(self):
+        self.messages = []
+        self.mid_summaries = []
+
+    async def record_message(self, thread_id, row):
+        self.messages.append(row)
+
+    async def record_mid_summary(self, thread_id, summary):
+        self.mid_summaries.append(summary)
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    repo = FakeRepository()
+    cache = FakeContextCache()
+    monkeypatch.setattr(turn_pipeline, "repository", repo)
+    monkeypatch.setattr(turn_pipeline, "context_cache", cache)
+    monkeypatch.setattr(turn_pipeline, "_queues", [])
+    monkeypatch.setattr(turn_pipeline, "_workers", [])
+
+    async def no_background(event):
+        pass
+
+    monkeypatch.setattr(turn_pipeline, "process_turn", no_background)
+    yield repo, cache
+
+
+async def test_assistant_row_is_saved_before_enqueue_returns(pipeline):
+    repo, cache = pipeline
+
+    await turn_pipeline.enqueue_turn("t1", "hi", "hello")
+
+    [row] = repo.messages.values()
+    assert row["content"] == "hello" and row["role"] == "assistant"
+    assert cache.messages == [row]
+    await turn_pipeline.stop_workers()
+
+
+async def test_retried_insert_does_not_duplicate(pipeline):
+    repo, cache = pipeline
+    repo.fail_next_insert = True
+
+    await turn_pipeline.enqueue_turn("t1", "hi", "hello")
+
+    assert repo.insert_calls == 2  # retried with the same message_id
+    assert len(repo.messages) == 1
+    assert len(cache.messages) == 1
+    await turn_pipeline.stop_workers()
+
+
+async def test_turns_of_one_thread_share_a_worker(pipeline):
+    turn_pipeline.start_workers()
+    assert turn_pipeline._queue_for("t1") is turn_pipeline._queue_for("t1")
+    await turn_pipeline.stop_workers()
+
+
+async def test_mtm_roll_retries_after_a_concurrent_roll(pipeline, monkeypatch):
+    repo, cache = pipeline
+    calls = []
+
+    async def generate_mid_term_summary(old_summary, short_summary):
+        calls.append(old_summary)
+        if len(calls) == 1:
+            # Another worker rolls the same thread while we are generating
+            repo.thread.update({"summary": "other", "updated_at": "t1"})
+        return f"{old_summary}+{short_summary}"
+
+    monkeypatch.setattr(turn_pipeline, "generate_mid_term_summary", generate_mid_term_summary)
+
+    event = {"thread_id": "t1"}
+    assert await turn_pipeline._run_step(
+        "mid_term_memory", lambda: turn_pipeline._roll_mid_term_memory(event, "turn")
+    )
+
+    assert calls == ["old", "other"]
+    assert repo.thread["summary"] == "other+turn"
+    assert cache.mid_summaries == ["other+turn"]
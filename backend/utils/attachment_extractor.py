@@ -2,41 +2,235 @@
 
 import pdfplumber
 from io import BytesIO
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import logging
 
+from backend.services.context_budget import count_tokens, truncate_to_tokens
+from backend.utils.pdf_ocr import (
+    OCR_DPI,
+    OCR_LANG,
+    OCR_LANG_DETECTION,
+    OCR_LANG_SAMPLE_PAGES,
+    OSD_DPI,
+    LanguagePicker,
+    detect_langs_from_text,
+    detect_langs_osd,
+    ocr_available,
+    ocr_image,
+    page_needs_ocr,
+)
+
 logger = logging.getLogger(__name__)
 
+# Bump when extraction settings change so cached results are not reused
+PDF_EXTRACTOR_VERSION = "pdfplumber-hybrid-3"
+
+# PDF bytes, or the path of a PDF on disk (uploads spooled to a temp file)
+PdfSource = Union[bytes, str]
+
+
+def _open_pdf(source: PdfSource):
+    if isinstance(source, str):
+        return pdfplumber.open(source)
+    return pdfplumber.open(BytesIO(source))
+
+
+def _extract_text_layer(page) -> str:
+    return page.extract_text(
+        layout=True,
+        x_tolerance=3,
+        y_tolerance=3,
+    ) or ""
+
+
+def _ocr_page(page, page_number: int, picker: LanguagePicker) -> str:
+    if not ocr_available():
+        # No OCR engine installed: keep the (empty) text layer, don't render
+        return ""
+    try:
+        image = page.to_image(resolution=OCR_DPI).original
+        lang = picker.pick(page_number, image)
+        ocr_text = ocr_image(image, lang=lang)
+        logger.info(f"OCR'd image-only page {page_number} (lang={lang})")
+        return ocr_text
+    except Exception as e:
+        logger.warning(f"OCR failed on page {page_number}: {e}")
+        return ""
+
+
+def iter_pdf_pages(
+    pdf_source: PdfSource,
+    start: int = 0,
+    end: Optional[int] = None,
+    document_langs: Optional[str] = None,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Lazily yield (page_number, text) for pages [start, end) (0-based
+    bounds, 1-based page numbers), skipping empty pages.
+
+    Text layer first; image-only pages (scans) are rasterized and OCR'd
+    only when the consumer reaches them, with the OCR language picked from
+    the pages read so far, or ``document_langs`` when the caller already
+    decided it for the whole document. Stop iterating and no further page
+    is touched.
+    """
+    with _open_pdf(pdf_source) as pdf:
+        page_count = len(pdf.pages)
+        end = page_count if end is None else min(end, page_count)
+
+        texts: Dict[int, str] = {}
+        picker = LanguagePicker(texts, document_langs=document_langs)
+
+        for page_num in range(start, end):
+            page = pdf.pages[page_num]
+            try:
+                page_text = _extract_text_layer(page)
+                if page_needs_ocr(page_text, has_images=bool(page.images)):
+                    ocr_text = _ocr_page(page, page_num + 1, picker)
+                    if ocr_text.strip():
+                        page_text = ocr_text
+            except Exception as e:
+                logger.warning(
+                    f"Failed to extract page {page_num + 1}: {e}"
+                )
+                continue
+            finally:
+                # Release pdfplumber's per-page object cache
+                close_page = getattr(page, "close", None)
+                if close_page:
+                    close_page()
+
+            texts[page_num + 1] = page_text
+            if page_text.strip():
+                yield page_num + 1, page_text
+
+
+def take_pages(
+    pages: Iterable[Tuple[int, str]],
+    max_chars: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> Tuple[List[Tuple[int, str]], bool]:
+    """
+    Pull pages until the character / token budget is reached; the last
+    page is cut to fit. Closes the page generator so no further pages are
+    extracted. Returns (pages, complete) where complete means the whole
+    document fit.
+    """
+    kept: List[Tuple[int, str]] = []
+    used_chars = 0
+    used_tokens = 0
+    complete = True
+
+    iterator = iter(pages)
+    try:
+        for page_number, page_text in iterator:
+            if max_chars is not None and used_chars + len(page_text) > max_chars:
+                remaining = max_chars - used_chars
+                if remaining > 0:
+                    kept.append((page_number, page_text[:remaining]))
+                complete = False
+                break
+
+            if max_tokens is not None:
+                page_tokens = count_tokens(page_text)
+                if used_tokens + page_tokens > max_tokens:
+                    cut = truncate_to_tokens(page_text, max_tokens - used_tokens)
+                    if cut:
+                        kept.append((page_number, cut))
+                    complete = False
+                    break
+                used_tokens += page_tokens
+
+            kept.append((page_number, page_text))
+            used_chars += len(page_text)
+    finally:
+        close = getattr(iterator, "close", None)
+        if close:
+            close()
+
+    return kept, complete
+
 
-def extract_attachment_text(file_content: BytesIO) -> str:
+def extract_attachment_text(file_content: BytesIO, max_chars: Optional[int] = None) -> str:
     """
     Robust PDF text extraction supporting:
     - RTL / Arabic
     - Multi-page layouts
+    - Scanned pages inside otherwise digital PDFs (per-page OCR)
     - Safety guards
+    - Early stop once ``max_chars`` of text have been extracted
     """
     try:
         file_content.seek(0)
-        text_parts = []
-
-        with pdfplumber.open(file_content) as pdf:
-            for page_num, page in enumerate(pdf.pages):
-                try:
-                    page_text = page.extract_text(
-                        layout=True,
-                        x_tolerance=3,
-                        y_tolerance=3,
-                    )
-                    if page_text and page_text.strip():
-                        text_parts.append(
-                            f"--- Page {page_num + 1} ---\n{page_text}"
-                        )
-                except Exception as e:
-                    logger.warning(
-                        f"Failed to extract page {page_num + 1}: {e}"
-                    )
-
-        return "\n\n".join(text_parts).strip()
+        pages, _ = take_pages(iter_pdf_pages(file_content.getvalue()), max_chars=max_chars)
+        return join_pages(pages)
 
     except Exception as e:
         logger.error(f"Error extracting PDF text: {e}")
         return ""
+
+
+# -------------------------------------------------------------------
+# Page-range helpers (run inside PdfExtractionService worker processes)
+# -------------------------------------------------------------------
+def count_pdf_pages(pdf_source: PdfSource) -> int:
+    with _open_pdf(pdf_source) as pdf:
+        return len(pdf.pages)
+
+
+def _detect_document_langs(pdf) -> str:
+    """
+    OCR language set for the whole document: the text layer of the first
+    pages, else one OSD pass on the first scanned page, else OCR_LANG.
+    """
+    if not OCR_LANG_DETECTION:
+        return OCR_LANG
+
+    texts: List[str] = []
+    scan = None
+    for page in pdf.pages[:OCR_LANG_SAMPLE_PAGES]:
+        text = _extract_text_layer(page)
+        texts.append(text)
+        if scan is None and page_needs_ocr(text, has_images=bool(page.images)):
+            scan = page
+
+    langs = detect_langs_from_text("\n".join(texts))
+    if langs is None and scan is not None and ocr_available():
+        try:
+            langs = detect_langs_osd(scan.to_image(resolution=OSD_DPI).original)
+        except Exception as e:
+            logger.warning(f"OSD language detection failed: {e}")
+    return langs or OCR_LANG
+
+
+def inspect_pdf(pdf_source: PdfSource) -> Tuple[int, str]:
+    """
+    (page_count, ocr_langs): run once per document before it is split into
+    page ranges, so script detection is not repeated by every range.
+    """
+    with _open_pdf(pdf_source) as pdf:
+        return len(pdf.pages), _detect_document_langs(pdf)
+
+
+def extract_page_range(
+    pdf_source: PdfSource,
+    start: int,
+    end: int,
+    document_langs: Optional[str] = None,
+) -> List[Tuple[int, str]]:
+    """
+    Extract pages [start, end) (0-based) with the same settings as
+    extract_attachment_text. Returns (page_number, text) pairs, 1-based,
+    skipping empty pages. A path is opened by the worker itself, so the
+    document is not pickled into every page-range task. ``document_langs``
+    is the OCR language inspect_pdf chose for the document.
+    """
+    return list(iter_pdf_pages(pdf_source, start, end, document_langs))
+
+
+def join_pages(pages: List[Tuple[int, str]]) -> str:
+    """Same "--- Page N ---" layout extract_attachment_text produces."""
+    return "\n\n".join(
+        f"--- Page {page_number} ---\n{page_text}"
+        for page_number, page_text in sorted(pages)
+    ).strip()
@@ -2,22 +2,186 @@
 Robust Base64 utility functions with comprehensive error handling
 """
 
+import os
+import re
 import base64
-from typing import Optional, Union
+import binascii
+import tempfile
+from typing import BinaryIO, Iterator, Optional, Union
 
-def decode_base64(data: Optional[Union[str, bytes]], field_name: str = "data") -> bytes:
+# Largest decoded attachment accepted by the routes
+MAX_ATTACHMENT_BYTES = int(os.getenv("MAX_ATTACHMENT_BYTES", str(50 * 1024 * 1024)))
+# Encoded characters per decode step (multiple of 4, ~768 KB decoded)
+DECODE_CHUNK_CHARS = 1024 * 1024
+# "data:application/vnd.openxmlformats-...;base64," fits comfortably
+MAX_DATA_URI_HEADER = 256
+
+Base64Input = Union[str, bytes, bytearray, memoryview]
+
+_WHITESPACE = re.compile(r"\s")
+_WHITESPACE_BYTES = re.compile(rb"\s")
+
+
+class Base64TooLarge(ValueError):
+    """The payload decodes to more than the allowed number of bytes."""
+
+
+# ------------------------------------------------------------
+# Zero-copy payload access
+# ------------------------------------------------------------
+def data_uri_offset(data: Base64Input) -> int:
+    """Index where the base64 payload starts (after "data:...;base64,")."""
+    head = data[:MAX_DATA_URI_HEADER]
+    if isinstance(head, str):
+        return head.find(",") + 1 if head.startswith("data:") else 0
+    head = bytes(head)
+    return head.find(b",") + 1 if head.startswith(b"data:") else 0
+
+
+def base64_payload(data: Base64Input) -> Union[str, memoryview]:
+    """
+    The payload without its data-URI prefix. Bytes-like input is sliced
+    through a memoryview (no copy); a str is returned as-is when it has no
+    prefix, so only data-URI strings pay for one slice.
+    """
+    offset = data_uri_offset(data)
+    if isinstance(data, str):
+        return data[offset:] if offset else data
+    return memoryview(data)[offset:]
+
+
+def as_data_uri(data: str, mime: str) -> str:
+    """``data`` as a data URI, reusing the string if it already is one."""
+    if data.startswith("data:"):
+        return data
+    return f"data:{mime};base64,{data}"
+
+
+def decoded_size(data: Base64Input) -> int:
+    """Upper bound of the decoded size, from the encoded length alone."""
+    return (len(data) - data_uri_offset(data)) * 3 // 4
+
+
+def check_base64_size(
+    data: Base64Input,
+    max_bytes: Optional[int] = MAX_ATTACHMENT_BYTES,
+    field_name: str = "data",
+) -> int:
+    """
+    Reject oversize payloads before anything is decoded.
+    Returns the estimated decoded size.
+    """
+    size = decoded_size(data)
+    if max_bytes is not None and size > max_bytes:
+        raise Base64TooLarge(
+            f"{field_name} is too large ({size} bytes decoded, limit {max_bytes})"
+        )
+    return size
+
+
+# ------------------------------------------------------------
+# Chunked decoding
+# ------------------------------------------------------------
+def iter_decode_base64(
+    data: Base64Input,
+    field_name: str = "data",
+    max_bytes: Optional[int] = MAX_ATTACHMENT_BYTES,
+    chunk_chars: int = DECODE_CHUNK_CHARS,
+) -> Iterator[bytes]:
+    """
+    Decode ``data`` (plain base64 or a data URI) in chunks, so at most one
+    chunk of encoded and decoded data is alive at a time besides the input.
+    Whitespace is ignored and missing padding is tolerated; "=" anywhere
+    but the final quantum is rejected, as a single-shot decode would.
+    """
+    check_base64_size(data, max_bytes, field_name)
+
+    is_text = isinstance(data, str)
+    source = data if is_text else memoryview(data)
+    whitespace = _WHITESPACE if is_text else _WHITESPACE_BYTES
+    pad = "=" if is_text else b"="
+    chunk_chars -= chunk_chars % 4
+    carry = pad[:0]
+    padded = False
+
+    try:
+        for start in range(data_uri_offset(data), len(source), chunk_chars):
+            piece = source[start:start + chunk_chars]
+            if whitespace.search(piece):
+                piece = whitespace.sub(pad[:0], piece)
+            if carry:
+                piece = carry + piece
+            if padded and len(piece):
+                raise ValueError("Excess data after padding")
+
+            cut = len(piece) - len(piece) % 4
+            carry = piece[cut:] if is_text else bytes(piece[cut:])
+            if cut:
+                quanta = piece[:cut]
+                # Chunks decode independently, so padding must end the input
+                padded = pad in (quanta[-4:] if is_text else bytes(quanta[-4:]))
+                if padded and carry:
+                    raise ValueError("Excess data after padding")
+                yield base64.b64decode(quanta, validate=True)
+
+        if carry:
+            yield base64.b64decode(carry + pad * (-len(carry) % 4), validate=True)
+
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid base64 data for {field_name}: {str(e)}")
+
+
+def decode_base64_into(
+    data: Base64Input,
+    out: BinaryIO,
+    field_name: str = "data",
+    max_bytes: Optional[int] = MAX_ATTACHMENT_BYTES,
+) -> int:
+    """Decode straight into a writable file / buffer. Returns bytes written."""
+    written = 0
+    for chunk in iter_decode_base64(data, field_name, max_bytes):
+        out.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def decode_base64_to_temp_file(
+    data: Base64Input,
+    field_name: str = "data",
+    max_bytes: Optional[int] = MAX_ATTACHMENT_BYTES,
+    suffix: str = "",
+    directory: Optional[str] = None,
+) -> str:
+    """Decode into a new named temp file; the caller deletes it. Returns the path."""
+    fd, path = tempfile.mkstemp(prefix="b64-", suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            decode_base64_into(data, out, field_name, max_bytes)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
+
+
+def decode_base64(
+    data: Optional[Union[str, bytes]],
+    field_name: str = "data",
+    max_bytes: Optional[int] = MAX_ATTACHMENT_BYTES,
+) -> bytes:
     """
     Safely decode base64 data with comprehensive error handling
     
     Args:
-        data: Base64 encoded string or bytes (can be None)
+        data: Base64 encoded string or bytes (can be None), or a data URI
         field_name: Name of the field for error messages
+        max_bytes: Largest decoded size accepted (None = no limit)
         
     Returns:
         Decoded bytes
         
     Raises:
         ValueError: If data is None, empty, or invalid base64
+        Base64TooLarge: If data decodes to more than max_bytes
     """
     # Handle None case explicitly - this is the main issue
     if data is None:
@@ -47,16 +211,8 @@ def decode_base64(data: Optional[Union[str, bytes]], field_name: str = "data") -
     if not isinstance(data, str):
         raise ValueError(f"Expected string for {field_name}, got {type(data).__name__}")
     
-    # Additional validation for base64 format
-    if len(data) % 4 != 0:
-        # Add padding if needed
-        data += '=' * (4 - len(data) % 4)
-    
-    try:
-        # Use regular base64 decode
-        return base64.b64decode(data, validate=True)
-    except Exception as e:
-        raise ValueError(f"Invalid base64 data for {field_name}: {str(e)}")
+    # Chunked decode: size-checked up front, padding added to the last chunk
+    return b"".join(iter_decode_base64(data, field_name, max_bytes))
 
 
 def encode_base64(data: Union[str, bytes], field_name: str = "data") -> str:
@@ -4,14 +4,52 @@ from PyPDF2 import PdfReader
 from docx import Document
 from io import BytesIO
 import mimetypes
-import pytesseract
 from PIL import Image
-import tempfile
-from pdf2image import convert_from_bytes   # for scanned PDFs
+from typing import Iterator, Tuple
+
+from backend.services.extraction_cache import extraction_cache, content_key
+from backend.utils.pdf_ocr import (   # for scanned pages
+    LanguagePicker,
+    iter_ocr_pages,
+    ocr_image,
+    page_needs_ocr,
+)
 
 # Detect Poppler Path (Windows)
 POPPLER_PATH = os.getenv("POPPLER_PATH", r"C:\Program Files\Tesseract-OCR")
 
+# Bump when extraction behaviour changes so cached results are not reused
+FILE_EXTRACTOR_VERSION = "file-extractor-3"
+
+# Callers never see more than this; extraction stops once it is reached
+FILE_TEXT_MAX_CHARS = 15000
+
+
+def load_file_bytes(url_or_path: str) -> Tuple[bytes, str]:
+    """
+    Read a local file or download a remote one.
+    Returns (bytes, mime_type).
+    """
+    # ─────────────────────────────────────────────
+    # STEP 1 — Load file bytes
+    # ─────────────────────────────────────────────
+    if url_or_path.lower().startswith("http"):
+        print(f"📥 Downloading from remote URL: {url_or_path}")
+        res = requests.get(url_or_path, timeout=30)
+        res.raise_for_status()
+        data = res.content
+        mime_type = res.headers.get("content-type") or mimetypes.guess_type(url_or_path)[0]
+    else:
+        with open(url_or_path, "rb") as f:
+            data = f.read()
+        mime_type = mimetypes.guess_type(url_or_path)[0]
+
+    if not mime_type:
+        mime_type = "application/octet-stream"
+
+    return data, mime_type
+
+
 def extract_attachment_text(url_or_path: str) -> str:
     """
     Extract readable text from attachments (PDF, DOCX, TXT, or image).
@@ -21,66 +59,129 @@ def extract_attachment_text(url_or_path: str) -> str:
       - DOCX
       - TXT files
       - images (PNG/JPG)
+
+    Results are cached by content hash (local tier only on this sync path).
     """
     try:
         print(f"📂 Extracting from: {url_or_path}")
+        data, mime_type = load_file_bytes(url_or_path)
 
-        # ─────────────────────────────────────────────
-        # STEP 1 — Load file bytes
-        # ─────────────────────────────────────────────
-        if url_or_path.lower().startswith("http"):
-            print(f"📥 Downloading from remote URL: {url_or_path}")
-            res = requests.get(url_or_path, timeout=30)
-            res.raise_for_status()
-            file_bytes = BytesIO(res.content)
-            mime_type = res.headers.get("content-type") or mimetypes.guess_type(url_or_path)[0]
-        else:
-            with open(url_or_path, "rb") as f:
-                file_bytes = BytesIO(f.read())
-            mime_type = mimetypes.guess_type(url_or_path)[0]
+        key = content_key(data, f"file-{_mime_slug(mime_type)}", FILE_EXTRACTOR_VERSION)
+        cached = extraction_cache.get_local(key)
+        if cached is not None:
+            print(f"⚡ Extraction cache hit ({len(cached)} chars)")
+            return cached
+
+        text = extract_text_from_bytes(data, mime_type, url_or_path)
+        if text:
+            extraction_cache.set_local(key, text)
+        return text
+
+    except Exception as e:
+        print(f"❌ extract_attachment_text failed: {e}")
+        return ""
 
-        if not mime_type:
-            mime_type = "application/octet-stream"
 
+def iter_pdf_pages(data: bytes) -> Iterator[Tuple[int, str, bool]]:
+    """
+    Lazily yield (page_number, text, is_ocr) in page order, skipping empty
+    pages. Text layers are read up front (cheap, and they drive the OCR
+    decision and language choice); scanned pages are OCR'd only as the
+    consumer gets to them, so closing the generator early skips the rest.
+    """
+    reader = PdfReader(BytesIO(data))
+    page_texts = {}
+    ocr_pages = []
+
+    for i, page in enumerate(reader.pages, start=1):
+        page_text = page.extract_text() or ""
+        if page_needs_ocr(page_text, has_images=_page_has_images(page)):
+            ocr_pages.append(i)
+        page_texts[i] = page_text
+
+    print(
+        f"📘 PDF text layer: {len(reader.pages) - len(ocr_pages)} pages, "
+        f"{len(ocr_pages)} scanned pages to OCR"
+    )
+
+    ocr_results = iter(())
+    if ocr_pages:
+        # Rasterized one at a time, a few pages ahead of the consumer
+        ocr_results = iter_ocr_pages(
+            data,
+            page_numbers=ocr_pages,
+            lang=LanguagePicker(page_texts),
+            poppler_path=POPPLER_PATH,  # Windows fix
+        )
+
+    scanned = set(ocr_pages)
+    try:
+        for page_number, page_text in page_texts.items():
+            if page_number in scanned:
+                _, ocr_text = next(ocr_results)
+                print(f"🔍 OCR on PDF page {page_number}/{len(reader.pages)}")
+                if ocr_text.strip():
+                    yield page_number, ocr_text, True
+            elif page_text.strip():
+                yield page_number, page_text, False
+    finally:
+        close = getattr(ocr_results, "close", None)
+        if close:
+            close()
+
+
+def _page_has_images(page) -> bool:
+    """Cheap check for image XObjects (does not decode the images)."""
+    try:
+        resources = page.get("/Resources") or {}
+        xobjects = resources.get("/XObject") or {}
+        for ref in xobjects.values():
+            xobject = ref.get_object()
+            if xobject.get("/Subtype") == "/Image":
+                return True
+            # Form XObjects can wrap the scan; treat them as images too
+            if xobject.get("/Subtype") == "/Form":
+                return True
+    except Exception:
+        # Unknown structure: let the text layer decide
+        return True
+    return False
+
+
+def _mime_slug(mime_type: str) -> str:
+    return (mime_type or "unknown").split(";")[0].strip().replace("/", "_")
+
+
+def extract_text_from_bytes(data: bytes, mime_type: str, url_or_path: str = "") -> str:
+    """
+    Extract text from already-loaded file bytes. ``url_or_path`` is only
+    used for extension-based type detection.
+    """
+    try:
+        file_bytes = BytesIO(data)
         extracted_text = ""
 
         # ─────────────────────────────────────────────
-        # STEP 2 — PDF extraction (text-layer + fallback OCR)
+        # STEP 2 — PDF extraction (per page: text layer, OCR for scans)
         # ─────────────────────────────────────────────
         if mime_type == "application/pdf" or url_or_path.lower().endswith(".pdf"):
             try:
-                reader = PdfReader(file_bytes)
-                text_layer = "\n".join([(p.extract_text() or "") for p in reader.pages])
-                extracted_text = text_layer.strip()
-
-                print(f"📘 PDF text layer extracted: {len(extracted_text)} chars")
-
-                # If PDF has no text → scanned PDF → run OCR
-                if len(extracted_text) < 10:
-                    print("📄 PDF contains little/no text → running OCR on each page...")
-
-                    pdf_bytes = file_bytes.getvalue()
-
-                    pages = convert_from_bytes(
-                        pdf_bytes,
-                        dpi=300,
-                        poppler_path=POPPLER_PATH  # Windows fix
-                    )
-
-                    ocr_text = ""
-
-                    for i, page in enumerate(pages):
-                        print(f"🔍 OCR on PDF page {i+1}/{len(pages)}")
-                        try:
-                            page_text = pytesseract.image_to_string(
-                                page,
-                                lang="ara+eng"
-                            )
-                            ocr_text += f"\n\n--- OCR Page {i+1} ---\n{page_text}"
-                        except Exception as e:
-                            print(f"⚠️ OCR failed on page {i+1}: {e}")
-
-                    extracted_text = ocr_text
+                parts = []
+                used_chars = 0
+                pages = iter_pdf_pages(data)
+                try:
+                    # Pull pages only until the output limit is reached
+                    for page_number, page_text, is_ocr in pages:
+                        label = "OCR Page" if is_ocr else "Page"
+                        parts.append(f"--- {label} {page_number} ---\n{page_text}")
+                        used_chars += len(page_text)
+                        if used_chars >= FILE_TEXT_MAX_CHARS:
+                            print(f"✂️ Reached {FILE_TEXT_MAX_CHARS} chars at page {page_number}, stopping")
+                            break
+                finally:
+                    pages.close()
+
+                extracted_text = "\n\n".join(parts)
 
             except Exception as e:
                 print(f"⚠️ PDF extraction error: {e}")
@@ -114,11 +215,9 @@ def extract_attachment_text(url_or_path: str) -> str:
         # ─────────────────────────────────────────────
         elif mime_type.startswith("image"):
             try:
-                with tempfile.NamedTemporaryFile(suffix=".png") as tmp:
-                    tmp.write(file_bytes.getvalue())
-                    tmp.flush()
-                    img = Image.open(tmp.name)
-                    extracted_text = pytesseract.image_to_string(img, lang="ara+eng")
+                with Image.open(file_bytes) as img:
+                    lang = LanguagePicker().pick(1, img)
+                    extracted_text = ocr_image(img, lang=lang)
                     print(f"🖼️ OCR extracted {len(extracted_text)} chars from image.")
             except Exception as e:
                 print(f"⚠️ OCR image extraction error: {e}")
@@ -130,11 +229,11 @@ def extract_attachment_text(url_or_path: str) -> str:
         # ─────────────────────────────────────────────
         # STEP 6 — Clean & return
         # ─────────────────────────────────────────────
-        clean_text = extracted_text.strip().replace("\x00", "")[:15000]
+        clean_text = extracted_text.strip().replace("\x00", "")[:FILE_TEXT_MAX_CHARS]
         if not clean_text:
             print("⚠️ No readable text found in file.")
         return clean_text
 
     except Exception as e:
-        print(f"❌ extract_attachment_text failed: {e}")
+        print(f"❌ extract_text_from_bytes failed: {e}")
         return ""
@@ -0,0 +1,107 @@
+# backend/utils/ocr_backend.py
+
+"""
+OCR backends.
+
+- TesserocrBackend: in-process libtesseract via tesserocr. One engine per
+  (thread, language set), created once and reused, so traineddata is loaded
+  once per worker thread instead of once per page.
+- PytesseractBackend: the original subprocess-per-call path, kept as the
+  fallback when tesserocr is not installed or fails to initialise.
+
+OCR_BACKEND selects one explicitly ("tesserocr" / "pytesseract"); the
+default "auto" prefers tesserocr when it works. With neither installed,
+get_ocr_backend raises ImportError and callers skip OCR.
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+
+# Optional in-process binding
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+OCR_BACKEND = os.getenv("OCR_BACKEND", "auto").lower()
+TESSDATA_PREFIX = os.getenv("TESSDATA_PREFIX")
+
+
+class PytesseractBackend:
+    name = "pytesseract"
+
+    def __init__(self):
+        # Imported here so the app starts without OCR installed
+        import pytesseract
+        self._pytesseract = pytesseract
+
+    def image_to_string(self, image, lang: str) -> str:
+        return self._pytesseract.image_to_string(image, lang=lang)
+
+
+class TesserocrBackend:
+    name = "tesserocr"
+
+    def __init__(self):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        self._local = threading.local()
+
+    def _get_engine(self, lang: str):
+        engines: Dict[str, "tesserocr.PyTessBaseAPI"] = getattr(self._local, "engines", None)
+        if engines is None:
+            engines = self._local.engines = {}
+
+        engine = engines.get(lang)
+        if engine is None:
+            if TESSDATA_PREFIX:
+                engine = tesserocr.PyTessBaseAPI(path=TESSDATA_PREFIX, lang=lang)
+            else:
+                engine = tesserocr.PyTessBaseAPI(lang=lang)
+            engines[lang] = engine
+        return engine
+
+    def image_to_string(self, image, lang: str) -> str:
+        engine = self._get_engine(lang)
+        try:
+            engine.SetImage(image)
+            return engine.GetUTF8Text()
+        finally:
+            # Drop the image / recognition results, keep the loaded model
+            engine.Clear()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_ocr_backend():
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    with _backend_lock:
+        if _backend is None:
+            _backend = _create_backend(OCR_BACKEND)
+            print(f"✅ OCR backend: {_backend.name}")
+    return _backend
+
+
+def _create_backend(choice: str):
+    if choice in ("auto", "tesserocr"):
+        try:
+            backend = TesserocrBackend()
+            # Fail here (not on the first page) if the language data is missing
+            backend._get_engine("eng")
+            return backend
+        except Exception as e:
+            if choice == "tesserocr":
+                print(f"⚠️ tesserocr unavailable, falling back to pytesseract: {e}")
+
+    return PytesseractBackend()
+
+
+def ocr_image(image, lang: str, backend: Optional[object] = None) -> str:
+    """OCR a PIL image with the configured backend."""
+    return (backend or get_ocr_backend()).image_to_string(image, lang)
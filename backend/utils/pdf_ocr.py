@@ -0,0 +1,300 @@
+# backend/utils/pdf_ocr.py
+
+"""
+Streaming OCR for scanned PDFs.
+
+Pages are rasterized one at a time (pdftoppm first_page/last_page) and
+OCR'd by a shared pool of worker threads; poppler runs as a subprocess and
+the OCR backend releases the GIL, so threads are enough to use every core.
+The pool lives for the whole process so in-process OCR engines (see
+ocr_backend.py) stay loaded between documents. At most
+``max_inflight`` rendered pages exist at any moment, so memory stays flat
+whatever the page count, and results are yielded in page order as soon as
+each page (and every page before it) is done.
+
+pytesseract / tesserocr and pdf2image are optional: they are imported on
+first use, and without them scanned pages yield no text instead of the
+app failing to import.
+"""
+
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from backend.utils import ocr_backend
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_LANG = os.getenv("OCR_LANG", "ara+eng")
+# A page with images and fewer text-layer characters than this is a scan
+OCR_MIN_TEXT_CHARS = int(os.getenv("OCR_MIN_TEXT_CHARS", "20"))
+
+
+def page_needs_ocr(text_layer: Optional[str], has_images: bool) -> bool:
+    """
+    Per-page decision: use the text layer when there is one, OCR only
+    pages whose content is an image. Blank pages (no text, no images) are
+    skipped without rendering.
+    """
+    return has_images and len((text_layer or "").strip()) < OCR_MIN_TEXT_CHARS
+
+
+_ocr_missing = False
+
+
+def ocr_available() -> bool:
+    """False when no OCR engine is installed (checked once, then cached)."""
+    global _ocr_missing
+    if _ocr_missing:
+        return False
+    try:
+        ocr_backend.get_ocr_backend()
+        return True
+    except ImportError as e:
+        _ocr_missing = True
+        print(f"⚠️ OCR unavailable, scanned pages are skipped: {e}")
+        return False
+
+
+def ocr_image(image, lang: str = OCR_LANG) -> str:
+    """OCR a PIL image; "" when no OCR engine is installed."""
+    if not ocr_available():
+        return ""
+    return ocr_backend.ocr_image(image, lang)
+
+
+# -------------------------------------------------------------------
+# Language selection
+# -------------------------------------------------------------------
+OCR_LANG_DETECTION = os.getenv("OCR_LANG_DETECTION", "true").lower() == "true"
+# Share of letters a script needs before the other model is dropped
+OCR_SINGLE_SCRIPT_RATIO = float(os.getenv("OCR_SINGLE_SCRIPT_RATIO", "0.95"))
+OCR_OSD_MIN_CONF = float(os.getenv("OCR_OSD_MIN_CONF", "2.0"))
+MIN_LETTERS_FOR_DECISION = 40
+NEIGHBOUR_SPAN = 2  # text-layer pages this close to a scan are used as a hint
+
+OSD_SCRIPT_LANGS = {"Arabic": "ara", "Latin": "eng"}
+# Pages read (text layer, then one scan for OSD) to pick a document's language
+OCR_LANG_SAMPLE_PAGES = int(os.getenv("OCR_LANG_SAMPLE_PAGES", "8"))
+OSD_DPI = 150
+
+
+def _is_arabic(ch: str) -> bool:
+    code = ord(ch)
+    return (
+        0x0600 <= code <= 0x06FF
+        or 0x0750 <= code <= 0x077F
+        or 0x08A0 <= code <= 0x08FF
+        or 0xFB50 <= code <= 0xFDFF
+        or 0xFE70 <= code <= 0xFEFF
+    )
+
+
+def detect_langs_from_text(text: Optional[str]) -> Optional[str]:
+    """
+    "ara", "eng" or "ara+eng" from the letters in ``text``;
+    None when there are too few letters to tell.
+    """
+    arabic = latin = 0
+    for ch in text or "":
+        if _is_arabic(ch):
+            arabic += 1
+        elif ch.isascii() and ch.isalpha():
+            latin += 1
+
+    total = arabic + latin
+    if total < MIN_LETTERS_FOR_DECISION:
+        return None
+    if arabic / total >= OCR_SINGLE_SCRIPT_RATIO:
+        return "ara"
+    if latin / total >= OCR_SINGLE_SCRIPT_RATIO:
+        return "eng"
+    return "ara+eng"
+
+
+def detect_langs_osd(image) -> Optional[str]:
+    """
+    Tesseract orientation/script detection on a downscaled copy of the page.
+    Returns a single language only when OSD is confident.
+    """
+    try:
+        import pytesseract
+        small = image.copy()
+        small.thumbnail((1600, 1600))
+        osd = pytesseract.image_to_osd(small, output_type=pytesseract.Output.DICT)
+    except Exception as e:
+        print(f"⚠️ OSD script detection failed: {e}")
+        return None
+
+    langs = OSD_SCRIPT_LANGS.get(osd.get("script"))
+    if langs and float(osd.get("script_conf") or 0) >= OCR_OSD_MIN_CONF:
+        return langs
+    return None
+
+
+class LanguagePicker:
+    """
+    Per-document OCR language choice, in order of cost:
+    1. letters in the text layer of nearby pages (free)
+    2. the decision already made for this document (``document_langs``
+       when the caller detected it up front, e.g. once per PDF before
+       splitting it into page ranges)
+    3. a low-resolution OSD pass on the page itself (cached for the document)
+    4. OCR_LANG (both models)
+    """
+
+    def __init__(
+        self,
+        page_texts: Optional[Dict[int, str]] = None,
+        default: str = OCR_LANG,
+        document_langs: Optional[str] = None,
+    ):
+        # Keep the caller's dict: iter_pdf_pages fills it as pages are read
+        self.page_texts = page_texts if page_texts is not None else {}
+        self.default = default
+        self.decisions: Dict[int, str] = {}
+        self._document_langs = document_langs
+        self._lock = threading.Lock()
+
+    def _from_neighbours(self, page_number: int) -> Optional[str]:
+        text = "\n".join(
+            self.page_texts.get(page_number + offset, "")
+            for offset in range(-NEIGHBOUR_SPAN, NEIGHBOUR_SPAN + 1)
+        )
+        return detect_langs_from_text(text)
+
+    def pick(self, page_number: int, image=None) -> str:
+        langs = None
+        if OCR_LANG_DETECTION:
+            langs = self._from_neighbours(page_number)
+
+            if langs is None:
+                with self._lock:
+                    langs = self._document_langs
+
+            if langs is None and image is not None:
+                langs = detect_langs_osd(image)
+                if langs:
+                    with self._lock:
+                        if self._document_langs is None:
+                            self._document_langs = langs
+
+        langs = langs or self.default
+        self.decisions[page_number] = langs
+        return langs
+
+
+_ocr_pool: Optional[ThreadPoolExecutor] = None
+_ocr_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> ThreadPoolExecutor:
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+    return _ocr_pool
+
+
+def _ocr_page(
+    pdf_path: str,
+    page_number: int,
+    dpi: int,
+    lang: Union[str, LanguagePicker],
+    poppler_path: Optional[str],
+) -> str:
+    from pdf2image import convert_from_path
+
+    images = convert_from_path(
+        pdf_path,
+        dpi=dpi,
+        first_page=page_number,
+        last_page=page_number,
+        poppler_path=poppler_path,
+    )
+    try:
+        if not images:
+            return ""
+        if isinstance(lang, LanguagePicker):
+            lang = lang.pick(page_number, images[0])
+        return ocr_image(images[0], lang=lang)
+    finally:
+        for image in images:
+            image.close()
+
+
+def iter_ocr_pages(
+    pdf_bytes: bytes,
+    page_numbers: Optional[Iterable[int]] = None,
+    dpi: int = OCR_DPI,
+    lang: Union[str, LanguagePicker] = OCR_LANG,
+    poppler_path: Optional[str] = None,
+    max_inflight: Optional[int] = None,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) for each page, 1-based, in page order.
+
+    ``page_numbers`` limits OCR to those pages (default: all pages).
+    ``lang`` is a fixed Tesseract language set or a LanguagePicker that
+    chooses one per page. A page that fails to render / OCR yields an
+    empty string.
+    """
+    max_inflight = max(1, max_inflight or OCR_WORKERS * 2)
+
+    if not ocr_available():
+        for page_number in page_numbers or ():
+            yield page_number, ""
+        return
+
+    # Written once; every per-page pdftoppm call reads the same file
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(pdf_bytes)
+        pdf_path = tmp.name
+
+    try:
+        if page_numbers is None:
+            from pdf2image import pdfinfo_from_path
+            info = pdfinfo_from_path(pdf_path, poppler_path=poppler_path)
+            page_numbers = range(1, int(info.get("Pages", 0)) + 1)
+
+        pending_pages = iter(page_numbers)
+        inflight = deque()
+
+        pool = get_ocr_pool()
+
+        def submit_next() -> bool:
+            page_number = next(pending_pages, None)
+            if page_number is None:
+                return False
+            inflight.append((
+                page_number,
+                pool.submit(_ocr_page, pdf_path, page_number, dpi, lang, poppler_path),
+            ))
+            return True
+
+        while len(inflight) < max_inflight and submit_next():
+            pass
+
+        try:
+            while inflight:
+                page_number, future = inflight.popleft()
+                submit_next()
+                try:
+                    text = future.result()
+                except Exception as e:
+                    print(f"⚠️ OCR failed on page {page_number}: {e}")
+                    text = ""
+                yield page_number, text
+        finally:
+            # Consumer stopped early: drop pages that have not started
+            for _, future in inflight:
+                future.cancel()
+
+    finally:
+        try:
+            os.unlink(pdf_path)
+        except OSError:
+            pass
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Benchmark OCR backends: pytesseract (subprocess per call) vs tesserocr
+(in-process, engine reused).
+
+Usage:
+    python -m backend.utils.scripts.benchmark_ocr_backends samples/ar_page.png samples/en_statement.pdf
+        [--lang ara+eng] [--dpi 300] [--runs 3] [--max-pages 5]
+
+Inputs can be images or PDFs (PDF pages are rendered once up front with
+pdf2image, so rendering is not part of the measurement). For every page the
+script prints the mean per-page latency of each backend; the first
+tesserocr call (model load) is reported separately as "warm-up".
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from PIL import Image
+from pdf2image import convert_from_path
+
+from backend.utils.ocr_backend import PytesseractBackend, TesserocrBackend, tesserocr
+
+
+def load_pages(paths: List[str], dpi: int, max_pages: int) -> List[Tuple[str, Image.Image]]:
+    pages: List[Tuple[str, Image.Image]] = []
+    for path in paths:
+        name = Path(path).name
+        if path.lower().endswith(".pdf"):
+            images = convert_from_path(path, dpi=dpi, first_page=1, last_page=max_pages)
+            for i, image in enumerate(images, start=1):
+                pages.append((f"{name} p{i}", image))
+        else:
+            image = Image.open(path)
+            image.load()
+            pages.append((name, image))
+    return pages
+
+
+def time_backend(backend, image: Image.Image, lang: str, runs: int) -> Tuple[float, int]:
+    timings = []
+    text = ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = backend.image_to_string(image, lang)
+        timings.append(time.perf_counter() - start)
+    return statistics.mean(timings), len(text.strip())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark pytesseract vs tesserocr per-page latency")
+    parser.add_argument("paths", nargs="+", help="Sample images or PDFs (Arabic / English / mixed)")
+    parser.add_argument("--lang", default="ara+eng", help="Tesseract language set (default: ara+eng)")
+    parser.add_argument("--dpi", type=int, default=300, help="PDF render DPI (default: 300)")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per page per backend (default: 3)")
+    parser.add_argument("--max-pages", type=int, default=5, help="Pages per PDF (default: 5)")
+    args = parser.parse_args()
+
+    pages = load_pages(args.paths, args.dpi, args.max_pages)
+    print(f"📄 {len(pages)} pages, lang={args.lang}, runs={args.runs}\n")
+
+    backends = [PytesseractBackend()]
+    if tesserocr is not None:
+        in_process = TesserocrBackend()
+        start = time.perf_counter()
+        in_process._get_engine(args.lang)
+        print(f"🔥 tesserocr warm-up (model load): {time.perf_counter() - start:.3f}s\n")
+        backends.append(in_process)
+    else:
+        print("⚠️ tesserocr not installed, only pytesseract is measured\n")
+
+    header = f"{'page':<32}" + "".join(f"{b.name:>14}" for b in backends) + "   chars"
+    print(header)
+
+    totals = {b.name: [] for b in backends}
+    for label, image in pages:
+        row = f"{label[:32]:<32}"
+        chars = 0
+        for backend in backends:
+            mean, chars = time_backend(backend, image, args.lang, args.runs)
+            totals[backend.name].append(mean)
+            row += f"{mean:>13.3f}s"
+        print(row + f"   {chars}")
+
+    print("\nMean per page:")
+    for name, values in totals.items():
+        print(f"  {name:<12} {statistics.mean(values):.3f}s")
+
+
+if __name__ == "__main__":
+    main()